@@ -1,7 +1,10 @@
-import os
-import openai
 import streamlit as st
-from fpdf import FPDF
+from openai_client import get_client
+from pdf_report import get_pdf_bytes
+from recommendation_cache import get_cache, make_cache_key
+from recommendation_schema import is_valid_recommendation
+from recommendation_stream import STREAMING_ENABLED, iter_completion_deltas, render_stream
+from request_coalescing import get_limiter, queue_notice, run_coalesced
 
 def generate_prompt(profil):
     return (
@@ -14,9 +17,11 @@ def generate_prompt(profil):
         "| ...    | ...     | ...                |"
     )
 
-def call_openai_api(prompt):
-    openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = openai_client.chat.completions.create(
+def render_response(text):
+    return f"```markdown\n{text}\n```"
+
+def call_openai_api(prompt, placeholder=None):
+    request_params = dict(
         model="gpt-4",
         messages=[
             {"role": "system", "content": "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus."},
@@ -25,28 +30,25 @@ def call_openai_api(prompt):
         temperature=0.7,
         top_p=0.9
     )
-    return response.choices[0].message.content
 
-def save_as_pdf(profil, rekomendasi):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", style='B', size=16)
-    pdf.cell(200, 10, "Hasil Rekomendasi Jurusan & Kampus", ln=True, align='C')
-    pdf.ln(10)
-    
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, f"Profil Pengguna:\n{profil}\n")
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", style='B', size=14)
-    pdf.cell(0, 10, "Rekomendasi:", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, rekomendasi)
-    
-    pdf_output = "rekomendasi_jurusan.pdf"
-    pdf.output(pdf_output)
-    return pdf_output
+    def request_completion(flight):
+        # Klien bersama (satu per proses) agar koneksi HTTP dipakai ulang antar permintaan
+        openai_client = get_client()
+        with get_limiter().slot(on_wait=queue_notice(placeholder)):
+            if placeholder is None or not STREAMING_ENABLED:
+                response = openai_client.chat.completions.create(**request_params)
+                return response.choices[0].message.content
+            # Mode streaming: tabel ditampilkan baris demi baris selama token datang
+            stream = openai_client.chat.completions.create(**request_params, stream=True)
+            return render_stream(flight.tee(iter_completion_deltas(stream)), placeholder, render=render_response)
+
+    # Profil yang identik (setelah dinormalkan) cukup dibayar sekali, dan permintaan
+    # identik yang datang bersamaan hanya dikirim sekali ke API; jawaban yang tidak bisa diurai tidak di-cache
+    cache_key = make_cache_key(**request_params)
+    return get_cache().get_or_compute(
+        cache_key, lambda: run_coalesced(cache_key, request_completion, placeholder, render_response),
+        validate=is_valid_recommendation,
+    )
 
 def main():
     st.title("📝 Formulir Pemilihan Jurusan & Kampus")
@@ -74,24 +76,24 @@ def main():
             f"**Nilai Rata-rata Rapor:** {nilai_rapor}\n"
         )
         
-        prompt = generate_prompt(profil_ringkas)
-        response = call_openai_api(prompt)
-        
         st.subheader("📌 Hasil Rekomendasi")
         st.markdown(f"### 📋 Ringkasan Profil Anda")
         st.markdown(profil_ringkas)
         
         st.markdown(f"### 🎓 Rekomendasi Jurusan & Kampus")
-        st.markdown(f"```markdown\n{response}\n```")
+        rekomendasi_placeholder = st.empty()
+        prompt = generate_prompt(profil_ringkas)
+        response = call_openai_api(prompt, placeholder=rekomendasi_placeholder)
+        rekomendasi_placeholder.markdown(render_response(response))
         
-        pdf_path = save_as_pdf(profil_ringkas, response)
-        with open(pdf_path, "rb") as pdf_file:
-            st.download_button(
-                label="📥 Unduh Rekomendasi sebagai PDF",
-                data=pdf_file,
-                file_name="rekomendasi_jurusan.pdf",
-                mime="application/pdf"
-            )
+        # PDF dibuat di memori per sesi saat diunduh, tidak ditulis ke file bersama di disk
+        st.download_button(
+            label="📥 Unduh Rekomendasi sebagai PDF",
+            data=lambda: get_pdf_bytes(profil_ringkas, response), # PDF baru dibuat saat tombol ditekan
+            file_name="rekomendasi_jurusan.pdf",
+            mime="application/pdf",
+            on_click="ignore" # Hasil tetap tampil setelah tombol unduh ditekan
+        )
         
         st.success("Terima kasih telah mengisi formulir! Gunakan informasi ini untuk menentukan pilihan terbaik Anda.")
 
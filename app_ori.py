@@ -1,52 +1,73 @@
-import os
-import openai
 import streamlit as st
-from fpdf import FPDF
+from openai_client import get_client
+from pdf_report import get_pdf_bytes
+from prompt_budget import PROFILE_LEGEND, encode_profile, measure_prompt, report_savings
+from recommendation_cache import get_cache, make_cache_key
+from recommendation_schema import is_valid_recommendation
+from recommendation_stream import STREAMING_ENABLED, iter_completion_deltas, render_stream
+from request_coalescing import get_limiter, queue_notice, run_coalesced
+from tracing import tracer
 
-def generate_prompt(profil):
+TABLE_FORMAT = (
+    "Format keluaran yang diharapkan:\n"
+    "| Kampus | Jurusan | Peluang Diterima (%) |\n"
+    "|--------|---------|--------------------|\n"
+    "| ...    | ...     | ...                |\n"
+    "| ...    | ...     | ...                |\n"
+    "| ...    | ...     | ...                |"
+)
+# Instruksi dan format tabel ada di pesan system yang identik untuk setiap permintaan (prefiks yang bisa di-cache API)
+SYSTEM_PROMPT = (
+    "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus. Berikan rekomendasi 3 jurusan dari "
+    "3 kampus sesuai dengan profil siswa dan sajikan dalam bentuk tabular serta peluang untuk dapat diterima.\n\n"
+    f"{PROFILE_LEGEND}\n\n{TABLE_FORMAT}"
+)
+# Format lama, hanya dipakai sebagai pembanding penghematan token
+VERBOSE_SYSTEM_PROMPT = "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus."
+
+def generate_prompt(form):
+    return f"Profil:\n{encode_profile(form)}"
+
+def generate_verbose_prompt(profil):
     return (
         f"Berikan rekomendasi 3 jurusan dari 3 kampus sesuai dengan profil berikut ini dan sajikan dalam bentuk tabular "
-        f"serta peluang untuk dapat diterima:\n\n{profil}\n\nFormat keluaran yang diharapkan:\n"
-        "| Kampus | Jurusan | Peluang Diterima (%) |\n"
-        "|--------|---------|--------------------|\n"
-        "| ...    | ...     | ...                |\n"
-        "| ...    | ...     | ...                |\n"
-        "| ...    | ...     | ...                |"
+        f"serta peluang untuk dapat diterima:\n\n{profil}\n\n{TABLE_FORMAT}"
     )
 
-def call_openai_api(prompt):
-    openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = openai_client.chat.completions.create(
+def build_messages(prompt, system_prompt=SYSTEM_PROMPT):
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+
+def render_response(text):
+    return text
+
+def call_openai_api(prompt, placeholder=None):
+    request_params = dict(
         model="gpt-4",
-        messages=[
-            {"role": "system", "content": "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus."},
-            {"role": "user", "content": prompt}
-        ],
+        messages=build_messages(prompt),
         temperature=0.7,
         top_p=0.9
     )
-    return response.choices[0].message.content
-
-def save_as_pdf(profil, rekomendasi):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", style='B', size=16)
-    pdf.cell(200, 10, "Hasil Rekomendasi Jurusan & Kampus", ln=True, align='C')
-    pdf.ln(10)
-    
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, f"Profil Pengguna:\n{profil}\n")
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", style='B', size=14)
-    pdf.cell(0, 10, "Rekomendasi:", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, rekomendasi)
-    
-    pdf_output = "rekomendasi_jurusan.pdf"
-    pdf.output(pdf_output)
-    return pdf_output
+
+    def request_completion(flight):
+        # Klien bersama (satu per proses) agar koneksi HTTP dipakai ulang antar permintaan
+        openai_client = get_client()
+        with get_limiter().slot(on_wait=queue_notice(placeholder)):
+            if placeholder is None or not STREAMING_ENABLED:
+                response = openai_client.chat.completions.create(**request_params)
+                return response.choices[0].message.content
+            # Mode streaming: tabel ditampilkan baris demi baris selama token datang
+            stream = openai_client.chat.completions.create(**request_params, stream=True)
+            return render_stream(flight.tee(iter_completion_deltas(stream)), placeholder, render=render_response)
+
+    # Profil yang identik (setelah dinormalkan) cukup dibayar sekali, dan permintaan
+    # identik yang datang bersamaan hanya dikirim sekali ke API; jawaban yang tidak bisa diurai tidak di-cache
+    cache_key = make_cache_key(**request_params)
+    with tracer.stage("call_openai_api", model=request_params["model"]) as span:
+        span["prompt_tokens_estimated"] = measure_prompt(request_params["messages"]).prompt_tokens
+        return get_cache().get_or_compute(
+            cache_key, lambda: run_coalesced(cache_key, request_completion, placeholder, render_response),
+            validate=is_valid_recommendation,
+        )
 
 def main():
     st.title("📝 Rekomendasi Pemilihan Jurusan & Kampus")
@@ -120,26 +141,41 @@ def main():
         )
         
                 
-        prompt = generate_prompt(profil_ringkas)
-        response = call_openai_api(prompt)
-        
         st.subheader("📌 Hasil Rekomendasi")
         st.markdown(f"### 📋 Ringkasan Profil Anda")
         st.markdown(profil_ringkas)
         st.markdown(f"### 🎓 Rekomendasi Jurusan & Kampus")
-        st.markdown(response, unsafe_allow_html=True)
+        rekomendasi_placeholder = st.empty()
+        # Prompt memakai profil ringkas berkunci (bukan kalimat di atas) agar lebih hemat token
+        form = {
+            "jenis_kelamin": jenis_kelamin, "usia": usia, "domisili": domisili, "sekolah": sekolah,
+            "jurusan_sma": jurusan_sma, "nilai_rapor": nilai_rapor, "hubungan": hubungan, "pekerjaan": pekerjaan,
+            "pendapatan": pendapatan, "mata_pelajaran": mata_pelajaran, "aktivitas_suka": aktivitas_suka,
+            "gaya_belajar": gaya_belajar, "lingkungan_kerja": lingkungan_kerja, "karier": karier,
+            "kerja_tim": kerja_tim, "lingkungan_kampus": lingkungan_kampus, "jenis_kampus": jenis_kampus,
+            "faktor_kampus": faktor_kampus, "gaji_tinggi": gaji_tinggi, "stabilitas_pekerjaan": stabilitas_pekerjaan,
+            "kesempatan_luar_negeri": kesempatan_luar_negeri, "fleksibilitas_karier": fleksibilitas_karier,
+            "hobi_minat": hobi_minat,
+        }
+        prompt = generate_prompt(form)
+        report_savings(
+            build_messages(generate_verbose_prompt(profil_ringkas), VERBOSE_SYSTEM_PROMPT), build_messages(prompt),
+            stage="rekomendasi",
+        )
+        response = call_openai_api(prompt, placeholder=rekomendasi_placeholder)
+        rekomendasi_placeholder.markdown(response, unsafe_allow_html=True)
 
         ##st.markdown(f"### 🎓 Rekomendasi Jurusan & Kampus")
         ##st.markdown(f"```markdown\n{response}\n```")
         
-        pdf_path = save_as_pdf(profil_ringkas, response)
-        with open(pdf_path, "rb") as pdf_file:
-            st.download_button(
-                label="📥 Unduh Rekomendasi sebagai PDF",
-                data=pdf_file,
-                file_name="rekomendasi_jurusan.pdf",
-                mime="application/pdf"
-            )
+        # PDF dibuat di memori per sesi saat diunduh, tidak ditulis ke file bersama di disk
+        st.download_button(
+            label="📥 Unduh Rekomendasi sebagai PDF",
+            data=lambda: get_pdf_bytes(profil_ringkas, response), # PDF baru dibuat saat tombol ditekan
+            file_name="rekomendasi_jurusan.pdf",
+            mime="application/pdf",
+            on_click="ignore" # Hasil tetap tampil setelah tombol unduh ditekan
+        )
         
         st.success("Terima kasih telah mengisi formulir! Gunakan informasi ini untuk menentukan pilihan terbaik Anda.")
 
@@ -0,0 +1,196 @@
+"""Penyimpanan artefak pekerjaan (PDF, audio) dengan anggaran byte per sesi dan global.
+
+Artefak disimpan di SQLite antrean pekerjaan (tabel `job_artifacts`), sedangkan
+indeksnya (ukuran, sesi, urutan akses terakhir) disimpan di memori sebagai
+record `__slots__` yang ringkas. Jika total byte satu sesi atau seluruh proses
+melebihi anggaran, artefak yang paling lama tidak diakses dihapus lebih dulu
+(LRU). Artefak yang terhapus dibuat ulang saat dibutuhkan lagi (PDF saat
+diunduh, audio saat tombol putar ditekan).
+
+Versi lama aplikasi menulis `rekomendasi_jurusan_*.pdf` dan `temp_audio_*.mp3`
+ke direktori kerja; berkas yatim seperti itu dihapus setelah melewati TTL.
+"""
+import glob
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from tracing import tracer
+
+# --- Konfigurasi Anggaran Artefak ---
+ARTIFACT_MAX_BYTES = int(os.getenv("PILIH_KAMPUS_ARTIFACT_MAX_BYTES", str(256 * 1024 * 1024)))
+ARTIFACT_SESSION_MAX_BYTES = int(os.getenv("PILIH_KAMPUS_ARTIFACT_SESSION_MAX_BYTES", str(8 * 1024 * 1024)))
+# Berkas sementara lama di direktori kerja yang lebih tua dari ini dianggap yatim
+ORPHAN_FILE_DIR = os.getenv("PILIH_KAMPUS_ORPHAN_FILE_DIR", ".")
+ORPHAN_FILE_TTL_SECONDS = float(os.getenv("PILIH_KAMPUS_ORPHAN_FILE_TTL", str(60 * 60)))
+ORPHAN_FILE_PATTERNS = ("rekomendasi_jurusan_*.pdf", "temp_audio_*.mp3")
+
+
+class ArtifactRecord:
+    """Metadata satu artefak di indeks memori (isinya tetap di SQLite)."""
+
+    __slots__ = ("job_id", "name", "session_id", "size", "created_at")
+
+    def __init__(self, job_id, name, session_id, size, created_at):
+        self.job_id = job_id
+        self.name = name
+        self.session_id = session_id
+        self.size = size
+        self.created_at = created_at
+
+
+class ArtifactStore:
+    """Artefak per (job_id, nama) dengan eviksi LRU per sesi dan global.
+
+    Memakai koneksi dan lock milik JobQueue agar tulisan ke SQLite tidak saling menunggu antar koneksi.
+    """
+
+    def __init__(self, conn, lock, max_bytes=ARTIFACT_MAX_BYTES, session_max_bytes=ARTIFACT_SESSION_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.current_bytes = 0
+        self.stats = {"evictions": 0, "rejected": 0, "orphan_files_removed": 0}
+        self._conn = conn
+        self._lock = lock
+        self._records = OrderedDict() # (job_id, nama) -> ArtifactRecord, urutan akses terakhir
+        self._sessions = {} # session_id -> OrderedDict (job_id, nama) -> ArtifactRecord
+        self._session_bytes = {}
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_artifacts ("
+                "job_id TEXT NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, created_at REAL NOT NULL, "
+                "session_id TEXT, PRIMARY KEY (job_id, name))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(job_artifacts)")}
+            if "session_id" not in columns:
+                self._conn.execute("ALTER TABLE job_artifacts ADD COLUMN session_id TEXT")
+            self._conn.commit()
+            # Urutan akses tidak disimpan; setelah restart indeks diurutkan menurut waktu dibuat
+            rows = self._conn.execute(
+                "SELECT job_id, name, session_id, length(data), created_at FROM job_artifacts ORDER BY created_at"
+            ).fetchall()
+        for job_id, name, session_id, size, created_at in rows:
+            self._add(ArtifactRecord(job_id, name, session_id or job_id, size, created_at))
+        # Data lama bisa melebihi anggaran yang baru diatur
+        with self._lock:
+            self._delete(self._evict_over_budget(None))
+
+    def _add(self, record):
+        key = (record.job_id, record.name)
+        self._records[key] = record
+        self._sessions.setdefault(record.session_id, OrderedDict())[key] = record
+        self._session_bytes[record.session_id] = self._session_bytes.get(record.session_id, 0) + record.size
+        self.current_bytes += record.size
+
+    def _remove(self, key):
+        record = self._records.pop(key, None)
+        if record is None:
+            return None
+        session = self._sessions[record.session_id]
+        del session[key]
+        self._session_bytes[record.session_id] -= record.size
+        if not session:
+            del self._sessions[record.session_id]
+            del self._session_bytes[record.session_id]
+        self.current_bytes -= record.size
+        return record
+
+    def _touch(self, key):
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+            self._sessions[record.session_id].move_to_end(key)
+        return record
+
+    def _evict_over_budget(self, session_id):
+        """Menghapus dari indeks artefak LRU sampai anggaran terpenuhi; mengembalikan key yang dihapus."""
+        evicted = []
+        while session_id in self._sessions and self._session_bytes[session_id] > self.session_max_bytes:
+            key = next(iter(self._sessions[session_id]))
+            self._remove(key)
+            evicted.append(key)
+            tracer.incr("artifact_evictions_total", budget="session")
+        while self.current_bytes > self.max_bytes:
+            key = next(iter(self._records))
+            self._remove(key)
+            evicted.append(key)
+            tracer.incr("artifact_evictions_total", budget="global")
+        self.stats["evictions"] += len(evicted)
+        return evicted
+
+    def _delete(self, keys):
+        if keys:
+            self._conn.executemany("DELETE FROM job_artifacts WHERE job_id = ? AND name = ?", keys)
+            self._conn.commit()
+
+    def save(self, job_id, name, data, session_id=None):
+        """Menyimpan artefak; mengembalikan False jika ukurannya melebihi anggaran sehingga tidak disimpan."""
+        session_id = session_id or job_id
+        if len(data) > min(self.max_bytes, self.session_max_bytes):
+            self.stats["rejected"] += 1
+            tracer.incr("artifact_rejected_total", artifact=name)
+            return False
+        key = (job_id, name)
+        now = time.time()
+        with self._lock:
+            self._remove(key)
+            self._add(ArtifactRecord(job_id, name, session_id, len(data), now))
+            # Artefak yang baru disimpan ada di ujung LRU dan muat anggaran, jadi tidak ikut terhapus
+            evicted = self._evict_over_budget(session_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_artifacts (job_id, name, data, created_at, session_id) VALUES (?, ?, ?, ?, ?)",
+                (job_id, name, sqlite3.Binary(data), now, session_id),
+            )
+            self._delete(evicted)
+            self._conn.commit()
+        return True
+
+    def get(self, job_id, name):
+        with self._lock:
+            if self._touch((job_id, name)) is None:
+                return None
+            row = self._conn.execute(
+                "SELECT data FROM job_artifacts WHERE job_id = ? AND name = ?", (job_id, name)
+            ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def has(self, job_id, name):
+        with self._lock:
+            return (job_id, name) in self._records
+
+    def discard_jobs(self, job_ids):
+        """Menghapus semua artefak milik pekerjaan yang kedaluwarsa."""
+        job_ids = set(job_ids)
+        with self._lock:
+            keys = [key for key in self._records if key[0] in job_ids]
+            for key in keys:
+                self._remove(key)
+            self._delete(keys)
+
+    def usage(self):
+        """Statistik pemakaian saat ini untuk pemantauan."""
+        with self._lock:
+            largest = max(self._session_bytes.values(), default=0)
+            return dict(
+                self.stats, entries=len(self._records), bytes=self.current_bytes, max_bytes=self.max_bytes,
+                sessions=len(self._sessions), largest_session_bytes=largest,
+                session_max_bytes=self.session_max_bytes,
+            )
+
+    def remove_orphan_files(self, directory=ORPHAN_FILE_DIR, max_age=ORPHAN_FILE_TTL_SECONDS):
+        """Menghapus berkas PDF/audio sementara lama yang tidak lagi dirujuk oleh sesi mana pun."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for pattern in ORPHAN_FILE_PATTERNS:
+            for path in glob.glob(os.path.join(directory, pattern)):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    continue # Berkas sedang dipakai atau sudah dihapus proses lain
+        if removed:
+            self.stats["orphan_files_removed"] += removed
+            tracer.incr("orphan_files_removed_total", removed)
+        return removed
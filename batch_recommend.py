@@ -0,0 +1,375 @@
+"""Mesin rekomendasi massal (batch) untuk satu sekolah sekaligus.
+
+Contoh penggunaan dari command line:
+
+    python batch_recommend.py siswa.csv --output hasil.jsonl --pdf-dir pdf_siswa --workers 4 --rpm 60
+    python batch_recommend.py siswa.csv --pdf-dir "" --class-pdf kelas.pdf --class-zip kelas.zip
+
+Jika proses terhenti di tengah jalan, jalankan perintah yang sama lagi:
+siswa yang sudah berhasil diproses (tercatat di file output) akan dilewati.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+
+from llm_backend import BackendUnavailable, get_backends
+from pdf_report import StudentReport, render_class_pdf, render_class_zip, render_pdf, unique_filename
+from recommendation_schema import HasilRekomendasi, RecommendationParseError
+from request_coalescing import QueueTimeout
+
+# Nilai bawaan sama dengan nilai awal widget pada formulir interaktif
+DEFAULT_PROFILE = {
+    "nama": "",
+    "jenis_kelamin": "Laki-laki",
+    "usia": 17,
+    "domisili": "",
+    "sekolah": "",
+    "jurusan_sma": "IPA",
+    "nilai_rapor": 0.0,
+    "nama_orangtua": "",
+    "pekerjaan": "",
+    "pendapatan": "< Rp3 juta",
+    "mata_pelajaran": [],
+    "aktivitas_suka": [],
+    "lingkungan_kerja": "Kantor",
+    "karier": "Teknologi",
+    "kerja_tim": "Mandiri",
+    "gaji_tinggi": 3,
+    "stabilitas_pekerjaan": 3,
+    "kesempatan_luar_negeri": 3,
+    "fleksibilitas_karier": 3,
+    "hobi_minat": 3,
+    "jenis_kampus": "Negeri",
+    "faktor_kampus": [],
+}
+
+# Jenis pekerjaan di antrean background (lihat job_queue.py) untuk halaman Rekomendasi Massal
+JOB_BATCH = "batch"
+
+# Baris input yang tidak bisa dibaca; dicatat sebagai error tanpa menghentikan siswa lain.
+# `column` None berarti seluruh baris JSONL tidak bisa dibaca; `line` adalah nomor baris di file input.
+InvalidProfile = namedtuple("InvalidProfile", ["column", "value", "line"], defaults=(None,))
+
+# Error yang layak dicoba ulang (sementara), bukan kesalahan permanen seperti API key salah
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    RecommendationParseError,
+    QueueTimeout,
+)
+# Error yang membuat batch beralih ke backend berikutnya (setelah retry habis untuk error sementara)
+FAILOVER_ERRORS = RETRYABLE_ERRORS + (openai.OpenAIError,)
+
+
+def _normalize_profile(raw):
+    """Melengkapi dan menyamakan tipe data satu baris profil sesuai DEFAULT_PROFILE.
+
+    Mengembalikan InvalidProfile jika ada kolom angka yang tidak bisa dibaca.
+    """
+    profile = dict(DEFAULT_PROFILE)
+    for key, default in DEFAULT_PROFILE.items():
+        value = raw.get(key)
+        if value is None or value == "":
+            continue
+        try:
+            if isinstance(default, list):
+                if isinstance(value, str):
+                    # Kolom CSV multi-pilihan dipisahkan dengan titik koma
+                    value = [item.strip() for item in value.split(";") if item.strip()]
+                profile[key] = list(value)
+            elif isinstance(default, int):
+                profile[key] = int(float(value))
+            elif isinstance(default, float):
+                profile[key] = float(value)
+            else:
+                profile[key] = str(value).strip()
+        except (TypeError, ValueError, OverflowError):
+            return InvalidProfile(key, value)
+    return profile
+
+
+def load_profiles(path):
+    """Membaca profil siswa dari file CSV atau JSONL dan memberi setiap siswa ID yang stabil.
+
+    Baris dengan isian tidak valid, baris JSONL yang rusak, atau baris JSON yang bukan objek
+    tetap dikembalikan, dengan InvalidProfile (beserta nomor barisnya) sebagai profilnya.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = []
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                if not isinstance(row, dict):
+                    row = InvalidProfile(None, line.strip()[:100], line_number)
+                rows.append((line_number, row))
+        else:
+            reader = csv.DictReader(f)
+            rows = [(reader.line_num, row) for row in reader]
+
+    profiles = []
+    for index, (line_number, row) in enumerate(rows):
+        if isinstance(row, InvalidProfile):
+            profiles.append((f"siswa-{index + 1:04d}", row))
+            continue
+        student_id = str(row.get("id") or f"siswa-{index + 1:04d}").strip()
+        profile = _normalize_profile(row)
+        if isinstance(profile, InvalidProfile):
+            profile = profile._replace(line=line_number)
+        profiles.append((student_id, profile))
+    return profiles
+
+
+def describe_invalid(profile):
+    """Pesan error untuk satu InvalidProfile, untuk file hasil dan halaman Rekomendasi Massal."""
+    if profile.column is None:
+        return f"Baris {profile.line} bukan objek JSON yang valid: {profile.value!r}"
+    return f"Isian kolom {profile.column} tidak valid: {profile.value!r}"
+
+
+def load_completed_ids(output_path):
+    """Mengambil ID siswa yang sudah berhasil diproses agar batch bisa dilanjutkan setelah crash."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Baris terakhir bisa terpotong jika proses mati saat menulis
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+def iter_class_reports(output_path):
+    """Membaca siswa yang berhasil dari file hasil JSONL satu per satu, untuk laporan PDF satu kelas."""
+    seen = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") != "ok" or record["id"] in seen:
+                continue
+            seen.add(record["id"])
+            yield StudentReport(
+                record["id"], record.get("nama") or record["id"], record["profil"],
+                HasilRekomendasi.from_json(json.dumps(record["rekomendasi"])),
+            )
+
+
+class RateLimiter:
+    """Pembatas laju permintaan per menit yang dipakai bersama oleh semua worker.
+
+    Jika salah satu worker terkena rate limit, semua worker ikut menunggu
+    (cooldown) agar tidak memperparah pembatasan dari server.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def cooldown(self, seconds):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error, attempt, base_delay):
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Exponential backoff dengan jitter agar worker tidak mencoba ulang bersamaan
+    return base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+
+
+def _request_with_retries(call, limiter, max_retries, base_delay):
+    """Menjalankan `call()` dengan retry dan backoff untuk error sementara."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after_seconds(e, attempt, base_delay)
+            if isinstance(e, openai.RateLimitError):
+                limiter.cooldown(delay)
+            time.sleep(delay)
+
+
+def recommend_student(profile, limiter, max_retries=4, base_delay=1.0):
+    """Menghasilkan rekomendasi untuk satu siswa lewat rantai backend (lihat llm_backend.py).
+
+    Backend LLM yang tidak sehat dilewati; yang tetap gagal setelah retry diganti backend berikutnya,
+    dan katalog lokal (jika ada di rantai) menjadi cadangan terakhir. Mengembalikan (profil, hasil, backend).
+    """
+    # Diimpor di sini agar modul ini bisa dimuat tanpa menjalankan aplikasi Streamlit
+    from pilih_kampus_tts import build_profile_summary, call_openai_api, generate_prompt, shortlist_candidates
+
+    profil = build_profile_summary(profile)
+    kandidat = shortlist_candidates(profile, profil)
+    prompt = generate_prompt(profile, kandidat)
+    error = None
+    for backend in get_backends():
+        if not backend.is_llm:
+            return profil, backend.recommend(kandidat), backend.name
+        status = backend.check_health()
+        if not status.ok:
+            backend.record_failover("unhealthy")
+            error = BackendUnavailable(status.message)
+            continue
+        call = lambda: HasilRekomendasi.parse(call_openai_api(prompt, backend=backend))
+        try:
+            return profil, _request_with_retries(call, limiter, max_retries, base_delay), backend.name
+        except FAILOVER_ERRORS as e:
+            backend.record_failover(type(e).__name__)
+            backend.report_failure(e)
+            error = e
+    raise error
+
+
+def run_batch(profiles, output_path, pdf_dir=None, workers=4, requests_per_minute=60,
+              max_retries=4, on_result=None):
+    """Memproses seluruh profil secara paralel dan menulis hasil ke file JSONL secara bertahap.
+
+    `on_result(record, done, total)` dipanggil dari thread pemanggil setiap kali
+    satu siswa selesai, misalnya untuk memperbarui progress bar Streamlit.
+    Mengembalikan ringkasan berisi jumlah siswa dan throughput (siswa/menit).
+    """
+    completed = load_completed_ids(output_path)
+    # Nama PDF ditentukan dari seluruh baris sesuai urutan file agar tetap sama saat batch dilanjutkan
+    used_names = set()
+    rows = [(sid, profile, unique_filename(sid, used_names)) for sid, profile in profiles]
+    pending = [row for row in rows if row[0] not in completed]
+    invalid = [(sid, profile) for sid, profile, _ in pending if isinstance(profile, InvalidProfile)]
+    pending = [row for row in pending if not isinstance(row[1], InvalidProfile)]
+    total = len(invalid) + len(pending)
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    limiter = RateLimiter(requests_per_minute)
+    summary = {"total": len(profiles), "skipped": len(profiles) - total, "ok": 0, "error": 0}
+    started = time.monotonic()
+
+    def write(output, record, done):
+        # Ditulis dan di-flush per siswa agar hasil tidak hilang jika proses mati
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        os.fsync(output.fileno())
+        if on_result:
+            on_result(record, done, total)
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        # Dikunci per baris, bukan per ID: ID ganda tetap mendapat nama dan file PDF masing-masing
+        futures = {
+            executor.submit(recommend_student, profile, limiter, max_retries): (sid, profile["nama"], pdf_name)
+            for sid, profile, pdf_name in pending
+        }
+        for done, (sid, profile) in enumerate(invalid, start=1):
+            summary["error"] += 1
+            write(output, {
+                "id": sid, "status": "error", "column": profile.column, "line": profile.line,
+                "error": describe_invalid(profile),
+            }, done)
+        for done, future in enumerate(as_completed(futures), start=len(invalid) + 1):
+            sid, nama, pdf_name = futures[future]
+            record = {"id": sid}
+            try:
+                profil, hasil, backend = future.result()
+                record.update(
+                    status="ok", nama=nama, profil=profil, rekomendasi=hasil.to_dicts(), backend=backend,
+                )
+                if pdf_dir:
+                    pdf_path = os.path.join(pdf_dir, f"{pdf_name}.pdf")
+                    with open(pdf_path, "wb") as pdf_file:
+                        pdf_file.write(render_pdf(profil, hasil, nama))
+                    record["pdf"] = pdf_path
+                summary["ok"] += 1
+            except Exception as e:
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+                summary["error"] += 1
+            write(output, record, done)
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["students_per_minute"] = round(summary["ok"] / elapsed * 60, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def run_batch_job(payload, job):
+    """Worker antrean: memproses satu file unggahan di background agar tidak terputus saat halaman di-rerun."""
+    def on_result(record, done, total):
+        job.report(progress=f"{done}/{total} siswa diproses ({record['id']}: {record['status']})")
+
+    return run_batch(
+        load_profiles(payload["input_path"]), payload["output_path"], workers=payload["workers"],
+        requests_per_minute=payload["rpm"], on_result=on_result,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rekomendasi jurusan & kampus massal dari file CSV/JSONL.")
+    parser.add_argument("input", help="File CSV atau JSONL berisi profil siswa (satu siswa per baris)")
+    parser.add_argument("--output", default="hasil_rekomendasi.jsonl", help="File JSONL hasil (dilanjutkan jika sudah ada)")
+    parser.add_argument("--pdf-dir", default="pdf_rekomendasi", help="Folder PDF per siswa; kosongkan untuk melewati PDF")
+    parser.add_argument("--class-pdf", help="Tulis satu PDF gabungan untuk seluruh siswa yang berhasil")
+    parser.add_argument("--class-zip", help="Tulis ZIP berisi PDF per siswa yang berhasil")
+    parser.add_argument("--workers", type=int, default=4, help="Jumlah permintaan paralel")
+    parser.add_argument("--rpm", type=int, default=60, help="Batas permintaan per menit ke OpenAI")
+    parser.add_argument("--max-retries", type=int, default=4, help="Jumlah percobaan ulang per siswa")
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.input)
+
+    def report(record, done, total):
+        print(f"[{done}/{total}] {record['id']}: {record['status']}")
+
+    summary = run_batch(
+        profiles, args.output, pdf_dir=args.pdf_dir or None, workers=args.workers,
+        requests_per_minute=args.rpm, max_retries=args.max_retries, on_result=report,
+    )
+    print(
+        f"Selesai: {summary['ok']} berhasil, {summary['error']} gagal, {summary['skipped']} dilewati "
+        f"dalam {summary['elapsed_seconds']} detik ({summary['students_per_minute']} siswa/menit)."
+    )
+    if args.class_pdf:
+        pages = render_class_pdf(iter_class_reports(args.output), args.class_pdf)
+        print(f"PDF kelas ({pages} halaman) ditulis ke {args.class_pdf}.")
+    if args.class_zip:
+        pages = render_class_zip(iter_class_reports(args.output), args.class_zip)
+        print(f"ZIP PDF per siswa ({pages} halaman) ditulis ke {args.class_zip}.")
+
+
+if __name__ == "__main__":
+    main()
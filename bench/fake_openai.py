@@ -0,0 +1,184 @@
+"""Server tiruan yang kompatibel dengan API OpenAI untuk benchmark dan uji beban lokal.
+
+Melayani /v1/models, /v1/chat/completions (biasa & streaming SSE) dan
+/v1/audio/speech dengan latensi dan kecepatan token yang bisa diatur:
+
+    python bench/fake_openai.py --port 18080 --latency 0.8 --tokens-per-second 40
+
+Lalu arahkan aplikasi ke server ini dengan OPENAI_BASE_URL=http://127.0.0.1:18080/v1.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Jawaban tetap dalam format JSON Lines yang diminta pilih_kampus_tts.py
+DEFAULT_ROWS = [
+    {"kampus": "Universitas Indonesia", "jurusan": "Ilmu Komputer", "peluang_diterima": 65,
+     "alasan": "Sesuai minat teknologi dan nilai matematika yang kuat."},
+    {"kampus": "Institut Teknologi Bandung", "jurusan": "Teknik Informatika", "peluang_diterima": 40,
+     "alasan": "Kurikulum pemrograman kuat, persaingan masuk tinggi."},
+    {"kampus": "Universitas Gadjah Mada", "jurusan": "Sistem Informasi", "peluang_diterima": 55,
+     "alasan": "Memadukan teknologi dan bisnis sesuai preferensi kerja tim."},
+]
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency=0.5, tokens_per_second=50.0, tts_latency=0.3, audio_bytes=48_000):
+        self.latency = latency                      # detik sebelum token pertama
+        self.tokens_per_second = tokens_per_second  # kecepatan token setelah token pertama
+        self.tts_latency = tts_latency              # detik sebelum audio dikirim
+        self.audio_bytes = audio_bytes              # ukuran audio mp3 tiruan
+        self.stats = {"chat": 0, "chat_stream": 0, "speech": 0}
+        # Jumlah permintaan chat per (model, isi pesan user), untuk memeriksa panggilan ganda
+        self.chat_prompts = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+            return sum(self.stats.values())
+
+    def record_prompt(self, body):
+        prompts = tuple(str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "user")
+        with self._lock:
+            self.chat_prompts[(body.get("model"), prompts)] += 1
+
+    def reset_prompts(self):
+        with self._lock:
+            self.chat_prompts.clear()
+
+    def content(self, request_number):
+        # Peluang diterima sedikit berbeda per permintaan agar PDF & audio tidak selalu kena cache
+        rows = [dict(row, peluang_diterima=(row["peluang_diterima"] + request_number) % 90 + 5) for row in DEFAULT_ROWS]
+        return "\n".join(json.dumps(row, ensure_ascii=False) for row in rows)
+
+
+def _tokens(text):
+    # Perkiraan kasar: satu kata (beserta spasinya) dianggap satu token
+    tokens, current = [], ""
+    for ch in text:
+        current += ch
+        if ch in " \n":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def make_handler(config):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, payload):
+            self._send(200, json.dumps(payload).encode("utf-8"))
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._json({"object": "list", "data": [
+                    {"id": "gpt-4", "object": "model", "created": 0, "owned_by": "bench"},
+                ]})
+            else:
+                self._send(404, b"{}")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.endswith("/audio/speech"):
+                self._speech()
+            elif self.path.endswith("/chat/completions"):
+                self._chat(body)
+            else:
+                self._send(404, b"{}")
+
+        def _speech(self):
+            config.count("speech")
+            time.sleep(config.tts_latency)
+            self._send(200, b"ID3" + b"\0" * max(0, config.audio_bytes - 3), "audio/mpeg")
+
+        def _usage(self, body, tokens):
+            prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+            prompt_tokens = len(_tokens(prompt))
+            return {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens)}
+
+        def _chat(self, body):
+            config.record_prompt(body)
+            content = config.content(config.count("chat_stream" if body.get("stream") else "chat"))
+            tokens = _tokens(content)
+            delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+            time.sleep(config.latency)
+            base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "gpt-4")}
+            if not body.get("stream"):
+                time.sleep(delay * len(tokens))
+                self._json({**base, "object": "chat.completion", "choices": [{
+                    "index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop",
+                }], "usage": self._usage(body, tokens)})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(delay)
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "delta": {"content": token}, "finish_reason": None,
+                }]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            if (body.get("stream_options") or {}).get("include_usage"):
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [], "usage": self._usage(body, tokens)}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return FakeOpenAIHandler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Menjalankan server di thread background; mengembalikan (server, base_url)."""
+    config = config or FakeOpenAIConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server tiruan API OpenAI untuk benchmark.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.5, help="Detik sebelum token pertama")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--audio-bytes", type=int, default=48_000)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.latency, args.tokens_per_second, args.tts_latency, args.audio_bytes)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Server tiruan OpenAI berjalan di http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Uji beban headless: N pengguna simulasi menjalankan alur main() secara bersamaan.
+
+Setiap pengguna adalah satu sesi Streamlit AppTest (session_state sendiri) di
+proses yang sama, seperti sesi-sesi pada satu server Streamlit. Panggilan
+OpenAI diarahkan ke server tiruan lokal (bench/fake_openai.py) dan cache
+rekomendasi dimatikan agar setiap sesi benar-benar memanggil API.
+
+    python bench/load_test.py --users 40 --concurrency 8
+    python bench/load_test.py --apps pilih_kampus_tts.py --baseline bench/results/<file>.json
+
+Hasil disimpan sebagai JSON di bench/results/ agar bisa dibandingkan antar versi.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from fake_openai import FakeOpenAIConfig, start_server
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+APPS = ["app.py", "app_ori.py", "pilih_kampus_tts.py"]
+# Tahap dari tracing.py yang dilaporkan sebagai biaya PDF/TTS
+COST_STAGES = ["call_openai_api", "render_pdf", "save_as_pdf", "tts_synthesize", "job_rekomendasi", "job_suara"]
+# Interval rerun AppTest saat menunggu pekerjaan background (meniru polling halaman)
+POLL_INTERVAL_SECONDS = 0.05
+# AppTest sesekali kehilangan klik tombol saat banyak sesi berjalan bersamaan; klik diulang
+CLICK_ATTEMPTS = 3
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))], 4)
+
+
+def _latency_summary(values):
+    return {
+        "mean_s": round(sum(values) / len(values), 4) if values else None,
+        "p50_s": _percentile(values, 0.50),
+        "p95_s": _percentile(values, 0.95),
+        "p99_s": _percentile(values, 0.99),
+        "max_s": round(max(values), 4) if values else None,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+_compile_lock = threading.Lock()
+
+
+def _serialize_script_compilation():
+    """Kompilasi script AppTest dijalankan satu per satu.
+
+    Setiap AppTest mem-parse script-nya sendiri, dan ast.parse yang berjalan
+    bersamaan di beberapa thread bisa gagal di CPython 3.11 ("AST constructor
+    recursion depth mismatch"). Eksekusi script tetap berjalan paralel.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original = ScriptCache.get_bytecode
+    if getattr(original, "_serialized", False):
+        return
+
+    def get_bytecode(self, script_path):
+        with _compile_lock:
+            return original(self, script_path)
+
+    get_bytecode._serialized = True
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def _share_apptest_globals():
+    """Status global AppTest tetap tersedia selama sesi lain masih berjalan.
+
+    Setiap `AppTest.run()` memasang Runtime tiruan dan opsi `global.appTest`
+    secara global lalu mengembalikannya di akhir run, sehingga sesi yang
+    berjalan bersamaan bisa gagal ("Runtime hasn't been created!" atau
+    KeyError saat membaca widget). Opsi dipasang permanen dan Runtime terakhir
+    dipakai sebagai cadangan.
+    """
+    from streamlit import config
+    from streamlit.runtime.runtime import Runtime
+
+    config.set_option("global.appTest", True)
+    if getattr(Runtime.instance, "_shared", False):
+        return
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    instance._shared = True
+    Runtime.instance = classmethod(instance)
+
+
+def _wait_until(at, condition, timeout):
+    """Me-rerun sesi berkala sampai `condition(at)` terpenuhi, seperti fragment polling di browser."""
+    deadline = time.perf_counter() + timeout
+    while not condition(at):
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Pekerjaan background tidak selesai dalam batas waktu")
+        time.sleep(POLL_INTERVAL_SECONDS)
+        at.run()
+
+
+def _submitted(at):
+    """Klik tombol rekomendasi benar-benar diproses: pekerjaan dibuat atau hasil sudah tampil."""
+    return "job_id" in at.session_state or len(at.success) > 0
+
+
+def _job_loaded(at):
+    return "job_id" not in at.session_state or at.session_state["loaded_job_id"] == at.session_state["job_id"]
+
+
+def run_session(app, user_id, play_speech, timeout):
+    """Menjalankan satu sesi: render awal, isi nama, klik tombol rekomendasi (dan putar suara)."""
+    from streamlit.testing.v1 import AppTest
+
+    result = {"user": user_id}
+    started = time.perf_counter()
+    at = AppTest.from_file(os.path.join(REPO_DIR, app), default_timeout=timeout).run()
+    result["first_render_s"] = time.perf_counter() - started
+
+    # Nama saja tidak sampai ke prompt (isian kosmetik), jadi domisili juga dibedakan per pengguna:
+    # setiap sesi punya profil sendiri dan benar-benar memanggil API, bukan digabung dengan sesi lain
+    at.text_input[0].input(f"Siswa Benchmark {user_id}")
+    next(w for w in at.text_input if w.label == "Kota/Kabupaten Domisili").input(f"Kota Benchmark {user_id}")
+    started = time.perf_counter()
+    for _ in range(CLICK_ATTEMPTS):
+        at.button[0].click().run()
+        if _submitted(at):
+            break
+    else:
+        result["errors"] = ["Klik tombol rekomendasi tidak diproses"]
+        return at, result
+    # pilih_kampus_tts.py memproses rekomendasi di antrean background; tunggu hasilnya dimuat
+    _wait_until(at, _job_loaded, timeout)
+    result["submit_s"] = time.perf_counter() - started
+
+    if app == "pilih_kampus_tts.py" and at.session_state["hasil"]:
+        # PDF di aplikasi ini dibuat saat tombol unduh ditekan; panggil seperti yang dilakukan tombol itu
+        from pdf_report import get_pdf_bytes
+        hasil = at.session_state["hasil"]
+        started = time.perf_counter()
+        result["pdf_bytes"] = len(get_pdf_bytes(hasil.profil_text, hasil.recommendation))
+        result["pdf_s"] = time.perf_counter() - started
+        if play_speech:
+            started = time.perf_counter()
+            for _ in range(CLICK_ATTEMPTS):
+                at.button(key="btn_putar_suara").click().run()
+                if at.session_state["play_voice"]:
+                    break
+            _wait_until(at, lambda a: len(a.get("audio")) > 0 or len(a.error) > 0, timeout)
+            result["speech_s"] = time.perf_counter() - started
+
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    if errors:
+        result["errors"] = errors
+    return at, result
+
+
+def measure_memory(app, sessions, play_speech, timeout):
+    """Rata-rata memori Python yang tetap terpakai per sesi (tracemalloc), diukur berurutan."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    alive = []
+    for i in range(sessions):
+        at, _ = run_session(app, f"mem-{i}", play_speech, timeout)
+        alive.append(at) # Sesi tetap hidup, seperti pengguna yang masih membuka tab
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "retained_bytes_per_session": int((current - baseline) / sessions),
+        "peak_bytes": peak - baseline,
+    }
+
+
+def upstream_summary(chat_prompts, profiles):
+    """Panggilan chat ke server tiruan dibandingkan dengan jumlah profil berbeda yang dikirim.
+
+    Setiap profil harus menghasilkan tepat satu permintaan pertama dengan prompt sendiri (tidak
+    tergabung/ter-cache dengan sesi lain). Permintaan lanjutan (penyempurnaan) dihitung terpisah,
+    dan percakapan yang sama tidak boleh dikirim dua kali ke model yang sama.
+    """
+    first = {key: count for key, count in chat_prompts.items() if len(key[1]) == 1}
+    profile_requests = sum(first.values())
+    distinct_prompts = len({prompts[0] for _, prompts in first})
+    duplicates = sum(count - 1 for count in chat_prompts.values())
+    return {
+        "chat_requests": sum(chat_prompts.values()),
+        "profile_requests": profile_requests,
+        "followup_requests": sum(chat_prompts.values()) - profile_requests,
+        "distinct_profiles": profiles,
+        "distinct_prompts": distinct_prompts,
+        "duplicate_requests": duplicates,
+        "ok": profile_requests == distinct_prompts == profiles and duplicates == 0,
+    }
+
+
+def benchmark_app(app, users, concurrency, play_speech, memory_sessions, timeout, server_config):
+    from tracing import tracer
+
+    # Pemanasan: impor modul, pembuatan klien, health check, dan indeks jurusan tidak ikut diukur
+    run_session(app, "warmup", play_speech, timeout)
+    tracer.reset()
+    server_config.reset_prompts()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        sessions = list(executor.map(lambda i: run_session(app, i, play_speech, timeout)[1], range(users)))
+    wall = time.perf_counter() - started
+
+    errors = [s for s in sessions if s.get("errors")]
+    stages = {s["stage"]: s for s in tracer.stage_summary() if s["stage"] in COST_STAGES}
+    tokens = {
+        c["kind"]: c["value"] for c in tracer.counters()
+        if c["name"] == "tokens_total" and c.get("stage") == "call_openai_api"
+    }
+    report = {
+        "users": users,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_users_per_s": round(users / wall, 3),
+        "error_sessions": len(errors),
+        "first_render": _latency_summary([s["first_render_s"] for s in sessions]),
+        "submit": _latency_summary([s["submit_s"] for s in sessions if "submit_s" in s]),
+        "stages_ms": stages,
+        "tokens": tokens,
+        "upstream": upstream_summary(dict(server_config.chat_prompts), users - len(errors)),
+    }
+    if any("pdf_s" in s for s in sessions):
+        report["pdf_download"] = _latency_summary([s["pdf_s"] for s in sessions if "pdf_s" in s])
+        report["pdf_bytes"] = max(s["pdf_bytes"] for s in sessions if "pdf_bytes" in s)
+    if any("speech_s" in s for s in sessions):
+        report["speech_playback"] = _latency_summary([s["speech_s"] for s in sessions if "speech_s" in s])
+    if errors:
+        report["first_errors"] = errors[0]["errors"][:3]
+    if memory_sessions:
+        report["memory"] = measure_memory(app, memory_sessions, play_speech, timeout)
+    return report
+
+
+def _fmt(value, scale=1.0, digits=3):
+    return "-" if value is None else f"{value * scale:.{digits}f}"
+
+
+def print_report(results, baseline=None):
+    base_apps = (baseline or {}).get("apps", {})
+    print(f"\n{'aplikasi':<22}{'user/s':>9}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}{'KB/sesi':>10}{'error':>7}")
+    for app, report in results["apps"].items():
+        memory = report.get("memory", {}).get("retained_bytes_per_session")
+        print(
+            f"{app:<22}{report['throughput_users_per_s']:>9.2f}{_fmt(report['submit']['p50_s']):>10}"
+            f"{_fmt(report['submit']['p95_s']):>10}{_fmt(report['submit']['p99_s']):>10}"
+            f"{_fmt(memory, 1 / 1024, 0):>10}{report['error_sessions']:>7}"
+        )
+        base = base_apps.get(app)
+        if base:
+            throughput_delta = report["throughput_users_per_s"] / base["throughput_users_per_s"] - 1
+            p95_delta = report["submit"]["p95_s"] / base["submit"]["p95_s"] - 1
+            print(f"{'  vs ' + baseline['git_revision']:<22}{throughput_delta:>+9.1%}{'':>10}{p95_delta:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban aplikasi Pilih Kampus dengan server OpenAI tiruan.")
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS)
+    parser.add_argument("--users", type=int, default=20, help="Jumlah pengguna simulasi per aplikasi")
+    parser.add_argument("--concurrency", type=int, default=5, help="Jumlah sesi yang berjalan bersamaan")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latensi token pertama server tiruan (detik)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--no-speech", action="store_true", help="Jangan menekan tombol putar suara")
+    parser.add_argument("--memory-sessions", type=int, default=3,
+                        help="Jumlah sesi untuk mengukur memori per sesi (0 = lewati)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Batas waktu satu rerun AppTest (detik)")
+    parser.add_argument("--baseline", help="File hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--output", help="Lokasi file hasil (default: bench/results/<waktu>-<revisi>.json)")
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.latency, args.tokens_per_second, args.tts_latency)
+    server, base_url = start_server(config)
+    # Diatur sebelum modul aplikasi diimpor, karena konfigurasi dibaca saat impor/pembuatan klien
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "bench",
+        "PILIH_KAMPUS_CACHE": "0",
+        "PILIH_KAMPUS_OFFLINE": "0",
+        "PILIH_KAMPUS_JOBS_DB": os.path.join(tempfile.mkdtemp(prefix="pilih-kampus-bench-"), "jobs.sqlite3"),
+    })
+    os.environ.pop("PILIH_KAMPUS_TRACE_LOG", None)
+    sys.path.insert(0, REPO_DIR)
+    _serialize_script_compilation()
+    _share_apptest_globals()
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "output")},
+        "apps": {},
+    }
+    for app in args.apps:
+        print(f"Menjalankan {app}: {args.users} pengguna, {args.concurrency} bersamaan...")
+        results["apps"][app] = benchmark_app(
+            app, args.users, args.concurrency, not args.no_speech, args.memory_sessions, args.timeout, config
+        )
+    results["fake_server_requests"] = dict(config.stats)
+    server.shutdown()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{results['git_revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print(f"\nHasil disimpan ke {output}")
+    failed = [app for app, report in results["apps"].items() if not report["upstream"]["ok"]]
+    if failed:
+        for app in failed:
+            print(f"Panggilan ke API tidak sesuai jumlah profil untuk {app}: {results['apps'][app]['upstream']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark pembuatan laporan PDF: halaman per detik untuk satu kelas siswa.
+
+Rekomendasi dibuat dari katalog lokal (tanpa OpenAI) untuk profil siswa
+sintetis, lalu dirender dengan beberapa cara:
+
+- `fpdf_per_dokumen`: cara lama sebagai pembanding (FPDF baru + font Arial per
+  dokumen, teks mentah; teks diturunkan ke Latin-1 karena cara lama gagal pada
+  karakter di luar Latin-1).
+- `per_siswa`: `render_pdf` per siswa dengan mesin laporan bersama.
+- `kelas_pdf`: satu PDF gabungan untuk seluruh kelas.
+- `kelas_zip`: ZIP berisi satu PDF per siswa.
+
+    python bench/pdf_benchmark.py --students 40 --repeat 3
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from campus_catalog import offline_recommendation, rank_candidates # noqa: E402
+from pdf_report import ( # noqa: E402
+    ReportEngine, StudentReport, get_report_engine, render_class_pdf, render_class_zip, render_pdf,
+)
+from recommendation_schema import HasilRekomendasi, Rekomendasi # noqa: E402
+
+KARIER = ["Teknologi", "Kesehatan", "Bisnis", "Sosial", "Seni"]
+MAPEL = ["Matematika", "Fisika", "Kimia", "Biologi", "Ekonomi", "Sosiologi", "Sejarah", "Bahasa Inggris"]
+NAMA = ["Budi Santoso", "Siti Nurhaliza", "Ni Luh Putu Ayu", "Andrés Wijaya", "Çelik Pratama", "Dewi “Ade” Lestari"]
+# Alasan dengan karakter yang sering muncul di jawaban model: kutip tipografis, tanda pisah, emoji
+ALASAN = (
+    "Sesuai dengan minat pada {mapel} dan tujuan karier di bidang {karier} — peluang diterima "
+    "cukup baik untuk nilai rapor {nilai}. Kampus ini dikenal “unggul” dalam riset terapan 🎓."
+)
+
+
+def build_class(students):
+    reports = []
+    for i in range(students):
+        form = {
+            "nama": f"{NAMA[i % len(NAMA)]} {i + 1}", "jurusan_sma": "IPA" if i % 2 else "IPS",
+            "nilai_rapor": 70 + (i * 7) % 30, "karier": KARIER[i % len(KARIER)],
+            "mata_pelajaran": [MAPEL[i % len(MAPEL)], MAPEL[(i + 3) % len(MAPEL)]],
+            "pendapatan": "Rp3-5 juta", "jenis_kampus": "Negeri", "faktor_kampus": ["Akreditasi", "Biaya"],
+        }
+        hasil = offline_recommendation(rank_candidates(form))
+        alasan = ALASAN.format(mapel=form["mata_pelajaran"][0], karier=form["karier"], nilai=form["nilai_rapor"])
+        hasil = HasilRekomendasi(tuple(Rekomendasi(r.kampus, r.jurusan, r.peluang_diterima, alasan) for r in hasil))
+        profil = (
+            f"**Nama:** {form['nama']}\n**Jurusan SMA:** {form['jurusan_sma']}\n"
+            f"**Nilai Rapor:** {form['nilai_rapor']}\n**Minat:** {', '.join(form['mata_pelajaran'])}\n"
+            f"**Karier:** {form['karier']}"
+        )
+        reports.append(StudentReport(f"siswa_{i + 1:03d}", form["nama"], profil, hasil))
+    return reports
+
+
+def legacy_render(profil, rekomendasi):
+    """Salinan renderer sebelum mesin laporan: FPDF baru dan font diatur ulang untuk setiap dokumen."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", style='B', size=16)
+    pdf.cell(200, 10, "Hasil Rekomendasi Jurusan & Kampus", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 10, f"Profil Pengguna:\n{profil}\n")
+    pdf.ln(5)
+    pdf.set_font("Arial", style='B', size=14)
+    pdf.cell(0, 10, "Rekomendasi:", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 10, rekomendasi)
+    return pdf.output(dest="S").encode("latin-1"), pdf.page
+
+
+def run_legacy(reports):
+    latin1 = ReportEngine(font_dir=os.devnull) # Hanya untuk menurunkan teks ke Latin-1
+    pages = 0
+    for report in reports:
+        teks = "\n".join(f"{r.kampus} - {r.jurusan} ({r.peluang_text}%)\n{r.alasan}" for r in report.rekomendasi)
+        pages += legacy_render(latin1.clean(report.profil), latin1.clean(teks))[1]
+    return pages
+
+
+def run_per_student(reports):
+    engine = get_report_engine()
+    return sum(engine.render(report.profil, report.rekomendasi, report.nama)[1] for report in reports)
+
+
+MODES = {
+    "fpdf_per_dokumen": run_legacy,
+    "per_siswa": run_per_student,
+    "kelas_pdf": lambda reports: render_class_pdf(iter(reports), io.BytesIO()),
+    "kelas_zip": lambda reports: render_class_zip(iter(reports), io.BytesIO()),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark halaman PDF per detik untuk laporan satu kelas.")
+    parser.add_argument("--students", type=int, default=40, help="Jumlah siswa dalam satu kelas")
+    parser.add_argument("--repeat", type=int, default=3, help="Jumlah pengulangan; yang tercepat dilaporkan")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    reports = build_class(args.students)
+    started = time.perf_counter()
+    render_pdf("pemanasan", reports[0].rekomendasi) # Memuat fpdf dan font sekali, seperti di server yang sudah berjalan
+    print(f"Memuat mesin laporan (font, sekali per proses): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"\n{'mode':<18} {'halaman':>8} {'terbaik (s)':>12} {'halaman/s':>10}")
+    for mode in args.modes:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            pages = MODES[mode](reports)
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        print(f"{mode:<18} {pages:>8} {best:>12.3f} {pages / best:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
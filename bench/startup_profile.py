@@ -0,0 +1,111 @@
+"""Profil waktu startup: biaya impor modul dan render formulir pertama saat OpenAI tidak bisa dihubungi.
+
+Setiap pengukuran dijalankan di proses Python baru (cold start), seperti saat
+server Streamlit baru dinyalakan:
+
+1. `python -X importtime -c "import <aplikasi>"`: total waktu impor dan modul
+   tingkat atas yang paling mahal.
+2. Render pertama lewat Streamlit AppTest dengan OPENAI_BASE_URL diarahkan ke
+   alamat yang tidak bisa dijangkau, untuk memastikan formulir tidak menunggu
+   jaringan.
+
+    python bench/startup_profile.py
+    python bench/startup_profile.py --apps pilih_kampus_tts.py --max-render-seconds 1.0
+
+Keluar dengan kode 1 jika render pertama melebihi --max-render-seconds.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APPS = ["app.py", "app_ori.py", "pilih_kampus_tts.py"]
+# Alamat yang tidak dapat dirutekan: koneksi menggantung sampai timeout, seperti jaringan yang terputus
+UNREACHABLE_BASE_URL = "http://10.255.255.1:9/v1"
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Dijalankan di proses terpisah; mencetak durasi render pertama (detik) di baris terakhir
+_RENDER_SCRIPT = """
+import sys, time
+sys.path.insert(0, {repo!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=120)
+started = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - started
+errors = [str(e.value) for e in at.exception]
+print("ERROR " + errors[0] if errors else "OK", len(at.text_input))
+print(elapsed)
+"""
+
+
+def _env(jobs_dir):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "startup-profile"),
+        "OPENAI_BASE_URL": UNREACHABLE_BASE_URL,
+        "PILIH_KAMPUS_JOBS_DB": os.path.join(jobs_dir, "jobs.sqlite3"),
+        "PILIH_KAMPUS_CACHE_DB": os.path.join(jobs_dir, "cache.sqlite3"),
+    })
+    env.pop("PILIH_KAMPUS_OFFLINE", None)
+    return env
+
+
+def profile_imports(app, env, top):
+    """Total waktu impor (ms) dan `top` modul tingkat atas termahal (waktu kumulatif)."""
+    module = os.path.splitext(app)[0]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            rows.append((int(match.group(2)) / 1000.0, len(match.group(3)), match.group(4)))
+    total = next((ms for ms, _, name in rows if name == module), 0.0)
+    # Kedalaman indentasi 3 = modul yang diimpor langsung oleh aplikasi
+    direct = sorted(((ms, name) for ms, depth, name in rows if depth == 3), reverse=True)
+    return total, direct[:top]
+
+
+def profile_first_render(app, env):
+    proc = subprocess.run(
+        [sys.executable, "-c", _RENDER_SCRIPT.format(repo=REPO_DIR, path=os.path.join(REPO_DIR, app))],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    status, seconds = proc.stdout.strip().splitlines()[-2:]
+    return float(seconds), status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS)
+    parser.add_argument("--top", type=int, default=8, help="Jumlah modul termahal yang ditampilkan")
+    parser.add_argument("--max-render-seconds", type=float, default=1.0,
+                        help="Batas waktu render pertama (detik)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="pilih-kampus-startup-") as jobs_dir:
+        env = _env(jobs_dir)
+        for app in args.apps:
+            total, heaviest = profile_imports(app, env, args.top)
+            seconds, status = profile_first_render(app, env)
+            slow = seconds > args.max_render_seconds
+            failed = failed or slow or not status.startswith("OK")
+            print(f"\n{app}")
+            print(f"  impor modul      : {total:8.1f} ms")
+            print(f"  render pertama   : {seconds * 1000:8.1f} ms  ({status}){'  << melebihi batas' if slow else ''}")
+            for ms, name in heaviest:
+                print(f"    {ms:8.1f} ms  {name}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
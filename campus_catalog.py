@@ -0,0 +1,226 @@
+"""Katalog lokal kampus x jurusan dan mesin pra-peringkat (pre-ranking) yang deterministik.
+
+Data di `data/katalog_kampus.csv` berisi perkiraan ilustratif (nilai minimal
+rapor, biaya per semester, akreditasi, dll.) dan sebaiknya diperbarui dengan
+data resmi. Katalog dimuat sekali per proses ke array NumPy kolumnar sehingga
+skor seluruh baris dihitung sekaligus dalam hitungan milidetik, tanpa jaringan.
+"""
+import csv
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from recommendation_schema import HasilRekomendasi, Rekomendasi
+
+CATALOG_PATH = os.getenv(
+    "PILIH_KAMPUS_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "katalog_kampus.csv"),
+)
+TOP_K = int(os.getenv("PILIH_KAMPUS_TOP_K", "8"))
+
+# Kosakata tetap, sama dengan pilihan pada formulir
+MATA_PELAJARAN = [
+    "Matematika", "Fisika", "Kimia", "Biologi", "Ekonomi", "Sosiologi", "Sejarah",
+    "Bahasa Inggris", "Seni dan Desain", "Teknologi Informasi",
+]
+AKREDITASI_SKOR = {"Unggul": 1.0, "Baik Sekali": 0.75, "Baik": 0.5}
+# Perkiraan biaya kuliah per semester (juta Rp) yang masih terjangkau per kelompok pendapatan
+ANGGARAN_PER_PENDAPATAN = {"< Rp3 juta": 6.0, "Rp3-5 juta": 12.0, "Rp5-10 juta": 25.0, "> Rp10 juta": 80.0}
+# Urutan kolom atribut karier, dipasangkan dengan slider tingkat kepentingan 1-5
+ATRIBUT_KARIER = ["gaji", "stabilitas", "luar_negeri", "fleksibilitas"]
+SLIDER_KARIER = ["gaji_tinggi", "stabilitas_pekerjaan", "kesempatan_luar_negeri", "fleksibilitas_karier"]
+# Kata administratif yang diabaikan saat mencocokkan domisili dengan kota kampus
+KATA_WILAYAH = frozenset({"kota", "kabupaten", "kab", "provinsi", "dki", "daerah", "istimewa", "di"})
+# Nama sehari-hari untuk kota di katalog
+ALIAS_KOTA = {"solo": "surakarta", "jogja": "yogyakarta", "yogya": "yogyakarta", "jogjakarta": "yogyakarta"}
+
+
+def city_tokens(name):
+    """Kata-kata nama kota yang sudah dinormalkan, mis. "Kota Jakarta Selatan" -> {"jakarta", "selatan"}."""
+    words = re.findall(r"[a-z]+", (name or "").lower())
+    return frozenset(ALIAS_KOTA.get(word, word) for word in words if word not in KATA_WILAYAH)
+
+
+@dataclass(frozen=True)
+class Kandidat:
+    __slots__ = (
+        "kampus", "jurusan", "kota", "jenis_kampus", "akreditasi", "biaya_semester_juta", "bidang_karier", "skor",
+        "peluang_diterima",
+    )
+
+    kampus: str
+    jurusan: str
+    kota: str
+    jenis_kampus: str
+    akreditasi: str
+    biaya_semester_juta: float
+    bidang_karier: str
+    skor: float
+    peluang_diterima: float
+
+
+class CampusCatalog:
+    """Katalog kampus x jurusan dalam bentuk array kolumnar."""
+
+    def __init__(self, rows):
+        self.kampus = np.array([r["kampus"] for r in rows], dtype=object)
+        self.jurusan = np.array([r["jurusan"] for r in rows], dtype=object)
+        self.kota = np.array([r["kota"] for r in rows], dtype=object)
+        self.kota_tokens = [city_tokens(r["kota"]) for r in rows]
+        self.jenis_kampus = np.array([r["jenis_kampus"] for r in rows], dtype=object)
+        self.akreditasi = np.array([r["akreditasi"] for r in rows], dtype=object)
+        self.akreditasi_skor = np.array([AKREDITASI_SKOR.get(r["akreditasi"], 0.5) for r in rows])
+        self.bidang_karier = np.array([r["bidang_karier"] for r in rows], dtype=object)
+        self.jurusan_sma = np.array([r["jurusan_sma"] for r in rows], dtype=object)
+        self.lingkungan_kerja = np.array([r["lingkungan_kerja"] for r in rows], dtype=object)
+        self.nilai_minimal = np.array([float(r["nilai_minimal"]) for r in rows])
+        self.biaya = np.array([float(r["biaya_semester_juta"]) for r in rows])
+        # Atribut skala 1-5 dinormalkan ke 0-1
+        self.atribut_karier = (np.array([[float(r[a]) for a in ATRIBUT_KARIER] for r in rows]) - 1) / 4
+        self.beasiswa = (np.array([float(r["beasiswa"]) for r in rows]) - 1) / 4
+        self.fasilitas = (np.array([float(r["fasilitas"]) for r in rows]) - 1) / 4
+        mapel_index = {name: i for i, name in enumerate(MATA_PELAJARAN)}
+        self.mapel = np.zeros((len(rows), len(MATA_PELAJARAN)), dtype=np.float64)
+        for i, r in enumerate(rows):
+            for name in r["mata_pelajaran"].split(";"):
+                if name.strip() in mapel_index:
+                    self.mapel[i, mapel_index[name.strip()]] = 1.0
+
+    @classmethod
+    def from_csv(cls, path=CATALOG_PATH):
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.kampus)
+
+    def admission_chance(self, nilai_rapor):
+        """Perkiraan peluang diterima (%) dari selisih nilai rapor terhadap nilai minimal."""
+        margin = float(nilai_rapor) - self.nilai_minimal
+        return np.clip(100.0 / (1.0 + np.exp(-margin / 3.0)), 5.0, 95.0)
+
+    def score(self, form, major_similarity=None):
+        """Menghitung skor kecocokan seluruh baris katalog sekaligus (vektorisasi NumPy).
+
+        `major_similarity` opsional berisi {jurusan: skor cosine} dari indeks deskripsi jurusan.
+        """
+        # Bobot minat: semakin penting kesesuaian minat pribadi, semakin besar bobot bidang & mapel
+        bobot_minat = 0.5 + form.get("hobi_minat", 3) / 5.0
+        skor = 3.0 * bobot_minat * (self.bidang_karier == form.get("karier"))
+
+        mapel_dipilih = np.array([name in form.get("mata_pelajaran", []) for name in MATA_PELAJARAN], dtype=np.float64)
+        skor += 0.8 * bobot_minat * (self.mapel @ mapel_dipilih)
+
+        # Jurusan SMA yang tidak linier diberi penalti, kecuali jurusan terbuka untuk semua
+        sma_cocok = (self.jurusan_sma == "Semua") | (self.jurusan_sma == form.get("jurusan_sma"))
+        skor += np.where(sma_cocok, 0.5, -2.5)
+
+        if major_similarity:
+            kemiripan = np.fromiter((major_similarity.get(j, 0.0) for j in self.jurusan), dtype=np.float64, count=len(self))
+            skor += 3.0 * kemiripan
+
+        skor += 0.5 * (self.lingkungan_kerja == form.get("lingkungan_kerja"))
+        skor += 1.0 * (self.jenis_kampus == form.get("jenis_kampus"))
+
+        # Slider 1-5 menjadi bobot preferensi terhadap atribut karier jurusan
+        bobot_karier = np.array([form.get(name, 3) for name in SLIDER_KARIER], dtype=np.float64) / 5.0
+        skor += 1.5 * (self.atribut_karier @ bobot_karier)
+
+        anggaran = ANGGARAN_PER_PENDAPATAN.get(form.get("pendapatan"), 12.0)
+        kelebihan_biaya = np.clip((self.biaya - anggaran) / anggaran, 0.0, 3.0)
+        skor -= 1.0 * kelebihan_biaya
+
+        faktor = form.get("faktor_kampus", [])
+        if "Akreditasi" in faktor:
+            skor += 1.0 * self.akreditasi_skor
+        if "Biaya" in faktor:
+            skor -= 1.0 * kelebihan_biaya
+        if "Beasiswa" in faktor:
+            skor += 1.0 * self.beasiswa
+        if "Fasilitas" in faktor:
+            skor += 1.0 * self.fasilitas
+        domisili = city_tokens(form.get("domisili"))
+        if "Lokasi" in faktor and domisili:
+            # Seluruh kata nama kota harus ada di domisili ("Jakarta Selatan" cocok dengan Jakarta),
+            # bukan potongan kata seperti "ang" yang dulu cocok dengan Bandung, Malang, dan Semarang
+            skor += 1.5 * np.array([bool(kota) and kota <= domisili for kota in self.kota_tokens])
+
+        # Utamakan pilihan yang realistis untuk diterima
+        peluang = self.admission_chance(form.get("nilai_rapor", 0.0))
+        skor += 2.0 * peluang / 100.0
+        return skor, peluang
+
+    def rank(self, form, k=TOP_K, major_similarity=None):
+        """Mengembalikan k kandidat kampus x jurusan teratas untuk profil tertentu."""
+        skor, peluang = self.score(form, major_similarity)
+        k = min(k, len(self))
+        top = np.argpartition(-skor, k - 1)[:k]
+        top = top[np.argsort(-skor[top], kind="stable")]
+        return [
+            Kandidat(
+                kampus=self.kampus[i],
+                jurusan=self.jurusan[i],
+                kota=self.kota[i],
+                jenis_kampus=self.jenis_kampus[i],
+                akreditasi=self.akreditasi[i],
+                biaya_semester_juta=float(self.biaya[i]),
+                bidang_karier=self.bidang_karier[i],
+                skor=round(float(skor[i]), 3),
+                peluang_diterima=round(float(peluang[i])),
+            )
+            for i in top
+        ]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Memuat katalog sekali per proses dan membagikannya ke semua sesi."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CampusCatalog.from_csv(CATALOG_PATH)
+        return _catalog
+
+
+def rank_candidates(form, k=TOP_K, major_similarity=None):
+    return get_catalog().rank(form, k, major_similarity)
+
+
+def format_candidates_for_prompt(kandidat, compact=False):
+    """Daftar kandidat ringkas (satu baris per kandidat) untuk disertakan dalam prompt.
+
+    `compact=True` hanya menyertakan kampus, jurusan, dan peluang (atribut lain sudah tercermin di urutan).
+    """
+    if compact:
+        return "\n".join(
+            f"{i+1}. {c.kampus} - {c.jurusan} ({c.peluang_diterima:g}%)" for i, c in enumerate(kandidat)
+        )
+    return "\n".join(
+        f"{i+1}. {c.kampus} - {c.jurusan} ({c.jenis_kampus}, {c.kota}, akreditasi {c.akreditasi}, "
+        f"Rp{c.biaya_semester_juta:g}jt/smt, peluang {c.peluang_diterima:g}%)"
+        for i, c in enumerate(kandidat)
+    )
+
+
+def offline_recommendation(kandidat, n=3):
+    """Rekomendasi tanpa LLM: n kandidat teratas, diutamakan dari kampus yang berbeda-beda.
+
+    Jika shortlist tidak berisi cukup kampus berbeda, sisanya diisi jurusan lain dari kampus yang
+    sudah terpilih (urut skor), agar jumlah rekomendasi tetap n selama shortlist cukup panjang.
+    """
+    kandidat = list(kandidat)
+    kampus_terpakai, pilihan = set(), []
+    for c in kandidat:
+        if c.kampus not in kampus_terpakai:
+            kampus_terpakai.add(c.kampus)
+            pilihan.append(c)
+    if len(pilihan) < n:
+        pilihan += [c for c in kandidat if c not in pilihan][: n - len(pilihan)]
+        pilihan.sort(key=kandidat.index)
+    return HasilRekomendasi(tuple(Rekomendasi(c.kampus, c.jurusan, c.peluang_diterima, "") for c in pilihan[:n]))
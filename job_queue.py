@@ -0,0 +1,272 @@
+"""Antrean pekerjaan (job) lokal berbasis SQLite dengan worker pool di background.
+
+Pekerjaan panjang (panggilan OpenAI, PDF, TTS) dijalankan di thread worker,
+bukan di thread script Streamlit, sehingga rerun karena perubahan widget tidak
+membatalkannya. Status, hasil, dan artefak (PDF, audio) disimpan di SQLite
+agar tetap bisa diambil setelah halaman dimuat ulang atau koneksi terputus;
+ukuran artefak dibatasi per sesi dan global (lihat artifact_store.py).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from artifact_store import ArtifactStore
+from tracing import tracer
+
+# --- Konfigurasi Antrean ---
+JOBS_DB_PATH = os.getenv("PILIH_KAMPUS_JOBS_DB", "pilih_kampus_jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("PILIH_KAMPUS_JOB_WORKERS", "8"))
+# Pekerjaan (beserta artefaknya) yang lebih lama dari ini dihapus
+JOB_TTL_SECONDS = float(os.getenv("PILIH_KAMPUS_JOB_TTL", str(24 * 60 * 60)))
+# Jeda maksimum worker memeriksa antrean jika tidak dibangunkan oleh submit()
+WORKER_POLL_SECONDS = 1.0
+# Interval pembersihan pekerjaan kedaluwarsa dan berkas sementara yatim saat worker menganggur
+PURGE_INTERVAL_SECONDS = float(os.getenv("PILIH_KAMPUS_JOB_PURGE_INTERVAL", str(10 * 60)))
+# Jeda sebelum worker mencoba lagi jika database antrean gagal dibaca atau ditulis (mis. terkunci)
+CLAIM_RETRY_SECONDS = 5.0
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_ERROR)
+
+logger = logging.getLogger(__name__)
+
+Job = namedtuple(
+    "Job", ["id", "kind", "status", "payload", "result", "error", "progress", "partial", "created_at", "updated_at"]
+)
+
+
+class JobContext:
+    """Diberikan ke handler agar bisa melaporkan kemajuan dan menyimpan artefak."""
+
+    def __init__(self, queue, job_id, session_id=None):
+        self.queue = queue
+        self.id = job_id
+        self.session_id = session_id
+
+    def report(self, progress=None, partial=None):
+        self.queue.update_progress(self.id, progress=progress, partial=partial)
+
+    def save_artifact(self, name, data):
+        self.queue.save_artifact(self.id, name, data, session_id=self.session_id)
+
+
+class JobPlaceholder:
+    """Pengganti `st.empty()` di worker: tampilan sementara disimpan ke job untuk ditampilkan saat polling."""
+
+    def __init__(self, job):
+        self.job = job
+
+    def markdown(self, body):
+        self.job.report(partial=body)
+
+    def info(self, body):
+        self.job.report(progress=body)
+
+    def empty(self):
+        self.job.report(partial="")
+
+
+class JobQueue:
+    """Antrean FIFO persisten dengan worker thread; handler didaftarkan per jenis pekerjaan."""
+
+    def __init__(self, db_path=JOBS_DB_PATH, workers=JOB_WORKERS, ttl_seconds=JOB_TTL_SECONDS):
+        self.db_path = db_path
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self._handlers = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._purge_lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, progress TEXT, partial TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            # Pekerjaan yang terhenti karena proses sebelumnya mati dijalankan ulang
+            self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (STATUS_QUEUED, STATUS_RUNNING))
+            self._conn.commit()
+        self.artifacts = ArtifactStore(self._conn, self._lock)
+        self.purge_expired()
+
+    def register(self, kind, handler):
+        """`handler(payload, job)` mengembalikan hasil yang bisa di-JSON-kan."""
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Menjalankan worker thread (sekali per proses)."""
+        with self._wakeup:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, STATUS_QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+        tracer.incr("jobs_total", kind=kind, status="submitted")
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, payload, result, error, progress, partial, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        row = list(row)
+        row[3] = json.loads(row[3])
+        row[4] = json.loads(row[4]) if row[4] is not None else None
+        return Job(*row)
+
+    def update_progress(self, job_id, progress=None, partial=None):
+        sets, params = ["updated_at = ?"], [time.time()]
+        if progress is not None:
+            sets.append("progress = ?")
+            params.append(progress)
+        if partial is not None:
+            sets.append("partial = ?")
+            params.append(partial)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", (*params, job_id))
+            self._conn.commit()
+
+    def save_artifact(self, job_id, name, data, session_id=None):
+        return self.artifacts.save(job_id, name, data, session_id=session_id)
+
+    def get_artifact(self, job_id, name):
+        return self.artifacts.get(job_id, name)
+
+    def has_artifact(self, job_id, name):
+        return self.artifacts.has(job_id, name)
+
+    def status_counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        return [{"kind": kind, "status": status, "jumlah": count} for kind, status, count in rows]
+
+    def purge_expired(self):
+        """Menghapus pekerjaan kedaluwarsa beserta artefaknya, dan berkas sementara yatim di direktori kerja."""
+        self._last_purge = time.time()
+        cutoff = self._last_purge - self.ttl_seconds
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE updated_at < ? AND status IN (?, ?)", (cutoff, *FINISHED_STATUSES)
+            )]
+        self.artifacts.discard_jobs(expired)
+        with self._lock:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+            self._conn.commit()
+        self.artifacts.remove_orphan_files()
+
+    def _maybe_purge(self):
+        # Hanya satu worker yang membersihkan; worker lain langsung kembali menunggu
+        if time.time() - self._last_purge < PURGE_INTERVAL_SECONDS or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self.purge_expired()
+        finally:
+            self._purge_lock.release()
+
+    def _claim(self):
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status = ? AND kind IN ({', '.join('?' * len(kinds))}) "
+                "ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED, *kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, "Sedang diproses...", time.time(), row[0]),
+            )
+            self._conn.commit()
+        return self.get(row[0])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        """Menyimpan status akhir; hasil yang tidak bisa di-JSON-kan dicatat sebagai galat pekerjaan."""
+        try:
+            result_json = json.dumps(result, ensure_ascii=False) if result is not None else None
+        except (TypeError, ValueError) as e:
+            status, result_json, error = STATUS_ERROR, None, f"Hasil tidak bisa disimpan: {type(e).__name__}: {e}"
+        while True:
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, result = ?, error = ?, partial = NULL, updated_at = ? WHERE id = ?",
+                        (status, result_json, error, time.time(), job_id),
+                    )
+                    self._conn.commit()
+                return status
+            except Exception as e:
+                # Sama seperti _claim: tunggu galat database sesaat lewat agar pekerjaan tidak tertahan di "running"
+                logger.warning("Gagal menyimpan status pekerjaan %s: %s", job_id, e)
+                tracer.incr("job_finish_errors_total")
+                time.sleep(CLAIM_RETRY_SECONDS)
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                # Worker tidak boleh mati karena galat database sesaat; coba lagi setelah jeda
+                logger.warning("Gagal mengambil pekerjaan dari antrean: %s", e)
+                tracer.incr("job_claim_errors_total")
+                time.sleep(CLAIM_RETRY_SECONDS)
+                continue
+            if job is None:
+                self._maybe_purge()
+                with self._wakeup:
+                    self._wakeup.wait(WORKER_POLL_SECONDS)
+                continue
+            tracer.incr("jobs_total", kind=job.kind, status="started")
+            try:
+                with tracer.stage(f"job_{job.kind}"):
+                    result = self._handlers[job.kind](
+                        job.payload, JobContext(self, job.id, session_id=job.payload.get("session_id"))
+                    )
+            except Exception as e:
+                status = self._finish(job.id, STATUS_ERROR, error=f"{type(e).__name__}: {e}")
+            else:
+                status = self._finish(job.id, STATUS_DONE, result=result)
+            tracer.incr("jobs_total", kind=job.kind, status=status)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Antrean bersama untuk seluruh sesi dalam proses ini (worker dijalankan lewat `start()`)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
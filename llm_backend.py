@@ -0,0 +1,278 @@
+"""Backend LLM yang dipilih lewat konfigurasi, dengan failover otomatis.
+
+Urutan backend diatur oleh PILIH_KAMPUS_LLM_BACKENDS (dipisah koma), mis.
+`openai,local,rules`. Pekerjaan rekomendasi mencoba backend sesuai urutan dan
+beralih ke backend berikutnya jika backend tidak sehat, gagal terhubung, atau
+jawabannya tidak valid:
+
+- `openai`: API OpenAI (cloud) dengan tier draf/penyempurnaan dan TTS.
+- `local`: server model lokal di CPU yang kompatibel dengan API OpenAI (mis.
+  `llama-server` dari llama.cpp), tanpa biaya per token dan tanpa internet.
+  TTS lokal opsional lewat PILIH_KAMPUS_LOCAL_TTS_URL (server `/v1/audio/speech`).
+- `rules`: rekomendasi deterministik dari katalog kampus lokal (pra-peringkat).
+
+PILIH_KAMPUS_OFFLINE=1 sama dengan PILIH_KAMPUS_LLM_BACKENDS=rules. Latensi dan
+throughput (token keluaran per detik) dicatat per backend untuk halaman admin.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from campus_catalog import offline_recommendation
+from model_router import DEFAULT_TIERS, TierModels
+from openai_client import HealthCheck, HealthStatus, check_health, create_client, get_client, mark_unhealthy
+from request_coalescing import FairLimiter, get_limiter
+from tracing import tracer
+
+# --- Konfigurasi Backend ---
+OFFLINE_MODE = os.getenv("PILIH_KAMPUS_OFFLINE", "0") == "1"
+LLM_BACKENDS = os.getenv("PILIH_KAMPUS_LLM_BACKENDS", "openai,rules")
+OPENAI_TTS_MODEL = os.getenv("PILIH_KAMPUS_TTS_MODEL", "tts-1") # atau "tts-1-hd" untuk kualitas lebih tinggi
+# Server model lokal (llama.cpp `llama-server` default di port 8080); nama model diabaikan oleh banyak server
+LOCAL_LLM_URL = os.getenv("PILIH_KAMPUS_LOCAL_LLM_URL", "http://127.0.0.1:8080/v1")
+LOCAL_LLM_MODEL = os.getenv("PILIH_KAMPUS_LOCAL_LLM_MODEL", "local")
+# Kosong berarti tanpa tier penyempurnaan: di CPU, generasi kedua dengan model yang sama jarang sepadan
+LOCAL_LLM_REFINE_MODEL = os.getenv("PILIH_KAMPUS_LOCAL_LLM_REFINE_MODEL") or None
+LOCAL_LLM_API_KEY = os.getenv("PILIH_KAMPUS_LOCAL_LLM_API_KEY", "local")
+# Model kecil di CPU butuh puluhan detik untuk ~200 token; batas ini menggantikan SLO draf cloud
+LOCAL_LLM_TIMEOUT = float(os.getenv("PILIH_KAMPUS_LOCAL_LLM_TIMEOUT", "120"))
+# Samakan dengan jumlah slot server (`--parallel` pada llama-server)
+LOCAL_LLM_MAX_CONCURRENT = int(os.getenv("PILIH_KAMPUS_LOCAL_LLM_MAX_CONCURRENT", "1"))
+LOCAL_TTS_URL = os.getenv("PILIH_KAMPUS_LOCAL_TTS_URL")
+LOCAL_TTS_MODEL = os.getenv("PILIH_KAMPUS_LOCAL_TTS_MODEL", "tts-1")
+
+
+class BackendUnavailable(RuntimeError):
+    """Backend tidak sehat dan tidak ada backend lain di rantai failover."""
+
+
+class Backend(ABC):
+    """Dasar semua backend: nama, kesehatan, dan statistik per permintaan."""
+
+    name = None
+    label = None
+    is_llm = True
+    tiers = None
+    tts_model = None # None berarti backend tidak bisa mensintesis suara
+
+    def __init__(self):
+        self.stats = {"requests": 0, "errors": 0, "failovers": 0, "completion_tokens": 0, "generation_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def stage_name(self):
+        return f"llm_backend_{self.name}"
+
+    @abstractmethod
+    def check_health(self, block=True):
+        """HealthStatus backend; dengan block=False boleh None selama pemeriksaan pertama belum selesai."""
+
+    def check_tts(self, block=True):
+        return self.check_health(block)
+
+    def mark_unhealthy(self, message):  # noqa: B027
+        """Sengaja tidak melakukan apa-apa secara bawaan: backend tanpa health check (mis. RuleBackend)
+        tidak pernah dilewati. Backend jaringan menimpanya agar kegagalan koneksi dicatat."""
+
+    @contextmanager
+    def request(self):
+        """Mengukur satu permintaan ke backend; isi span["completion_tokens"] agar throughput tercatat."""
+        started = time.perf_counter()
+        ok = False
+        span = {}
+        try:
+            with tracer.stage(self.stage_name) as span:
+                yield span
+            ok = True
+        finally:
+            tokens = (span.get("completion_tokens") or 0) if ok else 0
+            with self._stats_lock:
+                self.stats["requests"] += 1
+                self.stats["errors"] += not ok
+                if ok:
+                    self.stats["completion_tokens"] += tokens
+                    self.stats["generation_seconds"] += time.perf_counter() - started
+            tracer.incr("llm_backend_requests_total", backend=self.name, result="ok" if ok else "error")
+            if tokens:
+                tracer.incr("llm_backend_tokens_total", tokens, backend=self.name)
+
+    def record_failover(self, reason):
+        with self._stats_lock:
+            self.stats["failovers"] += 1
+        tracer.incr("llm_failovers_total", backend=self.name, reason=reason)
+
+    def report_failure(self, error):
+        """Kegagalan koneksi membuat backend dilewati sampai pemeriksaan kesehatan berikutnya."""
+        import openai
+
+        if isinstance(error, openai.APIConnectionError):
+            self.mark_unhealthy(f"{self.label} tidak dapat dihubungi: {error}")
+
+
+class OpenAIBackend(Backend):
+    """API OpenAI (cloud) memakai klien bersama dan pembatas konkurensi global."""
+
+    name = "openai"
+    label = "OpenAI"
+    tiers = DEFAULT_TIERS
+    tts_model = OPENAI_TTS_MODEL
+
+    def __init__(self):
+        super().__init__()
+        self.limiter = get_limiter()
+
+    def client(self):
+        return get_client()
+
+    def tts_client(self):
+        return get_client()
+
+    def check_health(self, block=True):
+        return check_health(block)
+
+    def mark_unhealthy(self, message):
+        mark_unhealthy(message)
+
+
+class LocalBackend(Backend):
+    """Server model lokal yang kompatibel dengan API OpenAI, mis. llama.cpp di CPU."""
+
+    name = "local"
+    label = "Model lokal"
+
+    def __init__(self, base_url=LOCAL_LLM_URL, model=LOCAL_LLM_MODEL, refine_model=LOCAL_LLM_REFINE_MODEL,
+                 tts_url=LOCAL_TTS_URL, tts_model=LOCAL_TTS_MODEL):
+        super().__init__()
+        self.base_url = base_url
+        self.tts_url = tts_url
+        self.tiers = TierModels(model, refine_model, LOCAL_LLM_TIMEOUT)
+        self.tts_model = tts_model if tts_url else None
+        self.limiter = FairLimiter(max_concurrent=LOCAL_LLM_MAX_CONCURRENT)
+        self._client = None
+        self._tts_client = None
+        self._client_lock = threading.Lock()
+        self._health = HealthCheck(
+            lambda: self.client().models.list(),
+            lambda e: f"Server model lokal ({self.base_url}) tidak dapat dihubungi: {e}",
+            name="local-llm-health",
+        )
+
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                # Tanpa retry: lebih cepat beralih ke backend berikutnya daripada menunggu CPU yang sibuk
+                self._client = create_client(self.base_url, LOCAL_LLM_API_KEY, timeout=LOCAL_LLM_TIMEOUT, max_retries=0)
+            return self._client
+
+    def tts_client(self):
+        with self._client_lock:
+            if self._tts_client is None:
+                self._tts_client = create_client(self.tts_url, LOCAL_LLM_API_KEY, timeout=LOCAL_LLM_TIMEOUT)
+            return self._tts_client
+
+    def check_health(self, block=True):
+        return self._health.check(block)
+
+    def check_tts(self, block=True):
+        # Server TTS terpisah dari server model; kegagalannya muncul sebagai error pekerjaan suara
+        return HealthStatus(True, None)
+
+    def mark_unhealthy(self, message):
+        self._health.mark_unhealthy(message)
+
+
+class RuleBackend(Backend):
+    """Rekomendasi deterministik dari pra-peringkat katalog lokal; tidak pernah gagal terhubung."""
+
+    name = "rules"
+    label = "Katalog lokal"
+    is_llm = False
+
+    def check_health(self, block=True):
+        return HealthStatus(True, None)
+
+    def recommend(self, kandidat):
+        with self.request():
+            return offline_recommendation(kandidat)
+
+
+_BACKEND_TYPES = {"openai": OpenAIBackend, "local": LocalBackend, "rules": RuleBackend}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def parse_backend_names(value=LLM_BACKENDS, offline=OFFLINE_MODE):
+    """Urutan nama backend dari konfigurasi; nama yang tidak dikenal langsung ditolak."""
+    if offline:
+        return ["rules"]
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in _BACKEND_TYPES]
+    if unknown:
+        raise ValueError(
+            f"Backend tidak dikenal di PILIH_KAMPUS_LLM_BACKENDS: {', '.join(unknown)} "
+            f"(pilihan: {', '.join(_BACKEND_TYPES)})"
+        )
+    return list(dict.fromkeys(names)) or ["rules"]
+
+
+def get_backend(name):
+    """Satu instance per backend per proses (klien, health check, dan statistiknya dipakai bersama)."""
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = _instances[name] = _BACKEND_TYPES[name]()
+        return backend
+
+
+def get_backends():
+    """Rantai failover sesuai konfigurasi."""
+    return [get_backend(name) for name in parse_backend_names()]
+
+
+def get_chat_backend():
+    """Backend LLM pertama di rantai (OpenAI jika rantai hanya berisi katalog lokal)."""
+    return next((backend for backend in get_backends() if backend.is_llm), None) or get_backend("openai")
+
+
+def get_tts_backend(block=False):
+    """Backend pertama di rantai yang bisa mensintesis suara, atau None jika audio tidak tersedia."""
+    for backend in get_backends():
+        if backend.tts_model is None:
+            continue
+        status = backend.check_tts(block)
+        if status is None or status.ok:
+            return backend
+    return None
+
+
+def fallback_notice(next_backend):
+    if next_backend is None:
+        return "Tidak ada backend lain yang tersedia."
+    if not next_backend.is_llm:
+        return "Menampilkan rekomendasi dari katalog lokal."
+    return f"Beralih ke {next_backend.label}."
+
+
+def backend_stats():
+    """Status, latensi (p50/p95), dan throughput setiap backend di rantai untuk halaman admin."""
+    latency = {row["stage"]: row for row in tracer.stage_summary()}
+    rows = []
+    for backend in get_backends():
+        status = backend.check_health(block=False)
+        with backend._stats_lock:
+            stats = dict(backend.stats)
+        row = latency.get(backend.stage_name, {})
+        seconds = stats.pop("generation_seconds")
+        rows.append({
+            "backend": backend.name,
+            "status": "belum diperiksa" if status is None else "sehat" if status.ok else "gagal",
+            "model": backend.tiers.draft if backend.tiers else "pra-peringkat lokal",
+            "tts": backend.tts_model or "-",
+            **stats,
+            "p50_ms": row.get("p50_ms", 0.0),
+            "p95_ms": row.get("p95_ms", 0.0),
+            "token_per_detik": round(stats["completion_tokens"] / seconds, 1) if seconds else 0.0,
+        })
+    return rows
@@ -0,0 +1,219 @@
+"""Indeks vektor deskripsi jurusan untuk pencarian kemiripan profil -> jurusan.
+
+Indeks dibangun sekali secara offline lalu disimpan sebagai file NumPy yang
+dimuat dengan memory-map, sehingga ribuan deskripsi bisa dicari tanpa
+memanggil LLM atau layanan embedding di jaringan:
+
+    python major_index.py build
+
+Jika indeks belum ada atau usang, aplikasi membangunnya sekali saat pertama
+dipakai. File ditulis ke file sementara lalu di-`os.replace` agar proses lain
+tidak pernah membaca indeks yang setengah jadi; jika indeks tetap gagal
+dimuat, shortlist memakai skor katalog saja tanpa kemiripan deskripsi.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DESCRIPTIONS_PATH = os.getenv("PILIH_KAMPUS_MAJOR_DESCRIPTIONS", os.path.join(DATA_DIR, "deskripsi_jurusan.csv"))
+INDEX_PATH = os.getenv("PILIH_KAMPUS_MAJOR_INDEX", os.path.join(DATA_DIR, "major_index.npy"))
+EMBEDDING_DIM = 2048
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """Embedder lokal berbasis feature hashing (kata + n-gram karakter), tanpa jaringan.
+
+    N-gram karakter membantu mencocokkan kata berimbuhan (mis. "menganalisis"
+    dan "analisis"). Hash memakai crc32 agar hasilnya sama di setiap proses.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, char_ngram=4):
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text):
+        text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+        words = _TOKEN_PATTERN.findall(text)
+        features = list(words)
+        features += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        n = self.char_ngram
+        for word in words:
+            padded = f"<{word}>"
+            features += [f"#{padded[i:i + n]}" for i in range(max(1, len(padded) - n + 1))]
+        return features
+
+    def embed(self, texts):
+        """Mengubah daftar teks menjadi matriks (n, dim) float32 yang sudah dinormalisasi L2."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint32
+            )
+            if hashes.size == 0:
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dim, signs)
+        # Frekuensi sublinear agar kata yang berulang tidak terlalu dominan
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+def _read_descriptions(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    return [r["jurusan"] for r in rows], [f"{r['jurusan']}. {r['deskripsi']}" for r in rows]
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _metadata_path(index_path):
+    return os.path.splitext(index_path)[0] + ".json"
+
+
+def _write_atomic(path, write, mode="wb", **kwargs):
+    """Menulis lewat file sementara di direktori yang sama lalu menggantinya sekaligus."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_index(descriptions_path=DESCRIPTIONS_PATH, index_path=INDEX_PATH, dim=EMBEDDING_DIM):
+    """Membangun indeks dari file deskripsi dan menyimpannya ke disk (.npy + metadata .json)."""
+    names, texts = _read_descriptions(descriptions_path)
+    embedder = HashingEmbedder(dim)
+    matrix = embedder.embed(texts)
+    metadata = {
+        "names": names,
+        "dim": dim,
+        "char_ngram": embedder.char_ngram,
+        "source_sha256": _file_sha256(descriptions_path),
+    }
+    # Matriks dulu, metadata terakhir: metadata yang cocok dengan sumber menandakan indeks sudah lengkap
+    _write_atomic(index_path, lambda f: np.save(f, matrix))
+    _write_atomic(_metadata_path(index_path), lambda f: json.dump(metadata, f, ensure_ascii=False),
+                  mode="w", encoding="utf-8")
+    return len(names)
+
+
+class MajorIndex:
+    """Indeks deskripsi jurusan yang dimuat dengan memory-map (read-only)."""
+
+    def __init__(self, index_path=INDEX_PATH):
+        with open(_metadata_path(index_path), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.names = metadata["names"]
+        self.embedder = HashingEmbedder(metadata["dim"], metadata["char_ngram"])
+        self.matrix = np.load(index_path, mmap_mode="r")
+        if self.matrix.shape != (len(self.names), self.embedder.dim):
+            raise ValueError(f"Indeks {index_path} tidak cocok dengan metadatanya")
+
+    def search(self, queries, k=10):
+        """Pencarian top-k cosine untuk sekumpulan kueri sekaligus.
+
+        Mengembalikan satu daftar [(jurusan, skor), ...] per kueri, terurut dari yang paling mirip.
+        """
+        query_matrix = self.embedder.embed(queries)
+        scores = query_matrix @ self.matrix.T
+        k = min(k, len(self.names))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates], kind="stable")]
+            results.append([(self.names[i], float(scores[row, i])) for i in ordered])
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _index_is_stale(descriptions_path, index_path):
+    metadata_path = _metadata_path(index_path)
+    if not (os.path.exists(index_path) and os.path.exists(metadata_path)):
+        return True
+    with open(metadata_path, encoding="utf-8") as f:
+        return json.load(f).get("source_sha256") != _file_sha256(descriptions_path)
+
+
+def get_index():
+    """Memuat indeks sekali per proses (dibagikan ke semua sesi); dibangun otomatis jika belum ada.
+
+    Mengembalikan None jika indeks tidak bisa dibangun atau dimuat; pemanggil cukup
+    meranking tanpa kemiripan. Percobaan diulang pada panggilan berikutnya.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                if _index_is_stale(DESCRIPTIONS_PATH, INDEX_PATH):
+                    build_index(DESCRIPTIONS_PATH, INDEX_PATH)
+                _index = MajorIndex(INDEX_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Indeks jurusan tidak bisa dimuat, ranking tanpa kemiripan: %s", e)
+        return _index
+
+
+def build_profile_query(form, profil_ringkas=""):
+    """Menggabungkan isian bebas dan pilihan formulir menjadi satu teks kueri."""
+    parts = [
+        profil_ringkas,
+        " ".join(form.get("mata_pelajaran", [])),
+        " ".join(form.get("aktivitas_suka", [])),
+        f"bidang {form.get('karier', '')}",
+        f"bekerja di {form.get('lingkungan_kerja', '')}",
+        form.get("domisili", ""),
+        form.get("sekolah", ""),
+        form.get("pekerjaan", ""),
+    ]
+    return " ".join(part for part in parts if part)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola indeks vektor deskripsi jurusan.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Bangun ulang indeks dari file deskripsi")
+    build.add_argument("--descriptions", default=DESCRIPTIONS_PATH)
+    build.add_argument("--output", default=INDEX_PATH)
+    build.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    search = subparsers.add_parser("search", help="Cari jurusan yang paling mirip dengan teks")
+    search.add_argument("query", nargs="+")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count = build_index(args.descriptions, args.output, args.dim)
+        print(f"Indeks {count} jurusan disimpan ke {args.output}")
+    else:
+        index = get_index()
+        if index is None:
+            raise SystemExit(f"Indeks {INDEX_PATH} tidak bisa dimuat; jalankan `python major_index.py build`")
+        for name, score in index.search([" ".join(args.query)], args.k)[0]:
+            print(f"{score:.3f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Routing dua tingkat: draf cepat dari model murah, disempurnakan gpt-4 hanya bila perlu.
+
+Draf selalu diminta lebih dulu dan langsung ditampilkan. Permintaan dinaikkan
+ke model penyempurna jika draf tidak lolos validasi (atau melewati SLO
+latensi), skor kandidat teratas terlalu berdekatan, atau pengguna meminta
+analisis mendalam. Isian formulir yang kosong atau serba netral bukan alasan
+menaikkan model; itu urusan validasi formulir.
+"""
+import os
+import time
+from collections import namedtuple
+
+from recommendation_schema import (
+    RECOMMENDATION_COUNT, HasilRekomendasi, IncompleteRecommendation, RecommendationParseError,
+)
+from tracing import tracer
+
+# --- Konfigurasi Tier ---
+DRAFT_MODEL = os.getenv("PILIH_KAMPUS_DRAFT_MODEL", "gpt-3.5-turbo")
+REFINE_MODEL = os.getenv("PILIH_KAMPUS_REFINE_MODEL", "gpt-4")
+# Batas token keluaran per tier (3 baris JSON beserta alasan singkat cukup ~200 token)
+DRAFT_MAX_TOKENS = int(os.getenv("PILIH_KAMPUS_DRAFT_MAX_TOKENS", "400"))
+REFINE_MAX_TOKENS = int(os.getenv("PILIH_KAMPUS_REFINE_MAX_TOKENS", "600"))
+# SLO latensi per tier (detik). Draf yang melewati SLO dibatalkan lalu dinaikkan ke tier berikutnya.
+DRAFT_SLO_SECONDS = float(os.getenv("PILIH_KAMPUS_DRAFT_SLO_SECONDS", "10"))
+REFINE_SLO_SECONDS = float(os.getenv("PILIH_KAMPUS_REFINE_SLO_SECONDS", "45"))
+# Selisih skor kandidat teratas dan ketiga yang dianggap terlalu tipis untuk dipilih model murah
+AMBIGUITY_SCORE_MARGIN = float(os.getenv("PILIH_KAMPUS_AMBIGUITY_MARGIN", "0.2"))
+
+TIER_LABELS = {
+    "draft": "draf cepat",
+    "refine": "disempurnakan",
+    "offline": "katalog lokal",
+    "delta": "pembaruan inkremental",
+    "reuse": "hasil sebelumnya dipakai ulang",
+}
+REASON_LABELS = {
+    "deep": "analisis mendalam diminta",
+    "draft_invalid": "format draf tidak valid",
+    "draft_incomplete": "draf kurang dari 3 rekomendasi",
+    "draft_slo": "draf melewati batas waktu",
+    "draft_error": "model draf gagal merespons",
+    "skor_berdekatan": "skor kandidat teratas berdekatan",
+}
+REFINE_INSTRUCTION = (
+    "Tinjau ulang rekomendasi di atas terhadap profil dan daftar kandidat. Perbaiki pilihan kampus/jurusan, "
+    "peluang diterima, atau alasan bila kurang tepat, lalu kembalikan tepat 3 baris JSON dengan format yang sama."
+)
+
+RoutedRecommendation = namedtuple("RoutedRecommendation", ["text", "hasil", "tier", "model", "reasons"])
+# Model per tier untuk satu backend; refine=None berarti backend tidak punya tier penyempurnaan
+TierModels = namedtuple("TierModels", ["draft", "refine", "draft_timeout"])
+DEFAULT_TIERS = TierModels(DRAFT_MODEL, REFINE_MODEL, DRAFT_SLO_SECONDS)
+
+
+def profile_ambiguity(kandidat):
+    """Alasan shortlist dianggap ambigu (daftar kosong berarti model murah cukup memilih)."""
+    reasons = []
+    if kandidat and len(kandidat) >= RECOMMENDATION_COUNT:
+        if kandidat[0].skor - kandidat[RECOMMENDATION_COUNT - 1].skor < AMBIGUITY_SCORE_MARGIN:
+            reasons.append("skor_berdekatan")
+    return reasons
+
+
+def describe_reasons(reasons):
+    return ", ".join(REASON_LABELS.get(reason, reason) for reason in reasons)
+
+
+def _check_slo(tier, started, slo_seconds):
+    if time.perf_counter() - started > slo_seconds:
+        tracer.incr("slo_violations_total", tier=tier)
+
+
+def _record(tier, model, reasons):
+    tracer.incr("recommendations_by_tier_total", tier=tier, model=model)
+    for reason in reasons:
+        tracer.incr("escalations_total", reason=reason)
+
+
+def route_recommendation(call, prompt_text, reasons=(), deep=False, draft_placeholder=None, refine_placeholder=None,
+                         tiers=DEFAULT_TIERS):
+    """Menjalankan draf lalu (bila perlu) penyempurnaan.
+
+    `call` adalah fungsi dengan tanda tangan seperti `call_openai_api(prompt, placeholder,
+    model=..., max_tokens=..., timeout=..., history=...)`. `tiers` menentukan model per tier
+    (lihat llm_backend.py); tanpa model penyempurna, draf yang valid langsung dipakai dan
+    draf yang gagal dinaikkan ke pemanggil sebagai pengecualian.
+    """
+    import openai
+
+    reasons = (["deep"] if deep else []) + list(reasons)
+    draft_text, draft, draft_error = None, None, None
+    started = time.perf_counter()
+    try:
+        with tracer.stage("llm_draft", model=tiers.draft) as span:
+            draft_text = call(prompt_text, draft_placeholder, model=tiers.draft,
+                              max_tokens=DRAFT_MAX_TOKENS, timeout=tiers.draft_timeout)
+            draft = HasilRekomendasi.parse(draft_text)
+            span["items"] = len(draft)
+    except IncompleteRecommendation as e:
+        # Draf pendek tidak disimpan di cache, tetapi masih dipakai jika penyempurnaan gagal
+        reasons.append("draft_incomplete")
+        draft, draft_error = e.hasil, e
+    except RecommendationParseError as e:
+        reasons.append("draft_invalid")
+        draft_error = e
+    except openai.APITimeoutError as e:
+        reasons.append("draft_slo")
+        draft_error = e
+    except openai.APIError as e:
+        reasons.append("draft_error")
+        draft_error = e
+    _check_slo("draft", started, tiers.draft_timeout)
+
+    if not reasons or (tiers.refine is None and draft):
+        # Tanpa tier penyempurnaan tidak ada yang dinaikkan, jadi alasan tidak dicatat
+        _record("draft", tiers.draft, ())
+        return RoutedRecommendation(draft_text, draft, "draft", tiers.draft, ())
+    if tiers.refine is None:
+        raise draft_error
+
+    if refine_placeholder is not None:
+        refine_placeholder.info(f"Menyempurnakan rekomendasi dengan {tiers.refine} ({describe_reasons(reasons)})...")
+    history = ({"role": "assistant", "content": draft_text}, {"role": "user", "content": REFINE_INSTRUCTION}) if draft_text else ()
+    started = time.perf_counter()
+    try:
+        with tracer.stage("llm_refine", model=tiers.refine, reasons=reasons):
+            text = call(prompt_text, refine_placeholder, model=tiers.refine, max_tokens=REFINE_MAX_TOKENS, history=history)
+            hasil = HasilRekomendasi.parse(text)
+    except (openai.OpenAIError, RecommendationParseError):
+        _check_slo("refine", started, REFINE_SLO_SECONDS)
+        if not draft:
+            raise
+        # Penyempurnaan gagal, tetapi draf yang valid masih layak ditampilkan
+        _record("draft", tiers.draft, reasons)
+        return RoutedRecommendation(draft_text, draft, "draft", tiers.draft, tuple(reasons))
+    _check_slo("refine", started, REFINE_SLO_SECONDS)
+    _record("refine", tiers.refine, reasons)
+    return RoutedRecommendation(text, hasil, "refine", tiers.refine, tuple(reasons))
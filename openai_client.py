@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+# --- Konfigurasi Koneksi OpenAI ---
+# Klien dibuat sekali per proses dan dipakai bersama oleh semua sesi Streamlit,
+# sehingga koneksi HTTP (keep-alive) tidak dibuka ulang di setiap rerun.
+# Paket openai (~1 detik untuk diimpor) baru dimuat saat klien pertama kali dibutuhkan,
+# agar formulir tampil tanpa menunggu impor maupun jaringan.
+REQUEST_TIMEOUT = float(os.getenv("PILIH_KAMPUS_OPENAI_TIMEOUT", "60"))
+CONNECT_TIMEOUT = float(os.getenv("PILIH_KAMPUS_OPENAI_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("PILIH_KAMPUS_OPENAI_MAX_RETRIES", "3"))
+MAX_CONNECTIONS = int(os.getenv("PILIH_KAMPUS_OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PILIH_KAMPUS_OPENAI_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("PILIH_KAMPUS_OPENAI_KEEPALIVE_EXPIRY", "30"))
+# Hasil health check yang gagal dicoba ulang setelah jeda ini (detik)
+HEALTH_RETRY_SECONDS = 30.0
+
+HealthStatus = namedtuple("HealthStatus", ["ok", "message"])
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _timeout(total=REQUEST_TIMEOUT):
+    import openai
+
+    # Kelas Timeout/Limits diambil dari konstanta SDK agar tidak bergantung pada versi httpx tertentu
+    return type(openai.DEFAULT_TIMEOUT)(total, connect=CONNECT_TIMEOUT)
+
+
+def _limits():
+    import openai
+
+    return type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def create_client(base_url=None, api_key=None, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES):
+    """Membuat klien baru dengan connection pool.
+
+    `base_url`/`api_key` dipakai untuk server lain yang kompatibel dengan API OpenAI
+    (mis. server model lokal); None berarti memakai OPENAI_BASE_URL/OPENAI_API_KEY.
+    """
+    import openai
+
+    return openai.OpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        timeout=_timeout(timeout),
+        max_retries=max_retries,
+        http_client=openai.DefaultHttpxClient(limits=_limits(), timeout=_timeout(timeout)),
+    )
+
+
+def get_client():
+    """Mengembalikan klien OpenAI bersama (satu per proses) dengan connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client()
+        return _client
+
+
+class HealthCheck:
+    """Pemeriksaan kesehatan satu endpoint, cukup sekali per proses.
+
+    Hasil yang berhasil disimpan sampai ada kegagalan koneksi yang dilaporkan
+    lewat `mark_unhealthy`; kegagalan dicoba lagi setelah HEALTH_RETRY_SECONDS
+    agar perbaikan (API key, server yang menyala lagi) tidak memerlukan restart.
+    """
+
+    def __init__(self, probe, describe_error, name="health", clock=time.monotonic):
+        self.status = None
+        self._probe = probe # Panggilan ringan, mis. daftar model
+        self._describe_error = describe_error # Pengecualian -> pesan untuk pengguna
+        self._name = name
+        self._clock = clock # Bisa diganti di pengujian
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _is_fresh(self):
+        status = self.status
+        return status is not None and (status.ok or self._clock() - self._checked_at < HEALTH_RETRY_SECONDS)
+
+    def check(self, block=True):
+        """Dengan `block=False`, pemeriksaan dijalankan di thread background dan hasil
+        terakhir yang diketahui (atau None) langsung dikembalikan."""
+        if not block:
+            # Tanpa self._lock: lock itu dipegang selama pemeriksaan berjalan di background
+            if not self._is_fresh():
+                with self._thread_lock:
+                    if self._thread is None or not self._thread.is_alive():
+                        self._thread = threading.Thread(target=self._check, name=self._name, daemon=True)
+                        self._thread.start()
+            return self.status
+        return self._check()
+
+    def _check(self):
+        with self._lock:
+            if self._is_fresh():
+                return self.status
+            try:
+                self._probe()
+                self.status = HealthStatus(True, None)
+            except Exception as e:
+                self.status = HealthStatus(False, self._describe_error(e))
+            self._checked_at = self._clock()
+            return self.status
+
+    def mark_unhealthy(self, message):
+        """Permintaan sungguhan gagal terhubung; endpoint dilewati sampai pemeriksaan ulang berikutnya."""
+        with self._lock:
+            self.status = HealthStatus(False, message)
+            self._checked_at = self._clock()
+
+
+def _describe_openai_error(e):
+    import openai
+
+    if isinstance(e, openai.AuthenticationError):
+        return (
+            "Autentikasi OpenAI gagal. Pastikan variabel lingkungan OPENAI_API_KEY Anda sudah diatur dengan benar dan valid. "
+            "Jika menggunakan Streamlit Cloud, pastikan sudah diatur di Secrets."
+        )
+    return f"Gagal menginisialisasi klien OpenAI: {e}"
+
+
+_health = HealthCheck(lambda: get_client().models.list(), _describe_openai_error, name="openai-health")
+
+
+def check_health(block=True):
+    """Memastikan API key OpenAI valid dengan satu panggilan ringan (lihat HealthCheck)."""
+    return _health.check(block)
+
+
+def mark_unhealthy(message):
+    _health.mark_unhealthy(message)
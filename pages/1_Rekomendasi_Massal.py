@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+
+import streamlit as st
+
+from batch_recommend import (
+    JOB_BATCH, InvalidProfile, describe_invalid, iter_class_reports, load_profiles, run_batch_job,
+)
+from job_queue import FINISHED_STATUSES, STATUS_ERROR, get_job_queue
+from pdf_report import render_class_pdf, render_class_zip
+
+# Setiap file unggahan mendapat folder kerja sendiri berdasarkan isinya,
+# sehingga mengunggah ulang file yang sama akan melanjutkan batch yang terhenti.
+BATCH_ROOT = os.getenv("PILIH_KAMPUS_BATCH_DIR", "batch_runs")
+JOB_POLL_SECONDS = float(os.getenv("PILIH_KAMPUS_JOB_POLL_SECONDS", "1"))
+
+
+def class_report(output_path, render):
+    """PDF kelas atau ZIP dibuat dari file hasil saat tombol unduh ditekan, sekali baca."""
+    buffer = io.BytesIO()
+    render(iter_class_reports(output_path), buffer)
+    return buffer.getvalue()
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_batch_progress(job_id):
+    """Menampilkan kemajuan batch secara berkala, lalu me-rerun halaman begitu selesai."""
+    job = get_job_queue().get(job_id)
+    if job is None or job.status in FINISHED_STATUSES:
+        st.rerun()
+    st.info(job.progress or "Menunggu giliran di antrean...")
+
+
+def main():
+    # Batch berjalan di worker background sehingga tidak terputus saat pengguna pindah halaman atau halaman di-rerun
+    jobs = get_job_queue()
+    jobs.register(JOB_BATCH, run_batch_job)
+    jobs.start()
+    st.title("📚 Rekomendasi Massal per Sekolah")
+    st.write(
+        "Unggah file CSV atau JSONL berisi profil siswa (satu siswa per baris). Nama kolom mengikuti "
+        "isian formulir, misalnya `nama`, `jurusan_sma`, `nilai_rapor`, `karier`. Kolom multi-pilihan "
+        "seperti `mata_pelajaran` dipisahkan dengan titik koma."
+    )
+
+    uploaded = st.file_uploader("File profil siswa", type=["csv", "jsonl"], key="batch_upload")
+    workers = st.slider("Jumlah permintaan paralel", 1, 16, 4, key="batch_workers")
+    rpm = st.number_input("Batas permintaan per menit", min_value=1, max_value=10000, value=60, key="batch_rpm")
+
+    if uploaded is None:
+        return
+
+    content = uploaded.getvalue()
+    run_dir = os.path.join(BATCH_ROOT, hashlib.sha256(content).hexdigest()[:16])
+    os.makedirs(run_dir, exist_ok=True)
+    extension = ".jsonl" if uploaded.name.lower().endswith(".jsonl") else ".csv"
+    input_path = os.path.join(run_dir, f"input{extension}")
+    output_path = os.path.join(run_dir, "hasil.jsonl")
+    with open(input_path, "wb") as f:
+        f.write(content)
+
+    profiles = load_profiles(input_path)
+    st.info(f"{len(profiles)} profil siswa ditemukan.")
+    invalid = [(sid, profile) for sid, profile in profiles if isinstance(profile, InvalidProfile)]
+    if invalid:
+        st.warning(
+            f"{len(invalid)} baris berisi isian yang tidak valid dan akan dicatat sebagai gagal: "
+            + "; ".join(f"{sid} ({describe_invalid(profile)})" for sid, profile in invalid[:10])
+            + (" ..." if len(invalid) > 10 else "")
+        )
+
+    if "batch_job_id" not in st.session_state:
+        # ID pekerjaan juga disimpan di URL agar kemajuan tetap bisa diikuti setelah reload
+        st.session_state.batch_job_id = st.query_params.get("batch_job")
+    job = jobs.get(st.session_state.batch_job_id) if st.session_state.batch_job_id else None
+    if job is not None and job.payload["output_path"] != output_path:
+        job = None # Pekerjaan terakhir milik file unggahan lain
+    running = job is not None and job.status not in FINISHED_STATUSES
+
+    if st.button("🚀 Proses Semua Siswa", key="btn_batch_run", disabled=running):
+        st.session_state.batch_job_id = jobs.submit(JOB_BATCH, {
+            "input_path": input_path, "output_path": output_path, "workers": workers, "rpm": int(rpm),
+        })
+        st.query_params["batch_job"] = st.session_state.batch_job_id
+        job = jobs.get(st.session_state.batch_job_id)
+        running = True
+
+    if running:
+        show_batch_progress(job.id)
+    elif job is not None and job.status == STATUS_ERROR:
+        st.error(f"Batch gagal: {job.error}")
+    elif job is not None:
+        summary = job.result
+        st.success(
+            f"{summary['ok']} berhasil, {summary['error']} gagal, {summary['skipped']} dilewati (sudah diproses). "
+            f"Throughput: {summary['students_per_minute']} siswa/menit."
+        )
+
+    if os.path.exists(output_path):
+        with open(output_path, "rb") as f:
+            st.download_button("📥 Unduh Hasil (JSONL)", data=f.read(), file_name="hasil_rekomendasi.jsonl",
+                               mime="application/jsonl", key="btn_batch_jsonl")
+        st.download_button("📥 Unduh PDF Gabungan Satu Kelas", data=lambda: class_report(output_path, render_class_pdf),
+                           file_name="rekomendasi_kelas.pdf", mime="application/pdf", key="btn_batch_class_pdf")
+        st.download_button("📥 Unduh Semua PDF (ZIP)", data=lambda: class_report(output_path, render_class_zip),
+                           file_name="rekomendasi_pdf.zip", mime="application/zip", key="btn_batch_zip")
+
+
+main()
@@ -0,0 +1,71 @@
+import os
+
+import streamlit as st
+
+from job_queue import get_job_queue
+from llm_backend import backend_stats
+from recommendation_cache import get_cache
+from request_coalescing import get_limiter, get_single_flight
+from speech_cache import cache_stats
+from tracing import start_metrics_server, tracer
+
+# Halaman ini hanya tampil jika PILIH_KAMPUS_ADMIN=1, agar metrik internal tidak terbuka untuk umum
+ADMIN_ENABLED = os.getenv("PILIH_KAMPUS_ADMIN", "0") == "1"
+
+
+def main():
+    st.title("📊 Metrik Kinerja")
+    if not ADMIN_ENABLED:
+        st.info("Halaman admin tidak aktif. Atur PILIH_KAMPUS_ADMIN=1 untuk menampilkannya.")
+        return
+    start_metrics_server()
+
+    st.caption("Metrik dihitung sejak proses server dimulai dan dibagikan ke semua sesi.")
+    st.markdown("### ⏱️ Latensi per Tahap")
+    summary = tracer.stage_summary()
+    if summary:
+        st.table(summary)
+    else:
+        st.write("Belum ada permintaan yang tercatat.")
+
+    st.markdown("### 🧠 Backend LLM (urutan failover)")
+    # Latensi per permintaan yang benar-benar dikirim (tanpa hit cache) dan token keluaran per detik
+    st.table(backend_stats())
+
+    st.markdown("### 🔢 Penghitung")
+    counters = tracer.counters()
+    if counters:
+        st.table([{**c, "value": f"{c['value']:g}"} for c in counters])
+
+    st.markdown("### 💾 Cache")
+    st.table([
+        {"cache": "rekomendasi", **get_cache().stats},
+        {"cache": "tts", **cache_stats()},
+    ])
+
+    st.markdown("### 🚦 Antrean Permintaan OpenAI")
+    limiter = get_limiter()
+    st.table([{
+        "aktif": limiter.active, "menunggu": limiter.waiting, "batas": limiter.max_concurrent,
+        **limiter.stats, **get_single_flight().stats,
+    }])
+
+    st.markdown("### 🧵 Antrean Pekerjaan Background")
+    job_counts = get_job_queue().status_counts()
+    if job_counts:
+        st.table(job_counts)
+    else:
+        st.write("Belum ada pekerjaan.")
+
+    st.markdown("### 🗂️ Artefak (PDF & Audio)")
+    st.table([get_job_queue().artifacts.usage()])
+
+    with st.expander("Format Prometheus"):
+        st.code(tracer.prometheus_text(), language="text")
+
+    if st.button("Reset metrik", key="btn_reset_metrik"):
+        tracer.reset()
+        st.rerun()
+
+
+main()
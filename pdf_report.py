@@ -0,0 +1,349 @@
+"""Laporan PDF rekomendasi: satu siswa, gabungan satu kelas, atau ZIP berisi PDF per siswa.
+
+Font Unicode (DejaVu Sans) diurai sekali per proses lalu dipakai ulang oleh
+setiap dokumen, sehingga tanda kutip tipografis, huruf beraksen, dan simbol
+dari jawaban model ikut tercetak. Jika font tidak ditemukan, dipakai font
+bawaan PDF dan teks diturunkan ke Latin-1. Karakter tanpa glyph (mis. emoji)
+dibuang agar pembuatan PDF tidak gagal.
+
+Font DejaVu Sans disertakan di direktori `fonts/` repo (lisensi di fonts/LICENSE).
+Modul ini bergantung pada bagian internal fpdf 1.7.2 (`fpdf.fpdf.TTFontFile`,
+`FPDF.fonts`/`font_files`, daftar subset per font), karena itu versinya
+dipatok di requirements.txt; periksa ulang modul ini sebelum menaikkan versi.
+"""
+import hashlib
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+
+from recommendation_schema import HasilRekomendasi, RecommendationParseError
+from tracing import tracer
+
+# Jumlah PDF yang disimpan di memori (per hash rekomendasi) sebelum yang paling lama dibuang
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PILIH_KAMPUS_PDF_CACHE_MAX_ENTRIES", "256"))
+PDF_FONT_DIR = os.getenv(
+    "PILIH_KAMPUS_PDF_FONT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+)
+FONT_FAMILY = "DejaVu"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}
+FALLBACK_FAMILY = "Arial"
+REPORT_TITLE = "Hasil Rekomendasi Jurusan & Kampus"
+# Kolom tabel rekomendasi (judul, lebar mm, perataan); total = lebar area cetak A4 dengan margin 10 mm
+TABLE_COLUMNS = [("No", 10, "C"), ("Kampus", 70, "L"), ("Jurusan", 75, "L"), ("Peluang (%)", 35, "C")]
+TABLE_WIDTH = sum(width for _, width, _ in TABLE_COLUMNS)
+LINE_HEIGHT = 6
+# Subset font TTF yang sudah dibuat, per (berkas font, daftar glyph); dokumen dengan glyph sama memakainya ulang
+FONT_SUBSET_CACHE_MAX_ENTRIES = 64
+# Glyph yang selalu disertakan (ASCII tercetak) agar kebanyakan dokumen punya subset yang sama
+BASE_GLYPHS = list(range(32, 127))
+# Pengganti karakter tipografis yang sering muncul di jawaban model untuk font Latin-1
+LATIN1_REPLACEMENTS = str.maketrans({
+    "“": '"', "”": '"', "‘": "'", "’": "'", "–": "-", "—": "-",
+    "…": "...", "•": "-",
+})
+
+# Satu siswa dalam laporan kelas; `id` dipakai sebagai nama berkas di ZIP
+StudentReport = namedtuple("StudentReport", ["id", "nama", "profil", "rekomendasi"])
+
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+_subset_cache = OrderedDict()
+_subset_cache_lock = threading.Lock()
+
+
+def format_recommendation_for_pdf(hasil):
+    """Menyusun baris teks rekomendasi untuk PDF dari hasil terstruktur."""
+    return "\n".join(
+        f"{i+1}. {item.kampus} - {item.jurusan} (Peluang diterima: {item.peluang_text}%)"
+        + (f"\n   {item.alasan}" if item.alasan else "")
+        for i, item in enumerate(hasil)
+    )
+
+
+def _recommendation_text(rekomendasi):
+    if isinstance(rekomendasi, HasilRekomendasi):
+        # Rekomendasi sudah terstruktur, jadi tidak perlu membersihkan sintaks markdown
+        return format_recommendation_for_pdf(rekomendasi)
+    return rekomendasi
+
+
+def _as_structured(rekomendasi):
+    """Teks bebas dari app.py/app_ori.py diurai ke tabel jika formatnya dikenali."""
+    if isinstance(rekomendasi, HasilRekomendasi):
+        return rekomendasi
+    try:
+        return HasilRekomendasi.parse(rekomendasi, min_items=1)
+    except RecommendationParseError:
+        return None
+
+
+def recommendation_hash(profil, rekomendasi):
+    """Kunci cache PDF berdasarkan isi profil dan rekomendasi."""
+    content = f"{profil}\x00{_recommendation_text(rekomendasi)}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _safe_filename(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name)) or "siswa"
+
+
+def unique_filename(student_id, used_names):
+    """Nama file aman untuk satu siswa yang belum ada di `used_names` (lalu dicatat di sana).
+
+    ID yang sama, atau yang menjadi sama setelah dibersihkan ("A/1" dan "A 1"), diberi
+    akhiran _2, _3, ... sesuai urutan kemunculan agar PDF tidak saling menimpa.
+    """
+    base = name = _safe_filename(student_id)
+    index = 1
+    while name in used_names:
+        index += 1
+        name = f"{base}_{index}"
+    used_names.add(name)
+    return name
+
+
+class _GlyphSubset(list):
+    """Daftar glyph terpakai dengan pengecekan keanggotaan O(1); FPDF._putTTfontwidths memeriksanya
+    untuk setiap kode karakter di font (~65 ribu)."""
+
+    def __init__(self, codes):
+        super().__init__(codes)
+        self._codes = frozenset(codes)
+
+    def __contains__(self, code):
+        return code in self._codes
+
+
+def _enable_subset_cache():
+    """fpdf 1.7 mengurai ulang seluruh berkas TTF untuk membuat subset font setiap kali dokumen ditulis
+    (puluhan milidetik per PDF); hasilnya di-cache per daftar glyph."""
+    from fpdf import fpdf as fpdf_module
+
+    base = fpdf_module.TTFontFile
+    if getattr(base, "subset_cache", False):
+        return
+
+    class CachedSubsetTTFontFile(base):
+        subset_cache = True
+
+        def makeSubset(self, file, subset):
+            key = (file, tuple(subset))
+            with _subset_cache_lock:
+                cached = _subset_cache.get(key)
+                if cached is not None:
+                    _subset_cache.move_to_end(key)
+            if cached is not None:
+                # Hanya atribut ini yang dibaca FPDF._putfonts setelah makeSubset
+                self.codeToGlyph, self.maxUni, stream = cached
+                return stream
+            stream = base.makeSubset(self, file, subset)
+            with _subset_cache_lock:
+                _subset_cache[key] = (self.codeToGlyph, self.maxUni, stream)
+                while len(_subset_cache) > FONT_SUBSET_CACHE_MAX_ENTRIES:
+                    _subset_cache.popitem(last=False)
+            return stream
+
+    fpdf_module.TTFontFile = CachedSubsetTTFontFile
+
+
+class ReportEngine:
+    """Membuat dokumen FPDF dengan font yang sudah dimuat; satu instans dipakai bersama seluruh proses."""
+
+    def __init__(self, font_dir=PDF_FONT_DIR):
+        import fpdf # Diimpor saat PDF pertama dibuat, bukan saat aplikasi dimuat
+
+        # Metrik font disimpan di memori proses, bukan sebagai berkas .pkl di samping font sistem
+        fpdf.set_global("FPDF_CACHE_MODE", 1)
+        self._fpdf_class = fpdf.FPDF
+        self._fonts = {}
+        self._font_files = {}
+        self._widths = ()
+        paths = {style: os.path.join(font_dir, name) for style, name in FONT_FILES.items()}
+        self.unicode = all(os.path.exists(path) for path in paths.values())
+        if self.unicode:
+            # Dokumen contoh hanya dipakai untuk mengurai TTF; hasilnya disalin ke setiap dokumen baru
+            probe = self._fpdf_class()
+            for style, path in paths.items():
+                probe.add_font(FONT_FAMILY, style, path, uni=True)
+            self._fonts = probe.fonts
+            self._font_files = probe.font_files
+            self._widths = probe.fonts[FONT_FAMILY.lower()]["cw"]
+            _enable_subset_cache()
+        self.family = FONT_FAMILY if self.unicode else FALLBACK_FAMILY
+
+    def new_document(self):
+        pdf = self._fpdf_class()
+        pdf.set_margins(10, 10)
+        pdf.set_auto_page_break(auto=True, margin=15)
+        for key, font in self._fonts.items():
+            # Lebar glyph (cw) dipakai bersama; daftar glyph yang dipakai (subset) milik masing-masing dokumen
+            pdf.fonts[key] = dict(font, i=len(pdf.fonts) + 1, subset=font["subset"] + BASE_GLYPHS)
+        pdf.font_files.update({name: dict(info) for name, info in self._font_files.items()})
+        return pdf
+
+    def clean(self, text):
+        """Menyaring karakter yang tidak bisa dicetak dengan font aktif."""
+        text = str(text or "")
+        if not self.unicode:
+            return text.translate(LATIN1_REPLACEMENTS).encode("latin-1", "ignore").decode("latin-1")
+        widths = self._widths
+        return "".join(ch for ch in text if ch == "\n" or (ord(ch) < len(widths) and widths[ord(ch)]))
+
+    def add_report(self, pdf, profil, rekomendasi, nama=None):
+        """Menambahkan laporan satu siswa mulai dari halaman baru."""
+        pdf.add_page()
+        pdf.set_font(self.family, "B", 16)
+        pdf.cell(0, 10, REPORT_TITLE, ln=True, align="C")
+        if nama:
+            pdf.set_font(self.family, "", 12)
+            pdf.cell(0, 7, self.clean(nama), ln=True, align="C")
+        pdf.ln(6)
+
+        pdf.set_font(self.family, "B", 13)
+        pdf.cell(0, 8, "Profil Pengguna", ln=True)
+        pdf.set_font(self.family, "", 11)
+        # Ringkasan profil app.py memakai penanda tebal markdown
+        pdf.multi_cell(0, LINE_HEIGHT, self.clean(str(profil).replace("**", "")))
+        pdf.ln(4)
+
+        pdf.set_font(self.family, "B", 13)
+        pdf.cell(0, 8, "Rekomendasi", ln=True)
+        hasil = _as_structured(rekomendasi)
+        if hasil:
+            self._table(pdf, hasil)
+        else:
+            pdf.set_font(self.family, "", 11)
+            pdf.multi_cell(0, LINE_HEIGHT, self.clean(rekomendasi))
+
+    def _table_header(self, pdf):
+        pdf.set_font(self.family, "B", 10)
+        pdf.set_fill_color(230, 230, 230)
+        for title, width, _ in TABLE_COLUMNS:
+            pdf.cell(width, LINE_HEIGHT + 1, title, border=1, align="C", fill=1)
+        pdf.ln()
+        pdf.set_font(self.family, "", 10)
+
+    def _table(self, pdf, hasil):
+        self._table_header(pdf)
+        for i, item in enumerate(hasil, start=1):
+            cells = [str(i), self.clean(item.kampus), self.clean(item.jurusan), item.peluang_text]
+            lines = max(len(pdf.multi_cell(width, LINE_HEIGHT, text, split_only=True))
+                        for (_, width, _), text in zip(TABLE_COLUMNS, cells))
+            height = lines * LINE_HEIGHT
+            alasan = self.clean(item.alasan)
+            if alasan:
+                pdf.set_font(self.family, "", 9)
+                height += len(pdf.multi_cell(TABLE_WIDTH, LINE_HEIGHT - 1, alasan, split_only=True)) * (LINE_HEIGHT - 1)
+                pdf.set_font(self.family, "", 10)
+            # Satu baris (beserta alasannya) tidak dipotong di tengah halaman
+            if pdf.get_y() + height > pdf.page_break_trigger:
+                pdf.add_page()
+                self._table_header(pdf)
+            x, y = pdf.get_x(), pdf.get_y()
+            for (_, width, align), text in zip(TABLE_COLUMNS, cells):
+                pdf.rect(x, y, width, lines * LINE_HEIGHT)
+                pdf.set_xy(x, y)
+                pdf.multi_cell(width, LINE_HEIGHT, text, align=align)
+                x += width
+            pdf.set_xy(pdf.l_margin, y + lines * LINE_HEIGHT)
+            if alasan:
+                pdf.set_font(self.family, "", 9)
+                pdf.multi_cell(TABLE_WIDTH, LINE_HEIGHT - 1, alasan, border=1)
+                pdf.set_font(self.family, "", 10)
+
+    def output(self, pdf):
+        # fpdf 1.7 mencatat setiap karakter yang ditulis ke subset (dengan duplikat) lalu memeriksa keanggotaannya
+        # untuk setiap kode karakter; tanpa diringkas, dokumen gabungan satu kelas melambat kuadratik
+        for font in pdf.fonts.values():
+            if font.get("type") == "TTF":
+                font["subset"] = _GlyphSubset([0] + sorted(set(font["subset"]) - {0}))
+        # dest="S" menghasilkan dokumen sebagai string (fpdf 1.x) atau bytearray (fpdf2), tanpa file
+        output = pdf.output(dest="S")
+        if isinstance(output, str):
+            output = output.encode("latin-1")
+        return bytes(output)
+
+    def render(self, profil, rekomendasi, nama=None):
+        pdf = self.new_document()
+        self.add_report(pdf, profil, rekomendasi, nama)
+        return self.output(pdf), pdf.page
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_report_engine():
+    """Mesin laporan bersama untuk seluruh proses (font dimuat sekali)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ReportEngine()
+        return _engine
+
+
+def render_pdf(profil, rekomendasi, nama=None):
+    """Membuat PDF rekomendasi langsung di memori dan mengembalikannya sebagai bytes."""
+    pdf_bytes, pages = get_report_engine().render(profil, rekomendasi, nama)
+    tracer.incr("pdf_pages_total", pages, report="siswa")
+    return pdf_bytes
+
+
+def render_class_pdf(reports, output):
+    """Satu PDF untuk seluruh kelas ke path/berkas `output`; `reports` (StudentReport) dibaca sekali.
+
+    Mengembalikan jumlah halaman.
+    """
+    engine = get_report_engine()
+    with tracer.stage("render_class_report", format="pdf") as span:
+        pdf = engine.new_document()
+        for report in reports:
+            engine.add_report(pdf, report.profil, report.rekomendasi, report.nama)
+        pdf_bytes = engine.output(pdf)
+        if hasattr(output, "write"):
+            output.write(pdf_bytes)
+        else:
+            with open(output, "wb") as f:
+                f.write(pdf_bytes)
+        span["pages"] = pdf.page
+    tracer.incr("pdf_pages_total", pdf.page, report="kelas")
+    return pdf.page
+
+
+def render_class_zip(reports, output):
+    """ZIP berisi satu PDF per siswa; setiap PDF langsung ditulis ke arsip begitu selesai dibuat.
+
+    Mengembalikan jumlah halaman seluruh PDF.
+    """
+    engine = get_report_engine()
+    pages = 0
+    with tracer.stage("render_class_report", format="zip") as span, \
+            zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        used_names = set()
+        for report in reports:
+            pdf_bytes, report_pages = engine.render(report.profil, report.rekomendasi, report.nama)
+            zf.writestr(f"{unique_filename(report.id, used_names)}.pdf", pdf_bytes)
+            pages += report_pages
+        span["pages"] = pages
+    tracer.incr("pdf_pages_total", pages, report="zip")
+    return pages
+
+
+def get_pdf_bytes(profil, rekomendasi):
+    """Mengembalikan PDF dari cache per hash rekomendasi, dibuat hanya jika belum ada."""
+    key = recommendation_hash(profil, rekomendasi)
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            tracer.record_cache("pdf", True)
+            return _pdf_cache[key]
+    tracer.record_cache("pdf", False)
+    with tracer.stage("render_pdf"):
+        pdf_bytes = render_pdf(profil, rekomendasi)
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf_bytes
+        while len(_pdf_cache) > PDF_CACHE_MAX_ENTRIES:
+            _pdf_cache.popitem(last=False)
+    return pdf_bytes
@@ -1,148 +1,487 @@
+import json
 import os
-import openai
+import uuid
+from dataclasses import asdict
+from functools import partial
 import streamlit as st
-from fpdf import FPDF
-import uuid # Untuk nama file audio yang unik
+from campus_catalog import Kandidat, format_candidates_for_prompt, rank_candidates
+from job_queue import FINISHED_STATUSES, STATUS_DONE, STATUS_ERROR, JobPlaceholder, get_job_queue
+from major_index import build_profile_query, get_index
+from llm_backend import fallback_notice, get_backends, get_chat_backend, get_tts_backend
+from model_router import (
+    DRAFT_MAX_TOKENS, TIER_LABELS,
+    RoutedRecommendation, describe_reasons, profile_ambiguity, route_recommendation,
+)
+from pdf_report import get_pdf_bytes
+from prompt_budget import (
+    PROFILE_LEGEND, PromptBudgetExceeded, count_tokens, encode_profile, fit_candidates, measure_prompt,
+    report_savings,
+)
+from profile_delta import FIELD_LABELS, MODE_DELTA, MODE_REUSE, describe_changes, plan_rerecommendation
+from recommendation_cache import get_cache, make_cache_key
+from recommendation_schema import (
+    HasilRekomendasi, IncompleteRecommendation, RecommendationParseError, is_valid_recommendation,
+)
+from recommendation_stream import STREAMING_ENABLED, iter_completion_deltas, render_stream
+from request_coalescing import QueueTimeout, queue_notice, run_coalesced
+from speech_cache import get_speech
+from tracing import start_metrics_server, tracer
 
-# --- Inisialisasi Klien OpenAI ---
-# Pastikan OPENAI_API_KEY sudah diatur di environment variable Anda
+# Backend LLM dan urutan failover-nya diatur di llm_backend.py (PILIH_KAMPUS_LLM_BACKENDS, PILIH_KAMPUS_OFFLINE)
+# Jenis pekerjaan di antrean background (lihat job_queue.py) dan interval polling halaman
+JOB_REKOMENDASI = "rekomendasi"
+JOB_SUARA = "suara"
+JOB_POLL_SECONDS = float(os.getenv("PILIH_KAMPUS_JOB_POLL_SECONDS", "1"))
+
+# --- Inisialisasi Backend LLM ---
+# Untuk OpenAI, pastikan OPENAI_API_KEY sudah diatur di environment variable Anda
 # atau di Streamlit secrets jika dideploy.
-try:
-    client = openai.OpenAI()
-    # Tes koneksi ringan untuk memastikan API key valid
-    client.models.list(limit=1)
-except openai.AuthenticationError as e:
-    st.error(
-        "Autentikasi OpenAI gagal. Pastikan variabel lingkungan OPENAI_API_KEY Anda sudah diatur dengan benar dan valid. "
-        "Jika menggunakan Streamlit Cloud, pastikan sudah diatur di Secrets."
+# Klien dibuat sekali per proses (lihat openai_client.py dan llm_backend.py) dan dipakai bersama
+# oleh semua sesi, bukan dibuat ulang setiap kali script di-rerun.
+def ensure_llm_ready():
+    """Mengembalikan True jika ada backend LLM yang bisa dipakai; jika tidak, aplikasi lanjut dalam mode offline."""
+    backends = [backend for backend in get_backends() if backend.is_llm]
+    if not backends:
+        return False
+    # Tes koneksi ringan (sekali per proses) berjalan di background agar formulir tidak menunggu jaringan.
+    # Selama hasilnya belum diketahui, mode online diasumsikan; worker memeriksa ulang sebelum memanggil backend.
+    statuses = [backend.check_health(block=False) for backend in backends]
+    if any(status is None or status.ok for status in statuses):
+        return True
+    st.warning(f"{statuses[0].message} Rekomendasi akan dibuat dari katalog kampus lokal (mode offline).")
+    return False
+
+def build_profile_summary(form):
+    """Menyusun ringkasan profil (profil_ringkas) dari isian formulir dalam bentuk dict."""
+    return (
+        f"{form['nama']}, seorang {form['jenis_kelamin']} berusia {form['usia']} tahun dari {form['domisili']}, lulusan {form['sekolah']} dengan jurusan {form['jurusan_sma']} "
+        f"dan nilai rata-rata {form['nilai_rapor']}. Orang tua/wali, {form['nama_orangtua']}, bekerja sebagai {form['pekerjaan']} dengan pendapatan {form['pendapatan']}. "
+        f"Minat akademiknya meliputi {', '.join(form['mata_pelajaran'])}, aktivitas yang disukai {', '.join(form['aktivitas_suka'])}, dan lebih suka bekerja di {form['lingkungan_kerja']}. "
+        f"Mereka ingin berkarier di bidang {form['karier']} dan lebih suka bekerja dalam {form['kerja_tim']}. Kampus idealnya adalah {form['jenis_kampus']} "
+        f"dengan faktor utama {', '.join(form['faktor_kampus'])}."
+        f" Dengan mempertimbangkan Prospek Karier dan Pengembangan Diri: "
+        f"Potensi Gaji Tinggi: {form['gaji_tinggi']}/5, "
+        f"Stabilitas Pekerjaan: {form['stabilitas_pekerjaan']}/5, "
+        f"Kesempatan Kerja di Luar Negeri: {form['kesempatan_luar_negeri']}/5, "
+        f"Fleksibilitas Karier: {form['fleksibilitas_karier']}/5, "
+        f"Kesesuaian dengan Minat Pribadi: {form['hobi_minat']}/5."
+    )
+
+def shortlist_candidates(form, profil):
+    """Shortlist kampus x jurusan: kemiripan teks profil ke deskripsi jurusan + skor katalog lokal."""
+    index = get_index()
+    kemiripan = dict(index.search([build_profile_query(form, profil)], k=15)[0]) if index is not None else None
+    return rank_candidates(form, major_similarity=kemiripan)
+
+# Keluaran diminta sebagai JSON Lines agar bisa divalidasi sekali dan tetap bisa di-stream per baris
+OUTPUT_FORMAT = (
+    "Format keluaran yang diharapkan (tepat 3 baris JSON, satu objek per baris, tanpa teks lain):\n"
+    '{"kampus": "...", "jurusan": "...", "peluang_diterima": 0-100, "alasan": "..."}\n'
+    '{"kampus": "...", "jurusan": "...", "peluang_diterima": 0-100, "alasan": "..."}\n'
+    '{"kampus": "...", "jurusan": "...", "peluang_diterima": 0-100, "alasan": "..."}'
+)
+# Instruksi statis ada di pesan system (prefiks yang identik untuk setiap permintaan, bisa di-cache API);
+# pesan user hanya berisi data yang berubah: profil ringkas dan kandidat
+SYSTEM_PROMPT = (
+    "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus dalam format JSON Lines. "
+    "Pilih 3 jurusan dari 3 kampus berbeda yang paling sesuai dengan profil siswa, utamakan daftar kandidat "
+    "hasil penyaringan jika diberikan. Sesuaikan peluang diterima jika perlu dan beri alasan singkat (maks. 15 kata).\n\n"
+    f"{PROFILE_LEGEND}\n\n{OUTPUT_FORMAT}"
+)
+# Format lama (kalimat bebas + instruksi di setiap prompt); hanya dipakai sebagai pembanding penghematan token
+VERBOSE_SYSTEM_PROMPT = "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus dalam format JSON Lines."
+
+def generate_prompt(form, kandidat=None):
+    if not kandidat:
+        return f"Profil:\n{encode_profile(form)}"
+    # Kandidat sudah disaring oleh katalog lokal; model cukup memilih, menyesuaikan, dan menjelaskan
+    return f"Profil:\n{encode_profile(form)}\n\nKandidat:\n{format_candidates_for_prompt(kandidat)}"
+
+def generate_verbose_prompt(profil, kandidat=None):
+    if not kandidat:
+        return (
+            f"Berikan rekomendasi 3 jurusan dari 3 kampus sesuai dengan profil berikut ini "
+            f"serta peluang untuk dapat diterima:\n\n{profil}\n\n{OUTPUT_FORMAT}"
+        )
+    return (
+        f"Dari kandidat hasil penyaringan berikut, pilih 3 jurusan dari 3 kampus berbeda yang paling sesuai "
+        f"dengan profil. Sesuaikan peluang diterima jika perlu dan beri alasan singkat (maks. 15 kata).\n\n"
+        f"Profil: {profil}\n\nKandidat:\n{format_candidates_for_prompt(kandidat)}\n\n{OUTPUT_FORMAT}"
     )
-    st.stop() # Hentikan eksekusi jika klien tidak bisa diinisialisasi
-except Exception as e:
-    st.error(f"Gagal menginisialisasi klien OpenAI: {e}")
-    st.stop()
 
-def generate_prompt(profil):
+def generate_delta_prompt(changes, previous, kandidat):
+    """Prompt pendek untuk rekomendasi ulang: hanya perubahan isian, rekomendasi sebelumnya, dan shortlist terbaru."""
     return (
-        f"Berikan rekomendasi 3 jurusan dari 3 kampus sesuai dengan profil berikut ini dan sajikan dalam bentuk tabular "
-        f"serta peluang untuk dapat diterima:\n\n{profil}\n\nFormat keluaran yang diharapkan:\n"
-        "| Kampus | Jurusan | Peluang Diterima (%) |\n"
-        "|--------|---------|--------------------|\n"
-        "| ...    | ...     | ...                |\n"
-        "| ...    | ...     | ...                |\n"
-        "| ...    | ...     | ...                |"
+        f"Rekomendasi sebelumnya untuk siswa ini:\n{previous.to_json()}\n\n"
+        f"Siswa mengubah isian formulir berikut:\n{describe_changes(changes)}\n\n"
+        f"Perbarui rekomendasi berdasarkan perubahan tersebut: pertahankan pilihan yang masih sesuai dan ganti "
+        f"yang tidak lagi sesuai dengan kandidat terbaru di bawah.\n\n"
+        f"Kandidat (urut dari yang paling cocok menurut katalog):\n{format_candidates_for_prompt(kandidat, compact=True)}"
     )
 
-def call_openai_api(prompt_text):
-    # Menggunakan klien global yang sudah diinisialisasi
-    response = client.chat.completions.create(
-        model="gpt-4",  # Pertimbangkan gpt-3.5-turbo untuk kecepatan & biaya jika gpt-4 tidak krusial
-        messages=[
-            {"role": "system", "content": "Anda adalah asisten yang memberikan rekomendasi jurusan dan kampus dalam format tabel markdown."},
-            {"role": "user", "content": prompt_text}
-        ],
+def build_messages(prompt_text, history=(), system_prompt=SYSTEM_PROMPT):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt_text},
+        *history,
+    ]
+
+def call_openai_api(prompt_text, placeholder=None, model=None, max_tokens=None, timeout=None, history=(), backend=None):
+    """Memanggil chat completions. `history` berisi pesan lanjutan (mis. draf + instruksi penyempurnaan).
+
+    `backend` adalah backend LLM dari llm_backend.py (OpenAI atau server lokal); bawaannya backend LLM
+    pertama di rantai, dengan model tier tertingginya.
+    """
+    backend = backend or get_chat_backend()
+    request_params = dict(
+        model=model or backend.tiers.refine or backend.tiers.draft,  # Tier draf/penyempurnaan diatur di model_router.py
+        messages=build_messages(prompt_text, history),
         temperature=0.7,
         top_p=0.9
     )
-    return response.choices[0].message.content
+    if max_tokens:
+        request_params["max_tokens"] = max_tokens
 
-def format_recommendation_for_speech(markdown_table_text):
-    """Mengubah tabel markdown rekomendasi menjadi teks yang lebih alami untuk TTS."""
-    lines = markdown_table_text.strip().split('\n')
-    speakable_parts = []
+    usage, computed, led = [], [], []
+    render = lambda text: HasilRekomendasi.parse_partial(text).to_markdown()
 
-    if len(lines) < 3: # Header, separator, minimal 1 data
-        return "Format rekomendasi tidak sesuai untuk dibacakan."
+    def request_completion(flight):
+        led.append(True)
+        # Menggunakan klien bersama dengan connection pool; jumlah permintaan serentak dibatasi per backend
+        client = backend.client()
+        if timeout is not None:
+            # Tier dengan SLO tidak mencoba ulang sendiri; kegagalannya dinaikkan ke tier berikutnya
+            client = client.with_options(timeout=timeout, max_retries=0)
+        with backend.limiter.slot(on_wait=queue_notice(placeholder)), backend.request() as backend_span:
+            if placeholder is None or not STREAMING_ENABLED:
+                response = client.chat.completions.create(**request_params)
+                usage.append(response.usage)
+                text = response.choices[0].message.content
+            else:
+                # Mode streaming: baris tabel langsung tampil tanpa menunggu jawaban utuh
+                stream = client.chat.completions.create(
+                    **request_params, stream=True, stream_options={"include_usage": True}
+                )
+                text = render_stream(
+                    flight.tee(iter_completion_deltas(stream, on_usage=usage.append)), placeholder, render=render
+                )
+            # Server lokal tidak selalu melaporkan usage; throughput lalu dihitung dari perkiraan token
+            backend_span["completion_tokens"] = (
+                usage[-1].completion_tokens if usage and usage[-1] is not None else count_tokens(text or "")
+            )
+            return text
 
-    # Baris data dimulai dari indeks 2 (setelah header dan separator)
-    data_lines = lines[2:]
-    
-    speakable_parts.append("Berikut adalah rekomendasi jurusan dan kampus untuk Anda:")
-    
-    for i, line in enumerate(data_lines):
-        cells = [cell.strip() for cell in line.strip('|').split('|')]
-        if len(cells) == 3:
-            kampus, jurusan, peluang = cells[0], cells[1], cells[2]
-            # Hapus '%' jika ada dan ganti dengan kata 'persen' untuk pembacaan yang lebih baik
-            peluang_text = peluang.replace('%', '').strip() + " persen"
-            speakable_parts.append(f"Rekomendasi ke-{i+1}: Kampus {kampus}, jurusan {jurusan}, dengan peluang diterima {peluang_text}.")
-        else:
-            # Jika ada baris yang tidak sesuai format, lewati atau catat
-            print(f"Melewati baris dengan format tidak sesuai: {line}")
-            
-    if len(speakable_parts) == 1 and len(data_lines) > 0 : # Hanya ada intro, tapi ada data yg gagal parse
-        return "Ada beberapa data rekomendasi yang tidak bisa dibacakan karena formatnya. Silakan periksa teks."
-    elif len(speakable_parts) == 1: # Tidak ada data yang berhasil diparsing
+    # Cache berbasis isi: profil yang sama tidak dikirim ulang ke API.
+    # Hanya jawaban yang valid sesuai skema yang disimpan.
+    cache_key = make_cache_key(**request_params)
+
+    def compute():
+        computed.append(True)
+        # Sesi lain yang mengirim prompt sama pada saat bersamaan ikut memakai permintaan (dan stream) ini
+        return run_coalesced(cache_key, request_completion, placeholder, render)
+
+    with tracer.stage("call_openai_api", model=request_params["model"], backend=backend.name) as span:
+        # Perkiraan token sebelum dikirim; prefix_tokens adalah pesan system statis yang bisa di-cache API
+        measure = measure_prompt(request_params["messages"], max_tokens)
+        span["prompt_tokens_estimated"] = measure.prompt_tokens
+        span["prefix_tokens"] = measure.prefix_tokens
+        text = get_cache().get_or_compute(cache_key, compute, validate=is_valid_recommendation)
+        span["cache_hit"] = not computed
+        span["coalesced"] = bool(computed) and not led
+        tracer.record_cache("rekomendasi", span["cache_hit"])
+        if usage and usage[-1] is not None:
+            tracer.record_usage(usage[-1], "call_openai_api")
+            span["prompt_tokens"] = usage[-1].prompt_tokens
+            span["completion_tokens"] = usage[-1].completion_tokens
+    return text
+
+def format_recommendation_for_speech(hasil):
+    """Mengubah hasil rekomendasi terstruktur menjadi teks yang lebih alami untuk TTS."""
+    if not hasil: # Tidak ada data rekomendasi yang valid
         return "Tidak ada data rekomendasi yang dapat dibacakan."
-        
+
+    speakable_parts = ["Berikut adalah rekomendasi jurusan dan kampus untuk Anda:"]
+    for i, item in enumerate(hasil):
+        # Angka peluang dibacakan dengan kata 'persen' agar lebih natural
+        speakable_parts.append(
+            f"Rekomendasi ke-{i+1}: Kampus {item.kampus}, jurusan {item.jurusan}, "
+            f"dengan peluang diterima {item.peluang_text} persen."
+        )
+        if item.alasan:
+            speakable_parts.append(item.alasan)
     return " ".join(speakable_parts)
 
-def generate_and_play_speech(text_to_speak, voice_choice="nova"):
-    """Menghasilkan audio dari teks dan menyiapkannya untuk st.audio."""
-    temp_audio_filename = f"temp_audio_{uuid.uuid4()}.mp3"
+def speech_artifact_name(voice):
+    return f"audio_{voice}"
+
+def submit_speech_job(job_id, hasil, voice, session_id):
+    """Menjadwalkan sintesis suara; audionya disimpan sebagai artefak pekerjaan rekomendasi `job_id`."""
+    with tracer.stage("format_recommendation_for_speech"):
+        speakable_text = format_recommendation_for_speech(hasil)
+    return get_job_queue().submit(
+        JOB_SUARA, {"parent_id": job_id, "text": speakable_text, "voice": voice, "session_id": session_id}
+    )
+
+def run_speech_job(payload, job):
+    """Worker: audio diambil dari cache jika teks & suara sama, atau di-stream langsung ke memori.
+
+    Backend suara dipilih dari rantai backend (lihat llm_backend.py); tanpa backend TTS pekerjaan ini gagal
+    dengan pesan yang ditampilkan di halaman.
+    """
+    audio_bytes = get_speech(payload["text"], payload["voice"])
+    get_job_queue().save_artifact(
+        payload["parent_id"], speech_artifact_name(payload["voice"]), audio_bytes, session_id=payload.get("session_id")
+    )
+    return {"bytes": len(audio_bytes)}
+
+def build_pdf(profil_text, recommendation):
+    with tracer.stage("save_as_pdf"):
+        return get_pdf_bytes(profil_text, recommendation)
+
+def reused_recommendation(previous_result):
+    """Rekomendasi sebelumnya dipakai apa adanya (tanpa health check maupun panggilan LLM)."""
+    previous = HasilRekomendasi.from_json(json.dumps(previous_result["recommendation"]))
+    return RoutedRecommendation(
+        previous_result["recommendation_text"], previous, MODE_REUSE, previous_result["tier"]["model"], ()
+    )
+
+def incremental_recommendation(plan, previous_result, kandidat, placeholder, backend):
+    """Memperbarui hasil sebelumnya dengan prompt delta.
+
+    Mengembalikan None jika prompt delta gagal, agar pemanggil beralih ke routing lengkap.
+    """
+    import openai
+
+    model = backend.tiers.draft
+
+    previous = HasilRekomendasi.from_json(json.dumps(previous_result["recommendation"]))
     try:
-        # Menggunakan klien global
-        response_audio = client.audio.speech.create(
-            model="tts-1",          # atau "tts-1-hd" untuk kualitas lebih tinggi
-            voice=voice_choice,     # pilihan: alloy, echo, fable, onyx, nova, shimmer
-            input=text_to_speak,
-            response_format="mp3"
+        with tracer.stage("llm_delta", model=model, fields=list(plan.changes)) as span:
+            text = call_openai_api(
+                generate_delta_prompt(plan.changes, previous, kandidat), placeholder,
+                model=model, max_tokens=DRAFT_MAX_TOKENS, timeout=backend.tiers.draft_timeout, backend=backend,
+            )
+            hasil = HasilRekomendasi.parse(text)
+            span["items"] = len(hasil)
+    except IncompleteRecommendation:
+        tracer.incr("escalations_total", reason="delta_incomplete")
+        return None
+    except (RecommendationParseError, openai.APIError):
+        tracer.incr("escalations_total", reason="delta_failed")
+        return None
+    return RoutedRecommendation(text, hasil, MODE_DELTA, model, ())
+
+def llm_recommendation(backend, payload, form, kandidat, profil_ringkas, ambiguitas, plan, placeholder):
+    """Rekomendasi dari satu backend LLM: inkremental bila memungkinkan, jika tidak draf/penyempurnaan."""
+    routed = None
+    if plan.mode == MODE_DELTA:
+        previous = get_job_queue().get(payload["previous_job_id"])
+        routed = incremental_recommendation(plan, previous.result, kandidat, placeholder, backend)
+    if routed is None:
+        # Kandidat terbawah dibuang jika prompt melebihi anggaran token
+        _, kandidat_prompt = fit_candidates(lambda k: build_messages(generate_prompt(form, k)), kandidat)
+        prompt_text = generate_prompt(form, kandidat_prompt)
+        report_savings(
+            build_messages(generate_verbose_prompt(profil_ringkas, kandidat), system_prompt=VERBOSE_SYSTEM_PROMPT),
+            build_messages(prompt_text), stage="rekomendasi",
         )
-        response_audio.stream_to_file(temp_audio_filename)
-        
-        with open(temp_audio_filename, "rb") as audio_file:
-            audio_bytes = audio_file.read()
-        
+        routed = route_recommendation(
+            partial(call_openai_api, backend=backend), prompt_text, reasons=ambiguitas,
+            deep=payload["deep"], draft_placeholder=placeholder, refine_placeholder=placeholder,
+            tiers=backend.tiers,
+        )
+    return routed
+
+def plan_for_job(payload, form, kandidat):
+    """Bandingkan dengan pekerjaan sebelumnya di sesi ini: sering kali hanya satu slider yang digeser."""
+    previous = get_job_queue().get(payload["previous_job_id"]) if payload.get("previous_job_id") else None
+    with tracer.stage("profile_diff"):
+        plan = plan_rerecommendation(
+            previous.payload["form"] if previous else {}, previous.result if previous else None,
+            form, kandidat, deep=payload["deep"],
+        )
+    tracer.incr("rerecommendations_total", mode=plan.mode, reason=plan.reason)
+    return plan
+
+def run_recommendation_job(payload, job):
+    """Worker: profil -> shortlist -> rekomendasi (rantai backend dengan failover) -> PDF."""
+    import openai # Dimuat di worker saat permintaan pertama, bukan saat halaman pertama kali tampil
+
+    form, online = payload["form"], payload["online"]
+    job.report(progress="Merangkum profil Anda...")
+    with tracer.stage("profile_assembly"):
+        profil_ringkas = build_profile_summary(form)
+        # Pra-peringkat lokal (milidetik, tanpa jaringan) agar model cukup menilai shortlist
+        kandidat = shortlist_candidates(form, profil_ringkas)
+        ambiguitas = profile_ambiguity(kandidat)
+    result = {
+        "profil_text": profil_ringkas, "kandidat": [asdict(c) for c in kandidat], "recommendation_text": None,
+        "recommendation": None, "tier": None, "messages": [], "speech_jobs": {},
+    }
+    hasil = None
+    # Rencana dihitung sebelum memilih backend: hasil yang dipakai ulang tidak butuh backend sama sekali
+    plan = plan_for_job(payload, form, result["kandidat"])
+    if plan.mode == MODE_REUSE:
+        previous_result = get_job_queue().get(payload["previous_job_id"]).result
+        routed = reused_recommendation(previous_result)
+        hasil = routed.hasil
+        result["recommendation_text"] = routed.text
+        result["tier"] = {
+            "tier": routed.tier, "model": routed.model, "reasons": [],
+            "changes": [FIELD_LABELS.get(name, name) for name in plan.changes],
+        }
+        if previous_result["tier"].get("backend"):
+            result["tier"]["backend"] = previous_result["tier"]["backend"]
+        backends = []
+    else:
+        # Halaman yang sudah tahu semua backend LLM gagal langsung memakai backend non-LLM (katalog lokal)
+        backends = [backend for backend in get_backends() if online or not backend.is_llm] or get_backends()
+    for i, backend in enumerate(backends):
+        next_backend = backends[i + 1] if i + 1 < len(backends) else None
+        if not backend.is_llm:
+            hasil = backend.recommend(kandidat)
+            result["tier"] = {"tier": "offline", "model": "pra-peringkat lokal", "reasons": []}
+            break
+        # Halaman tidak menunggu health check; di sini (di worker) hasilnya ditunggu sebelum memanggil backend
+        status = backend.check_health()
+        if not status.ok:
+            backend.record_failover("unhealthy")
+            result["messages"].append(["warning", f"{status.message} {fallback_notice(next_backend)}"])
+            continue
+        job.report(progress=f"Sedang memproses rekomendasi dari AI ({backend.label})... Mohon tunggu.")
+        # Draf cepat dan penyempurnaan ditampilkan lewat polling selagi token masih mengalir
+        placeholder = JobPlaceholder(job)
+        try:
+            routed = llm_recommendation(backend, payload, form, kandidat, profil_ringkas, ambiguitas, plan, placeholder)
+        except RecommendationParseError as e:
+            tracer.incr("errors_total", stage="parse_recommendation")
+            backend.record_failover("parse_error")
+            result["messages"].append(
+                ["warning", f"Format rekomendasi dari {backend.label} tidak valid: {e}. {fallback_notice(next_backend)}"]
+            )
+            continue
+        except (openai.OpenAIError, QueueTimeout, PromptBudgetExceeded) as e:
+            tracer.incr("fallbacks_total", reason=type(e).__name__)
+            backend.record_failover(type(e).__name__)
+            backend.report_failure(e)
+            result["messages"].append(
+                ["warning", f"{backend.label} tidak dapat dihubungi ({e}). {fallback_notice(next_backend)}"]
+            )
+            continue
+        hasil = routed.hasil
+        result["recommendation_text"] = routed.text
+        result["tier"] = {
+            "tier": routed.tier, "model": routed.model, "reasons": list(routed.reasons), "backend": backend.label,
+        }
+        if routed.tier == MODE_DELTA:
+            result["tier"]["changes"] = [FIELD_LABELS.get(name, name) for name in plan.changes]
+        break
+    if hasil:
+        result["recommendation"] = hasil.to_dicts()
+        job.report(progress="Menyiapkan PDF...")
+        job.save_artifact("pdf", build_pdf(profil_ringkas, hasil))
+        if get_tts_backend(block=True) is not None:
+            # Audio untuk suara yang sedang dipilih disiapkan di background agar tombol putar langsung merespons
+            result["speech_jobs"][payload["voice"]] = submit_speech_job(
+                job.id, hasil, payload["voice"], payload.get("session_id")
+            )
+    elif not result["messages"]:
+        result["messages"].append(["error", "Semua backend rekomendasi gagal. Silakan coba lagi."])
+    return result
+
+class SessionResult:
+    """Hasil yang ditampilkan di satu sesi; teks mentah model dan PDF/audio tetap di pekerjaan, bukan di session_state."""
+
+    __slots__ = ("job_id", "profil_text", "kandidat", "recommendation", "tier", "speech_jobs")
+
+    def __init__(self, job_id, profil_text, kandidat, recommendation, tier, speech_jobs):
+        self.job_id = job_id
+        self.profil_text = profil_text
+        self.kandidat = kandidat # tuple Kandidat dari katalog lokal
+        self.recommendation = recommendation # HasilRekomendasi yang sudah diurai sekali
+        self.tier = tier # Tier/model yang menyajikan rekomendasi
+        self.speech_jobs = speech_jobs # suara -> ID pekerjaan sintesis
+
+def load_job_result(job):
+    """Memuat hasil pekerjaan yang sudah selesai ke session_state (juga setelah reload halaman)."""
+    st.session_state.loaded_job_id = job.id
+    # Setelah reload, sesi baru melanjutkan anggaran artefak sesi yang membuat pekerjaan ini
+    st.session_state.session_id = job.payload.get("session_id") or st.session_state.session_id
+    st.session_state.play_voice = None
+    st.session_state.hasil = None
+    if job.status == STATUS_ERROR:
+        st.session_state.job_messages = [["error", f"Gagal membuat rekomendasi: {job.error}"]]
+        return
+    result = job.result
+    if result["recommendation"]:
+        st.session_state.hasil = SessionResult(
+            job.id, result["profil_text"], tuple(Kandidat(**c) for c in result["kandidat"]),
+            HasilRekomendasi.from_json(json.dumps(result["recommendation"])), result["tier"],
+            dict(result["speech_jobs"]),
+        )
+    st.session_state.job_messages = result["messages"]
+    st.session_state.show_success_message = st.session_state.hasil is not None
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_id):
+    """Menampilkan status pekerjaan secara berkala, lalu me-rerun halaman begitu selesai."""
+    job = get_job_queue().get(job_id)
+    if job is None or job.status in FINISHED_STATUSES:
+        st.rerun()
+    st.info(job.progress or "Menunggu giliran di antrean...")
+    if job.partial:
+        st.markdown(job.partial)
+
+def show_speech(hasil, voice):
+    jobs = get_job_queue()
+    audio_bytes = jobs.get_artifact(hasil.job_id, speech_artifact_name(voice))
+    if audio_bytes is not None:
         st.audio(audio_bytes, format="audio/mp3")
-        
-    except openai.APIError as e:
-        st.error(f"Terjadi kesalahan API OpenAI saat menghasilkan suara: {e}")
-    except Exception as e:
-        st.error(f"Gagal menghasilkan atau memutar suara: {e}")
-    finally:
-        # Hapus file audio sementara setelah digunakan
-        if os.path.exists(temp_audio_filename):
-            try:
-                os.remove(temp_audio_filename)
-            except Exception as e_del:
-                st.warning(f"Gagal menghapus file audio sementara ({temp_audio_filename}): {e_del}")
-
-def save_as_pdf(profil, rekomendasi):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", style='B', size=16) # Gunakan font yang mendukung UTF-8 jika perlu
-    pdf.cell(200, 10, "Hasil Rekomendasi Jurusan & Kampus", ln=True, align='C')
-    pdf.ln(10)
-    
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, f"Profil Pengguna:\n{profil}\n")
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", style='B', size=14)
-    pdf.cell(0, 10, "Rekomendasi:", ln=True)
-    pdf.set_font("Arial", size=12)
-    # Untuk PDF, karakter Markdown mungkin perlu di-handle atau teks dibersihkan
-    # FPDF multi_cell akan menampilkan teks apa adanya.
-    pdf.multi_cell(0, 10, rekomendasi) 
-    
-    pdf_output_filename = f"rekomendasi_jurusan_{uuid.uuid4()}.pdf"
-    pdf.output(pdf_output_filename)
-    return pdf_output_filename
+        return
+    speech_job_id = hasil.speech_jobs.get(voice)
+    speech_job = jobs.get(speech_job_id) if speech_job_id else None
+    if speech_job is None:
+        return
+    if speech_job.status == STATUS_ERROR:
+        st.error(f"Gagal menghasilkan atau memutar suara: {speech_job.error}")
+    elif speech_job.status == STATUS_DONE:
+        st.info("Audio sudah dihapus dari penyimpanan sementara. Tekan tombol putar untuk membuatnya lagi.")
+    else:
+        show_job_progress(speech_job.id)
 
 def main():
+    start_metrics_server() # Hanya aktif jika PILIH_KAMPUS_METRICS_PORT diatur
+    online = ensure_llm_ready()
+    # Pekerjaan panjang berjalan di worker background sehingga tidak hilang saat halaman di-rerun
+    jobs = get_job_queue()
+    jobs.register(JOB_REKOMENDASI, run_recommendation_job)
+    jobs.register(JOB_SUARA, run_speech_job)
+    jobs.start()
     st.title("📝 Formulir Pemilihan Jurusan & Kampus")
     st.write("Silakan isi formulir berikut untuk mengetahui rekomendasi jurusan dan kampus yang sesuai dengan minat dan potensi Anda.")
 
     # Inisialisasi session_state jika belum ada
-    if 'recommendation_text' not in st.session_state:
-        st.session_state.recommendation_text = None
-    if 'profil_text' not in st.session_state:
-        st.session_state.profil_text = None
-    if 'pdf_path' not in st.session_state:
-        st.session_state.pdf_path = None
+    if 'hasil' not in st.session_state:
+        st.session_state.hasil = None # SessionResult dari pekerjaan terakhir yang dimuat
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex # Kunci anggaran artefak (PDF, audio) per sesi
     if 'show_success_message' not in st.session_state:
         st.session_state.show_success_message = False
+    if 'job_id' not in st.session_state:
+        # ID pekerjaan juga disimpan di URL agar hasil tetap bisa diambil setelah reload/reconnect
+        st.session_state.job_id = st.query_params.get("job")
+    if 'loaded_job_id' not in st.session_state:
+        st.session_state.loaded_job_id = None
+    if 'play_voice' not in st.session_state:
+        st.session_state.play_voice = None
 
+    job = jobs.get(st.session_state.job_id) if st.session_state.job_id else None
+    if st.session_state.job_id and job is None:
+        st.warning("Hasil sebelumnya tidak ditemukan (mungkin sudah kedaluwarsa). Silakan kirim ulang formulir.")
+        st.session_state.job_id = None
+        st.query_params.pop("job", None)
+    elif job is not None and job.status in FINISHED_STATUSES and st.session_state.loaded_job_id != job.id:
+        load_job_result(job)
 
     # === Bagian Formulir (Sama seperti kode Anda) ===
     st.header("📌 Informasi Pribadi")
@@ -167,6 +506,11 @@ def main():
         ["Matematika", "Fisika", "Kimia", "Biologi", "Ekonomi", "Sosiologi", "Sejarah", "Bahasa Inggris", "Seni dan Desain", "Teknologi Informasi"],
         key="mapel_fav"
     )
+    aktivitas_suka = st.multiselect(
+        "Aktivitas yang paling Anda sukai",
+        ["Menganalisis data", "Melakukan eksperimen", "Menciptakan karya seni", "Berkomunikasi", "Mengembangkan aplikasi", "Berwirausaha"],
+        key="aktivitas_suka"
+    )
     lingkungan_kerja = st.selectbox("Saya lebih suka bekerja di", ["Kantor", "Lapangan", "Studio Kreatif"], key="lingkungan_kerja")
     karier = st.selectbox("Saya ingin berkarier di bidang", ["Teknologi", "Kesehatan", "Bisnis", "Sosial", "Seni"], key="bidang_karier")
     kerja_tim = st.radio("Saya lebih suka bekerja secara", ["Mandiri", "Tim kecil", "Tim besar"], key="kerja_tim")
@@ -183,74 +527,102 @@ def main():
     faktor_kampus = st.multiselect("Faktor utama dalam memilih kampus", ["Lokasi", "Akreditasi", "Biaya", "Fasilitas", "Beasiswa"], key="faktor_kampus")
     # === Akhir Bagian Formulir ===
 
+    deep_mode = st.checkbox(
+        "🔬 Analisis mendalam (lebih lama, memakai model yang lebih kuat)", key="deep_mode",
+        disabled=not online,
+    )
+
     if st.button("Dapatkan Rekomendasi", key="btn_dapatkan_rekomendasi"):
-        with st.spinner("Merangkum profil Anda..."):
-            profil_ringkas = (
-                f"{nama}, seorang {jenis_kelamin} berusia {usia} tahun dari {domisili}, lulusan {sekolah} dengan jurusan {jurusan_sma} "
-                f"dan nilai rata-rata {nilai_rapor}. Orang tua/wali, {nama_orangtua}, bekerja sebagai {pekerjaan} dengan pendapatan {pendapatan}. "
-                f"Minat akademiknya meliputi {', '.join(mata_pelajaran)} dan lebih suka bekerja di {lingkungan_kerja}. "
-                f"Mereka ingin berkarier di bidang {karier} dan lebih suka bekerja dalam {kerja_tim}. Kampus idealnya adalah {jenis_kampus} "
-                f"dengan faktor utama {', '.join(faktor_kampus)}."
-                f" Dengan mempertimbangkan Prospek Karier dan Pengembangan Diri: "
-                f"Potensi Gaji Tinggi: {gaji_tinggi}/5, "
-                f"Stabilitas Pekerjaan: {stabilitas_pekerjaan}/5, "
-                f"Kesempatan Kerja di Luar Negeri: {kesempatan_luar_negeri}/5, "
-                f"Fleksibilitas Karier: {fleksibilitas_karier}/5, "
-                f"Kesesuaian dengan Minat Pribadi: {hobi_minat}/5."
-            )
-            st.session_state.profil_text = profil_ringkas
-        
-        with st.spinner("Sedang memproses rekomendasi dari AI... Mohon tunggu."):
-            prompt = generate_prompt(st.session_state.profil_text)
-            api_response = call_openai_api(prompt)
-            st.session_state.recommendation_text = api_response
-        
-        with st.spinner("Menyiapkan PDF..."):
-            pdf_path = save_as_pdf(st.session_state.profil_text, st.session_state.recommendation_text)
-            st.session_state.pdf_path = pdf_path
-        
-        st.session_state.show_success_message = True # Tandai untuk menampilkan pesan sukses
+        form = {
+            "nama": nama, "jenis_kelamin": jenis_kelamin, "usia": usia, "domisili": domisili,
+            "sekolah": sekolah, "jurusan_sma": jurusan_sma, "nilai_rapor": nilai_rapor,
+            "nama_orangtua": nama_orangtua, "pekerjaan": pekerjaan, "pendapatan": pendapatan,
+            "mata_pelajaran": mata_pelajaran, "aktivitas_suka": aktivitas_suka, "lingkungan_kerja": lingkungan_kerja, "karier": karier,
+            "kerja_tim": kerja_tim, "gaji_tinggi": gaji_tinggi, "stabilitas_pekerjaan": stabilitas_pekerjaan,
+            "kesempatan_luar_negeri": kesempatan_luar_negeri, "fleksibilitas_karier": fleksibilitas_karier,
+            "hobi_minat": hobi_minat, "jenis_kampus": jenis_kampus, "faktor_kampus": faktor_kampus,
+        }
+        st.session_state.job_id = jobs.submit(JOB_REKOMENDASI, {
+            "form": form, "online": online, "deep": deep_mode,
+            "voice": st.session_state.get("voice_select", "nova"),
+            # Hasil terakhir yang ditampilkan; worker memakainya untuk rekomendasi ulang inkremental
+            "previous_job_id": st.session_state.loaded_job_id,
+            "session_id": st.session_state.session_id,
+        })
+        st.query_params["job"] = st.session_state.job_id
+        st.session_state.hasil = None # Hasil lama disembunyikan selama pekerjaan baru berjalan
+        job = jobs.get(st.session_state.job_id)
+
+    for level, message in st.session_state.pop("job_messages", []):
+        getattr(st, level)(message)
+    if job is not None and job.status not in FINISHED_STATUSES:
+        show_job_progress(job.id)
 
     # Tampilkan hasil jika rekomendasi sudah ada di session_state
-    if st.session_state.recommendation_text:
+    hasil = st.session_state.hasil
+    if hasil:
         st.subheader("📌 Hasil Rekomendasi")
-        if st.session_state.profil_text:
+        if hasil.profil_text:
             st.markdown("### 📋 Ringkasan Profil Anda")
-            st.markdown(st.session_state.profil_text)
+            st.markdown(hasil.profil_text)
         
         st.markdown("### 🎓 Rekomendasi Jurusan & Kampus")
-        st.markdown(st.session_state.recommendation_text, unsafe_allow_html=True) # unsafe_allow_html untuk render tabel Markdown
+        st.table(hasil.recommendation.to_rows())
+        tier = hasil.tier
+        if tier:
+            keterangan = f"Disajikan oleh {tier['model']} ({TIER_LABELS[tier['tier']]})"
+            if tier.get("backend"):
+                keterangan += f" melalui {tier['backend']}"
+            if tier["reasons"]:
+                keterangan += f"; dinaikkan karena {describe_reasons(tier['reasons'])}"
+            if tier.get("changes"):
+                keterangan += f"; menyesuaikan perubahan {', '.join(tier['changes'])}"
+            st.caption(keterangan)
+        if hasil.kandidat:
+            with st.expander("🔎 Kandidat dari katalog kampus lokal"):
+                st.table([
+                    {"Kampus": c.kampus, "Jurusan": c.jurusan, "Jenis": c.jenis_kampus, "Kota": c.kota,
+                     "Biaya/Semester (juta Rp)": f"{c.biaya_semester_juta:g}", "Perkiraan Peluang (%)": f"{c.peluang_diterima:g}"}
+                    for c in hasil.kandidat
+                ])
 
         st.markdown("---") # Pemisah visual
 
         # Tombol Suara
         st.markdown("#### Dengarkan Rekomendasi:")
-        # Pilihan suara untuk TTS
-        voice_options = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-        selected_voice = st.selectbox("Pilih Suara:", voice_options, index=voice_options.index("nova"), key="voice_select")
-
-        if st.button("🔊 Putar Suara Rekomendasi", key="btn_putar_suara"):
-            with st.spinner(f"Mengkonversi teks ke suara dengan suara '{selected_voice}'..."):
-                speakable_text = format_recommendation_for_speech(st.session_state.recommendation_text)
-                if "tidak dapat dibacakan" in speakable_text or "tidak sesuai" in speakable_text :
-                    st.warning(speakable_text)
-                else:
-                    generate_and_play_speech(speakable_text, voice_choice=selected_voice)
+        if get_tts_backend() is None:
+            # Mode offline tanpa server TTS lokal: rekomendasi tetap bisa dibaca dan diunduh
+            st.info("Audio tidak tersedia karena tidak ada backend suara yang aktif. Rekomendasi tetap bisa dibaca dan diunduh sebagai PDF.")
+        else:
+            # Pilihan suara untuk TTS
+            voice_options = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+            selected_voice = st.selectbox("Pilih Suara:", voice_options, index=voice_options.index("nova"), key="voice_select")
+
+            if st.button("🔊 Putar Suara Rekomendasi", key="btn_putar_suara"):
+                st.session_state.play_voice = selected_voice
+                speech_job_id = hasil.speech_jobs.get(selected_voice)
+                speech_job = jobs.get(speech_job_id) if speech_job_id else None
+                audio_ready = jobs.has_artifact(hasil.job_id, speech_artifact_name(selected_voice))
+                # Pekerjaan yang sudah selesai tetapi audionya tidak ada berarti artefaknya terhapus oleh anggaran
+                if not audio_ready and (speech_job is None or speech_job.status in FINISHED_STATUSES):
+                    # Sintesis berjalan di worker; audio muncul otomatis lewat polling
+                    hasil.speech_jobs[selected_voice] = submit_speech_job(
+                        hasil.job_id, hasil.recommendation, selected_voice, st.session_state.session_id
+                    )
+            if st.session_state.play_voice:
+                show_speech(hasil, st.session_state.play_voice)
         
         st.markdown("---") # Pemisah visual
 
         # Tombol Unduh PDF
-        if st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
-            with open(st.session_state.pdf_path, "rb") as pdf_file:
-                st.download_button(
-                    label="📥 Unduh Rekomendasi sebagai PDF",
-                    data=pdf_file,
-                    file_name=os.path.basename(st.session_state.pdf_path), # Gunakan nama file dinamis dari save_as_pdf
-                    mime="application/pdf",
-                    key="btn_unduh_pdf"
-                )
-        elif st.session_state.pdf_path: # Path ada tapi file tidak ditemukan
-            st.error("File PDF tidak ditemukan. Coba generate ulang rekomendasi.")
+        # PDF sudah dibuat oleh worker dan disimpan bersama pekerjaannya; dibuat ulang hanya jika tidak ada
+        st.download_button(
+            label="📥 Unduh Rekomendasi sebagai PDF",
+            data=lambda: jobs.get_artifact(hasil.job_id, "pdf") or build_pdf(hasil.profil_text, hasil.recommendation),
+            file_name="rekomendasi_jurusan.pdf",
+            mime="application/pdf",
+            key="btn_unduh_pdf"
+        )
 
     if st.session_state.show_success_message:
         st.success("Terima kasih telah mengisi formulir! Rekomendasi Anda sudah siap.")
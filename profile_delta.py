@@ -0,0 +1,116 @@
+"""Rekomendasi ulang inkremental saat hanya sebagian isian formulir yang berubah.
+
+Pengguna sering menggeser satu slider lalu menekan tombol lagi. Daripada
+membuat prompt lengkap yang baru, isian baru dibandingkan dengan isian
+pekerjaan sebelumnya:
+
+- ``reuse``: hanya nama yang berubah, atau shortlist katalog tidak berubah sama
+  sekali, sehingga rekomendasi sebelumnya dipakai ulang tanpa memanggil LLM.
+- ``delta``: sedikit isian berubah; model murah menerima prompt pendek berisi
+  perubahan, rekomendasi sebelumnya, dan shortlist terbaru.
+- ``full``: perubahan terlalu banyak atau tidak ada hasil sebelumnya yang layak.
+"""
+import os
+from collections import namedtuple
+
+MODE_REUSE = "reuse"
+MODE_DELTA = "delta"
+MODE_FULL = "full"
+# Jumlah isian berubah terbanyak yang masih dilayani dengan prompt delta
+DELTA_MAX_FIELDS = int(os.getenv("PILIH_KAMPUS_DELTA_MAX_FIELDS", "3"))
+# Hasil sebelumnya dari tier ini yang layak dijadikan konteks (bukan katalog lokal/offline)
+REUSABLE_TIERS = ("draft", "refine", "delta", "reuse")
+
+FIELD_LABELS = {
+    "nama": "Nama",
+    "jenis_kelamin": "Jenis Kelamin",
+    "usia": "Usia",
+    "domisili": "Domisili",
+    "sekolah": "Sekolah Asal",
+    "jurusan_sma": "Jurusan SMA",
+    "nilai_rapor": "Nilai Rata-rata Rapor",
+    "nama_orangtua": "Nama Orang Tua/Wali",
+    "pekerjaan": "Pekerjaan Orang Tua/Wali",
+    "pendapatan": "Pendapatan Orang Tua/Wali",
+    "mata_pelajaran": "Mata Pelajaran Favorit",
+    "aktivitas_suka": "Aktivitas yang Disukai",
+    "lingkungan_kerja": "Lingkungan Kerja",
+    "karier": "Bidang Karier",
+    "kerja_tim": "Gaya Kerja",
+    "jenis_kampus": "Jenis Kampus",
+    "faktor_kampus": "Faktor Pemilihan Kampus",
+    "gaji_tinggi": "Potensi Gaji Tinggi",
+    "stabilitas_pekerjaan": "Stabilitas Pekerjaan",
+    "kesempatan_luar_negeri": "Kesempatan Kerja di Luar Negeri",
+    "fleksibilitas_karier": "Fleksibilitas Karier",
+    "hobi_minat": "Kesesuaian dengan Minat Pribadi",
+}
+# Isian yang tidak memengaruhi pilihan kampus/jurusan
+COSMETIC_FIELDS = frozenset({"nama", "nama_orangtua"})
+# Isian yang sudah diperhitungkan seluruhnya oleh skor katalog (lihat CampusCatalog.score);
+# jika hanya isian ini yang berubah dan shortlist tetap sama, pilihan model sebelumnya tetap berlaku
+RANKING_FIELDS = frozenset({
+    "domisili", "jurusan_sma", "nilai_rapor", "pendapatan", "mata_pelajaran", "lingkungan_kerja", "karier",
+    "jenis_kampus", "faktor_kampus", "gaji_tinggi", "stabilitas_pekerjaan", "kesempatan_luar_negeri",
+    "fleksibilitas_karier", "hobi_minat",
+})
+
+DeltaPlan = namedtuple("DeltaPlan", ["mode", "changes", "reason"])
+
+
+def diff_form(previous, current):
+    """Isian yang berubah: {nama_isian: (nilai_lama, nilai_baru)}. Urutan pilihan multiselect diabaikan."""
+    changes = {}
+    for name in sorted(set(previous) | set(current)):
+        old, new = previous.get(name), current.get(name)
+        if isinstance(old, list) and isinstance(new, list):
+            if sorted(old) == sorted(new):
+                continue
+        elif old == new:
+            continue
+        changes[name] = (old, new)
+    return changes
+
+
+def _format_value(name, value):
+    if isinstance(value, list):
+        return ", ".join(value) if value else "(kosong)"
+    if name in ("gaji_tinggi", "stabilitas_pekerjaan", "kesempatan_luar_negeri", "fleksibilitas_karier", "hobi_minat"):
+        return f"{value}/5"
+    return "(kosong)" if value in (None, "") else str(value)
+
+
+def describe_changes(changes):
+    """Satu baris per isian yang berubah, untuk prompt delta dan keterangan di halaman."""
+    return "\n".join(
+        f"- {FIELD_LABELS.get(name, name)}: {_format_value(name, old)} -> {_format_value(name, new)}"
+        for name, (old, new) in changes.items()
+    )
+
+
+def _same_shortlist(previous, current):
+    key = lambda c: (c["kampus"], c["jurusan"], c["peluang_diterima"])
+    return [key(c) for c in previous] == [key(c) for c in current]
+
+
+def plan_rerecommendation(previous_form, previous_result, form, kandidat, deep=False):
+    """Menentukan cara membuat rekomendasi berikutnya berdasarkan pekerjaan sebelumnya.
+
+    `kandidat` adalah shortlist terbaru dalam bentuk dict (seperti `asdict(Kandidat)`).
+    """
+    if deep:
+        return DeltaPlan(MODE_FULL, {}, "deep")
+    if not previous_result or not previous_result.get("recommendation"):
+        return DeltaPlan(MODE_FULL, {}, "tanpa_hasil_sebelumnya")
+    if (previous_result.get("tier") or {}).get("tier") not in REUSABLE_TIERS:
+        return DeltaPlan(MODE_FULL, {}, "hasil_sebelumnya_offline")
+
+    changes = diff_form(previous_form, form)
+    semantic = set(changes) - COSMETIC_FIELDS
+    if not semantic:
+        return DeltaPlan(MODE_REUSE, changes, "perubahan_kosmetik" if changes else "tanpa_perubahan")
+    if semantic <= RANKING_FIELDS and _same_shortlist(previous_result["kandidat"], kandidat):
+        return DeltaPlan(MODE_REUSE, changes, "shortlist_sama")
+    if len(semantic) <= DELTA_MAX_FIELDS:
+        return DeltaPlan(MODE_DELTA, {name: changes[name] for name in changes if name in semantic}, "perubahan_kecil")
+    return DeltaPlan(MODE_FULL, changes, "perubahan_banyak")
@@ -0,0 +1,156 @@
+"""Encoding profil yang ringkas dan deterministik, serta penghitung anggaran token prompt.
+
+Profil dikirim ke model sebagai baris `kunci=nilai` dengan urutan dan
+kosakata tetap, bukan kalimat bebas. Penjelasan kunci, skala slider, dan
+format keluaran diletakkan di pesan system yang identik untuk setiap
+permintaan, sehingga menjadi prefiks stabil yang bisa di-cache oleh API.
+Nama dan kontak tidak dikirim karena tidak memengaruhi rekomendasi, sehingga
+profil yang sama dari siswa berbeda juga menghasilkan prompt (dan cache) yang sama.
+
+Token dihitung dengan `tiktoken` jika terpasang; jika tidak, dipakai perkiraan
+heuristik yang cukup untuk penganggaran dan laporan penghematan.
+"""
+import os
+import re
+import threading
+from collections import namedtuple
+
+from tracing import tracer
+
+# Batas token prompt per permintaan; kandidat dikurangi jika prompt melebihi batas ini
+PROMPT_TOKEN_BUDGET = int(os.getenv("PILIH_KAMPUS_PROMPT_TOKEN_BUDGET", "1500"))
+# Tambahan token per pesan dan untuk pembuka jawaban pada format chat (perkiraan OpenAI)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+DEFAULT_ENCODING = "cl100k_base"
+
+JENIS_KELAMIN = {"Laki-laki": "L", "Perempuan": "P"}
+PENDAPATAN = {"< Rp3 juta": "<3jt", "Rp3-5 juta": "3-5jt", "Rp5-10 juta": "5-10jt", "> Rp10 juta": ">10jt"}
+SLIDER_KEYS = [
+    ("gaji_tinggi", "gaji"),
+    ("stabilitas_pekerjaan", "stabil"),
+    ("kesempatan_luar_negeri", "luar_negeri"),
+    ("fleksibilitas_karier", "fleksibel"),
+    ("hobi_minat", "sesuai_minat"),
+]
+# (isian formulir, kunci ringkas, kosakata tetap atau None); urutan ini juga urutan di prompt
+PROFILE_FIELDS = [
+    ("jenis_kelamin", "jk", JENIS_KELAMIN),
+    ("usia", "usia", None),
+    ("domisili", "domisili", None),
+    ("sekolah", "sekolah", None),
+    ("jurusan_sma", "sma", None),
+    ("nilai_rapor", "rapor", None),
+    ("hubungan", "wali", None),
+    ("pekerjaan", "kerja_ortu", None),
+    ("pendapatan", "pendapatan_ortu", PENDAPATAN),
+    ("mata_pelajaran", "mapel", None),
+    ("aktivitas_suka", "aktivitas", None),
+    ("gaya_belajar", "gaya_belajar", None),
+    ("lingkungan_kerja", "lingk_kerja", None),
+    ("karier", "karier", None),
+    ("kerja_tim", "kerja_tim", None),
+    ("lingkungan_kampus", "lingk_kampus", None),
+    ("jenis_kampus", "jenis_kampus", None),
+    ("faktor_kampus", "faktor", None),
+]
+PROFILE_LEGEND = (
+    "Profil siswa berupa baris kunci=nilai: jk L/P, sma = jurusan SMA, rapor 0-100, pendapatan_ortu per bulan, "
+    "prioritas = tingkat kepentingan 1-5. Isian kosong tidak dikirim."
+)
+
+PromptMeasure = namedtuple("PromptMeasure", ["prompt_tokens", "prefix_tokens", "completion_tokens", "total_tokens"])
+
+
+class PromptBudgetExceeded(ValueError):
+    """Prompt tetap melebihi anggaran token meskipun sudah diringkas."""
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def encode_profile(form):
+    """Profil ringkas `kunci=nilai` per baris; deterministik untuk isian yang sama."""
+    lines = []
+    for name, key, vocabulary in PROFILE_FIELDS:
+        value = form.get(name)
+        if isinstance(value, (list, tuple)):
+            value = ",".join(sorted(value))
+        elif vocabulary is not None:
+            value = vocabulary.get(value, value)
+        if value is None or _format_value(value) == "":
+            continue
+        lines.append(f"{key}={_format_value(value)}")
+    prioritas = [f"{key}:{form[name]}" for name, key in SLIDER_KEYS if form.get(name) is not None]
+    if prioritas:
+        lines.append(f"prioritas={' '.join(prioritas)}")
+    return "\n".join(lines)
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Encoder tiktoken (sekali per proses), atau False jika tiktoken tidak tersedia."""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception: # ImportError, atau berkas encoding tidak bisa diunduh
+                _encoding = False
+        return _encoding
+
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    # Perkiraan: kata dipecah per ~4 karakter (BPE), tanda baca dihitung satu token
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD_RE.findall(text))
+
+
+def count_message_tokens(messages):
+    return TOKENS_PER_REPLY + sum(TOKENS_PER_MESSAGE + count_tokens(m["content"] or "") for m in messages)
+
+
+def measure_prompt(messages, max_tokens=0):
+    """Mengukur token prompt sebelum dikirim; `prefix_tokens` adalah bagian system yang bisa di-cache API."""
+    prompt_tokens = count_message_tokens(messages)
+    prefix_tokens = count_message_tokens([m for m in messages[:1] if m["role"] == "system"]) - TOKENS_PER_REPLY
+    completion_tokens = max_tokens or 0
+    return PromptMeasure(prompt_tokens, max(0, prefix_tokens), completion_tokens, prompt_tokens + completion_tokens)
+
+
+def fit_candidates(build_messages, kandidat, min_candidates=3, budget=PROMPT_TOKEN_BUDGET):
+    """Mengurangi kandidat terbawah sampai prompt `build_messages(kandidat)` muat dalam anggaran."""
+    kandidat = list(kandidat)
+    while True:
+        messages = build_messages(kandidat)
+        measure = measure_prompt(messages)
+        if measure.prompt_tokens <= budget:
+            return messages, kandidat
+        if len(kandidat) <= min_candidates:
+            raise PromptBudgetExceeded(
+                f"Prompt {measure.prompt_tokens} token melebihi anggaran {budget} token."
+            )
+        kandidat.pop()
+        tracer.incr("prompt_candidates_trimmed_total")
+
+
+def report_savings(baseline_messages, messages, stage):
+    """Mencatat selisih token terhadap format lama (kalimat bebas) untuk satu permintaan."""
+    baseline = count_message_tokens(baseline_messages)
+    current = count_message_tokens(messages)
+    saved = baseline - current
+    tracer.incr("prompt_tokens_baseline_total", baseline, stage=stage)
+    tracer.incr("prompt_tokens_saved_total", saved, stage=stage)
+    return saved
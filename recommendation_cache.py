@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# --- Konfigurasi Cache ---
+# Semua nilai bisa diatur lewat environment variable tanpa mengubah kode.
+# PILIH_KAMPUS_CACHE=0 mematikan cache sepenuhnya (berguna saat pengujian).
+CACHE_ENABLED = os.getenv("PILIH_KAMPUS_CACHE", "1") != "0"
+CACHE_DB_PATH = os.getenv("PILIH_KAMPUS_CACHE_DB", "rekomendasi_cache.sqlite3")
+CACHE_TTL_SECONDS = float(os.getenv("PILIH_KAMPUS_CACHE_TTL", str(24 * 60 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("PILIH_KAMPUS_CACHE_MAX_ENTRIES", "1024"))
+
+
+def normalize_text(text):
+    """Menormalkan teks agar profil yang hampir identik menghasilkan kunci yang sama."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.casefold().split())
+
+
+def make_cache_key(model, messages, **params):
+    """Membuat kunci cache dari isi prompt (dinormalkan) beserta parameter model."""
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": m["role"], "content": normalize_text(m["content"])} for m in messages
+        ],
+        "params": params,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LRUTTLCache:
+    """Cache LRU di memori proses dengan masa berlaku (TTL) per entri."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Cache persisten di disk berbasis SQLite, bertahan setelah aplikasi di-restart."""
+
+    def __init__(self, db_path=CACHE_DB_PATH, ttl_seconds=CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rekomendasi_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM rekomendasi_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if created_at + self.ttl_seconds < time.time():
+                self._conn.execute("DELETE FROM rekomendasi_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rekomendasi_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM rekomendasi_cache")
+            self._conn.commit()
+
+
+class RecommendationCache:
+    """Cache dua tingkat (memori lalu disk) untuk hasil rekomendasi beserta penghitung hit/miss."""
+
+    def __init__(self, memory=None, disk=None, enabled=CACHE_ENABLED):
+        self.memory = memory if memory is not None else LRUTTLCache()
+        self.disk = disk
+        self.enabled = enabled
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                # Naikkan ke cache memori agar permintaan berikutnya lebih cepat
+                self.memory.set(key, value)
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def get_or_compute(self, key, compute, validate=None):
+        """Mengembalikan nilai dari cache, atau memanggil `compute()` lalu menyimpan hasilnya.
+
+        Jika `validate` diberikan, hanya nilai yang lolos validasi yang disimpan
+        sehingga jawaban model yang rusak tidak ikut tersimpan di cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value and (validate is None or validate(value)):
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Mengembalikan satu instance cache bersama untuk seluruh sesi dalam proses ini."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            disk = None
+            if CACHE_ENABLED and CACHE_DB_PATH:
+                try:
+                    disk = SQLiteCache(CACHE_DB_PATH)
+                except sqlite3.Error as e:
+                    # Aplikasi tetap berjalan dengan cache memori saja
+                    logger.warning("Cache disk tidak dapat dibuka (%s): %s", CACHE_DB_PATH, e)
+            _cache = RecommendationCache(disk=disk)
+        return _cache
@@ -0,0 +1,240 @@
+import json
+import re
+from dataclasses import asdict, dataclass
+
+# Nama kolom yang ditampilkan ke pengguna (UI, PDF) untuk tiap field
+COLUMN_LABELS = {
+    "kampus": "Kampus",
+    "jurusan": "Jurusan",
+    "peluang_diterima": "Peluang Diterima (%)",
+    "alasan": "Alasan",
+}
+REQUIRED_FIELDS = ("kampus", "jurusan", "peluang_diterima")
+# Jumlah rekomendasi yang diminta dari model; jawaban yang lebih pendek tidak dianggap valid
+RECOMMENDATION_COUNT = 3
+
+# Alias kunci yang kadang dipakai model walaupun sudah diminta format tertentu
+_KEY_ALIASES = {
+    "kampus": "kampus",
+    "universitas": "kampus",
+    "jurusan": "jurusan",
+    "program studi": "jurusan",
+    "peluang_diterima": "peluang_diterima",
+    "peluang diterima": "peluang_diterima",
+    "peluang diterima (%)": "peluang_diterima",
+    "peluang": "peluang_diterima",
+    "alasan": "alasan",
+    "penjelasan": "alasan",
+}
+
+
+class RecommendationParseError(ValueError):
+    """Dilempar jika jawaban model tidak bisa diubah menjadi rekomendasi yang valid."""
+
+
+class IncompleteRecommendation(RecommendationParseError):
+    """Jawaban bisa diurai tetapi berisi lebih sedikit rekomendasi dari yang diminta."""
+
+    def __init__(self, hasil, expected):
+        super().__init__(f"Jawaban model hanya berisi {len(hasil)} dari {expected} rekomendasi")
+        self.hasil = hasil # Tetap tersedia sebagai cadangan tampilan, tetapi tidak disimpan di cache
+
+
+def _parse_percentage(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = float(value)
+    else:
+        match = re.search(r"\d+(?:[.,]\d+)?", str(value))
+        if not match:
+            raise RecommendationParseError(f"Peluang diterima tidak berupa angka: {value!r}")
+        number = float(match.group().replace(",", "."))
+    if not 0 <= number <= 100:
+        raise RecommendationParseError(f"Peluang diterima di luar rentang 0-100: {number}")
+    return number
+
+
+@dataclass(frozen=True)
+class Rekomendasi:
+    # __slots__ eksplisit (bukan dataclass(slots=True), yang baru ada di Python 3.10);
+    # karena itu field tidak boleh punya nilai bawaan di tingkat kelas
+    __slots__ = ("kampus", "jurusan", "peluang_diterima", "alasan")
+
+    kampus: str
+    jurusan: str
+    peluang_diterima: float
+    alasan: str
+
+    @classmethod
+    def from_dict(cls, data):
+        """Membuat dan memvalidasi satu rekomendasi dari dict hasil JSON."""
+        if not isinstance(data, dict):
+            raise RecommendationParseError(f"Rekomendasi harus berupa objek, bukan {type(data).__name__}")
+        fields = {}
+        for key, value in data.items():
+            field = _KEY_ALIASES.get(str(key).strip().lower())
+            if field:
+                fields[field] = value
+        missing = [name for name in REQUIRED_FIELDS if name not in fields]
+        if missing:
+            raise RecommendationParseError(f"Field rekomendasi tidak lengkap: {', '.join(missing)}")
+        kampus = str(fields["kampus"]).strip()
+        jurusan = str(fields["jurusan"]).strip()
+        if not kampus or not jurusan:
+            raise RecommendationParseError("Nama kampus dan jurusan tidak boleh kosong")
+        alasan = str(fields.get("alasan") or "").strip()
+        return cls(kampus, jurusan, _parse_percentage(fields["peluang_diterima"]), alasan)
+
+    @property
+    def peluang_text(self):
+        return f"{self.peluang_diterima:g}"
+
+
+@dataclass(frozen=True)
+class HasilRekomendasi:
+    __slots__ = ("items",)
+
+    items: tuple
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @classmethod
+    def from_json(cls, text):
+        """Mengurai JSON Lines, array JSON, atau objek {"rekomendasi": [...]}."""
+        text = _strip_code_fence(text)
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = None
+        if data is None:
+            # Format utama yang diminta: satu objek JSON per baris. Kalimat pengantar dari model
+            # (mis. "Berikut rekomendasinya:") dilewati, sama seperti pada parse_partial.
+            data = []
+            for line in text.splitlines():
+                line = line.strip().rstrip(",")
+                if not line.startswith(("{", "[")):
+                    continue
+                try:
+                    data.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise RecommendationParseError(f"Baris bukan JSON yang valid: {line!r}") from e
+            if not data:
+                raise RecommendationParseError("Tidak ada baris JSON dalam jawaban model")
+        if isinstance(data, dict):
+            data = data.get("rekomendasi", [data])
+        if not isinstance(data, list):
+            raise RecommendationParseError("Struktur JSON rekomendasi tidak dikenali")
+        return cls(tuple(Rekomendasi.from_dict(item) for item in data))
+
+    @classmethod
+    def from_markdown(cls, text):
+        """Cadangan untuk jawaban lama/menyimpang yang masih berupa tabel markdown."""
+        items = []
+        for line in text.strip().splitlines():
+            line = line.strip()
+            if not line.startswith("|"):
+                continue
+            cells = [cell.strip() for cell in line.strip("|").split("|")]
+            if len(cells) != 3 or set("".join(cells)) <= set("-: "):
+                continue # Baris pemisah atau baris yang tidak sesuai format
+            if cells[0].lower() == "kampus":
+                continue # Baris header
+            try:
+                items.append(Rekomendasi(cells[0], cells[1], _parse_percentage(cells[2]), ""))
+            except RecommendationParseError:
+                continue
+        return cls(tuple(items))
+
+    @classmethod
+    def parse(cls, text, min_items=RECOMMENDATION_COUNT):
+        """Mengurai jawaban model sekali saja; JSON diutamakan, tabel markdown sebagai cadangan.
+
+        Jawaban dengan kurang dari `min_items` rekomendasi melempar IncompleteRecommendation.
+        """
+        if not text or not text.strip():
+            raise RecommendationParseError("Jawaban model kosong")
+        try:
+            hasil = cls.from_json(text)
+        except RecommendationParseError as json_error:
+            hasil = cls.from_markdown(text)
+            if not hasil:
+                raise json_error
+        if not hasil:
+            raise RecommendationParseError("Jawaban model tidak berisi rekomendasi")
+        if len(hasil) < min_items:
+            raise IncompleteRecommendation(hasil, min_items)
+        return hasil
+
+    @classmethod
+    def parse_partial(cls, text):
+        """Mengurai baris JSON yang sudah lengkap saja, untuk tampilan selama streaming."""
+        items = []
+        for line in _strip_code_fence(text).splitlines():
+            try:
+                items.append(Rekomendasi.from_dict(json.loads(line.strip().rstrip(","))))
+            except (json.JSONDecodeError, RecommendationParseError):
+                continue
+        return cls(tuple(items))
+
+    @property
+    def has_alasan(self):
+        return any(item.alasan for item in self.items)
+
+    def to_rows(self):
+        """Baris siap tampil untuk `st.table`; kolom alasan hanya muncul jika diisi model."""
+        rows = []
+        for item in self.items:
+            row = {
+                COLUMN_LABELS["kampus"]: item.kampus,
+                COLUMN_LABELS["jurusan"]: item.jurusan,
+                COLUMN_LABELS["peluang_diterima"]: item.peluang_text,
+            }
+            if self.has_alasan:
+                row[COLUMN_LABELS["alasan"]] = item.alasan
+            rows.append(row)
+        return rows
+
+    def to_markdown(self):
+        if self.has_alasan:
+            lines = [
+                "| Kampus | Jurusan | Peluang Diterima (%) | Alasan |",
+                "|--------|---------|--------------------|--------|",
+            ]
+            lines += [f"| {item.kampus} | {item.jurusan} | {item.peluang_text} | {item.alasan} |" for item in self.items]
+            return "\n".join(lines)
+        lines = [
+            "| Kampus | Jurusan | Peluang Diterima (%) |",
+            "|--------|---------|--------------------|",
+        ]
+        lines += [f"| {item.kampus} | {item.jurusan} | {item.peluang_text} |" for item in self.items]
+        return "\n".join(lines)
+
+    def to_dicts(self):
+        return [asdict(item) for item in self.items]
+
+    def to_json(self):
+        return "\n".join(json.dumps(asdict(item), ensure_ascii=False) for item in self.items)
+
+
+def is_valid_recommendation(text):
+    """Jawaban model bisa diurai menjadi rekomendasi lengkap; dipakai sebelum menyimpan ke cache."""
+    try:
+        HasilRekomendasi.parse(text)
+    except RecommendationParseError:
+        return False
+    return True
+
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
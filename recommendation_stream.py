@@ -0,0 +1,36 @@
+import os
+
+# PILIH_KAMPUS_STREAMING=0 mengembalikan perilaku lama (menunggu jawaban utuh)
+STREAMING_ENABLED = os.getenv("PILIH_KAMPUS_STREAMING", "1") != "0"
+
+
+def iter_completion_deltas(stream, on_usage=None):
+    """Mengambil potongan teks dari stream chat completions OpenAI.
+
+    Jika stream dibuat dengan `stream_options={"include_usage": True}`, potongan
+    terakhir berisi jumlah token dan diteruskan ke `on_usage`.
+    """
+    for chunk in stream:
+        if on_usage is not None and getattr(chunk, "usage", None) is not None:
+            on_usage(chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def render_stream(deltas, placeholder, render=None):
+    """Menampilkan teks ke `placeholder` baris demi baris, lalu mengembalikan teks lengkap.
+
+    Hanya baris yang sudah lengkap yang ditampilkan agar tabel markdown tidak
+    berkedip karena baris yang terpotong di tengah sel.
+    """
+    render = render or (lambda text: text)
+    text = ""
+    for delta in deltas:
+        text += delta
+        if "\n" in delta:
+            placeholder.markdown(render(text[: text.rfind("\n")]))
+    placeholder.markdown(render(text))
+    return text
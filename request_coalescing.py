@@ -0,0 +1,235 @@
+"""Penggabungan permintaan identik (single-flight) dan pembatas konkurensi global ke OpenAI.
+
+Jika banyak sesi mengirim prompt yang sama pada saat bersamaan (mis. satu kelas
+menekan tombol dengan isian bawaan), hanya satu permintaan yang dikirim ke API.
+Sesi lain ikut menampilkan stream yang sama lalu menerima hasil yang sama.
+Permintaan yang benar-benar dikirim dibatasi jumlahnya dan diantrekan secara
+FIFO agar lonjakan tidak memicu rate limit untuk semua sesi sekaligus.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from recommendation_stream import STREAMING_ENABLED, render_stream
+from tracing import tracer
+
+# Jumlah maksimum permintaan ke OpenAI yang berjalan bersamaan dalam satu proses
+MAX_CONCURRENT_REQUESTS = int(os.getenv("PILIH_KAMPUS_MAX_CONCURRENT_REQUESTS", "8"))
+# Batas waktu menunggu di antrean (detik) sebelum permintaan dibatalkan
+QUEUE_TIMEOUT = float(os.getenv("PILIH_KAMPUS_QUEUE_TIMEOUT", "120"))
+
+
+class QueueTimeout(RuntimeError):
+    """Antrean permintaan terlalu panjang sehingga batas waktu tunggu terlewati."""
+
+
+class _FlightAbandoned(Exception):
+    """Sesi pemimpin dihentikan (mis. rerun Streamlit) sebelum jawaban selesai."""
+
+
+class FairLimiter:
+    """Semaphore dengan antrean FIFO: permintaan dilayani sesuai urutan kedatangan."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_REQUESTS, timeout=QUEUE_TIMEOUT):
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self.active = 0
+        self.stats = {"acquired": 0, "queued": 0, "timeouts": 0, "max_wait_seconds": 0.0}
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    @property
+    def waiting(self):
+        return len(self._queue)
+
+    def _can_enter(self, ticket):
+        return self._queue[0] is ticket and self.active < self.max_concurrent
+
+    def acquire(self, on_wait=None):
+        """Menunggu giliran. `on_wait(posisi)` dipanggil sekali jika harus mengantre."""
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self._queue.append(ticket)
+            position = None
+            if not self._can_enter(ticket):
+                self.stats["queued"] += 1
+                position = len(self._queue)
+        try:
+            # Callback (mis. menulis ke UI Streamlit) dipanggil tanpa memegang kunci limiter
+            if position is not None and on_wait is not None:
+                on_wait(position)
+            with self._cond:
+                remaining = max(0.0, self.timeout - (time.monotonic() - started))
+                if not self._cond.wait_for(lambda: self._can_enter(ticket), remaining):
+                    self.stats["timeouts"] += 1
+                    raise QueueTimeout(
+                        f"Antrean permintaan penuh; tidak mendapat giliran dalam {self.timeout:g} detik."
+                    )
+                self._queue.popleft()
+                self.active += 1
+                self.stats["acquired"] += 1
+                self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], time.monotonic() - started)
+                # Antrean berikutnya mungkin juga sudah boleh masuk
+                self._cond.notify_all()
+        except BaseException:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._cond.notify_all()
+            raise
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, on_wait=None):
+        with tracer.stage("openai_queue_wait"):
+            self.acquire(on_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class Flight:
+    """Satu permintaan yang sedang berjalan; potongan stream-nya bisa diikuti oleh sesi lain."""
+
+    def __init__(self):
+        self._deltas = []
+        self._cond = threading.Condition()
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def publish(self, delta):
+        with self._cond:
+            self._deltas.append(delta)
+            self._cond.notify_all()
+
+    def tee(self, deltas):
+        """Meneruskan potongan stream ke pemanggil sambil membagikannya ke pengikut."""
+        for delta in deltas:
+            self.publish(delta)
+            yield delta
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self._result, self._error, self._done = result, error, True
+            self._cond.notify_all()
+
+    def _raise_if_failed(self):
+        if self._error is None:
+            return
+        if not isinstance(self._error, Exception):
+            # StopException/KeyboardInterrupt milik sesi pemimpin tidak diteruskan ke sesi lain
+            raise _FlightAbandoned()
+        raise self._error
+
+    def iter_deltas(self):
+        """Mengulang potongan yang sudah ada, lalu menunggu potongan baru sampai selesai."""
+        index = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._deltas) > index or self._done)
+                new_deltas = self._deltas[index:]
+                done = self._done
+            for delta in new_deltas:
+                yield delta
+            index += len(new_deltas)
+            if done and index == len(self._deltas):
+                self._raise_if_failed()
+                return
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._done)
+        self._raise_if_failed()
+        return self._result
+
+
+class SingleFlight:
+    """Menjalankan `compute` sekali untuk setiap key yang sedang diproses secara bersamaan."""
+
+    def __init__(self):
+        self.stats = {"leaders": 0, "coalesced": 0}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, follow=None):
+        """Pemimpin memanggil `compute(flight)`; pengikut memanggil `follow(flight)` (default: menunggu hasil)."""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Flight()
+                    self.stats["leaders"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+            if leader:
+                return self._lead(key, flight, compute)
+            tracer.incr("coalesced_requests_total")
+            try:
+                return follow(flight) if follow is not None else flight.wait()
+            except _FlightAbandoned:
+                continue # Coba lagi; sesi ini mungkin menjadi pemimpin yang baru
+
+    def _lead(self, key, flight, compute):
+        try:
+            result = compute(flight)
+        except BaseException as e:
+            flight.finish(error=e)
+            raise
+        else:
+            flight.finish(result=result)
+            return result
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+
+_limiter = None
+_single_flight = None
+_singletons_lock = threading.Lock()
+
+
+def get_limiter():
+    """Pembatas konkurensi bersama untuk seluruh sesi dalam proses ini."""
+    global _limiter
+    with _singletons_lock:
+        if _limiter is None:
+            _limiter = FairLimiter()
+        return _limiter
+
+
+def get_single_flight():
+    global _single_flight
+    with _singletons_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
+
+
+def queue_notice(placeholder):
+    """Callback `on_wait` yang memberi tahu pengguna posisinya di antrean."""
+    if placeholder is None:
+        return None
+    return lambda position: placeholder.info(
+        f"Permintaan sedang ramai. Anda berada di antrean ke-{position}, mohon tunggu..."
+    )
+
+
+def run_coalesced(key, compute, placeholder=None, render=None):
+    """Menjalankan `compute(flight)` sekali per key; sesi lain menampilkan stream yang sama di placeholder-nya."""
+    def follow(flight):
+        if placeholder is not None and STREAMING_ENABLED:
+            render_stream(flight.iter_deltas(), placeholder, render=render)
+        return flight.wait()
+
+    return get_single_flight().do(key, compute, follow)
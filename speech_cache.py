@@ -0,0 +1,115 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from llm_backend import get_tts_backend
+from request_coalescing import SingleFlight
+from tracing import tracer
+
+# --- Konfigurasi TTS ---
+# Model TTS diatur per backend (lihat llm_backend.py)
+# Total ukuran audio yang boleh disimpan di memori untuk seluruh proses
+TTS_CACHE_MAX_BYTES = int(os.getenv("PILIH_KAMPUS_TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TTS_CHUNK_SIZE = 64 * 1024
+
+
+class ByteBudgetLRU:
+    """Cache LRU yang dibatasi total ukuran byte, bukan jumlah entri."""
+
+    def __init__(self, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return # Audio yang lebih besar dari seluruh anggaran tidak disimpan
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._data[key] = value
+            self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+_audio_cache = ByteBudgetLRU()
+# Sintesis yang sama (teks, suara, backend) yang sedang berjalan tidak digandakan
+_speech_flights = SingleFlight()
+
+
+class SpeechUnavailable(RuntimeError):
+    """Tidak ada backend dengan TTS yang aktif (mis. mode offline tanpa server TTS lokal)."""
+
+
+def _tts_backend(backend):
+    backend = backend or get_tts_backend(block=True)
+    if backend is None:
+        raise SpeechUnavailable("Audio tidak tersedia: tidak ada backend suara yang aktif.")
+    return backend
+
+
+def speech_key(text, voice, backend):
+    model = f"{backend.name}/{backend.tts_model}"
+    return hashlib.sha256(f"{model}\x00{voice}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def synthesize_speech(text, voice, backend):
+    """Memanggil API TTS dan mengumpulkan potongan audio langsung ke memori (tanpa file sementara)."""
+    buffer = io.BytesIO()
+    with tracer.stage("tts_synthesize", voice=voice, characters=len(text), backend=backend.name):
+        with backend.tts_client().audio.speech.with_streaming_response.create(
+            model=backend.tts_model,
+            voice=voice,     # pilihan: alloy, echo, fable, onyx, nova, shimmer
+            input=text,
+            response_format="mp3",
+        ) as response:
+            for chunk in response.iter_bytes(TTS_CHUNK_SIZE):
+                buffer.write(chunk)
+    return buffer.getvalue()
+
+
+def _synthesize_and_store(key, text, voice, backend):
+    audio_bytes = synthesize_speech(text, voice, backend)
+    _audio_cache.put(key, audio_bytes)
+    return audio_bytes
+
+
+def get_speech(text, voice, backend=None):
+    """Mengembalikan audio mp3 dari cache, menunggu sintesis yang sama yang sedang berjalan, atau mensintesis baru.
+
+    Tanpa `backend`, dipakai backend pertama di rantai yang bisa mensintesis suara.
+    """
+    backend = _tts_backend(backend)
+    key = speech_key(text, voice, backend)
+    audio_bytes = _audio_cache.get(key)
+    tracer.record_cache("tts", audio_bytes is not None)
+    if audio_bytes is not None:
+        return audio_bytes
+    return _speech_flights.do(key, lambda flight: _synthesize_and_store(key, text, voice, backend))
+
+
+def cache_stats():
+    """Statistik cache audio untuk pemantauan."""
+    return dict(_audio_cache.stats, entries=len(_audio_cache), bytes=_audio_cache.current_bytes,
+                max_bytes=_audio_cache.max_bytes)
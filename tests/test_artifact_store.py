@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from artifact_store import ArtifactStore
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "jobs.sqlite3"), check_same_thread=False)
+    yield conn
+    conn.close()
+
+
+def _store(conn, max_bytes=100, session_max_bytes=40):
+    return ArtifactStore(conn, threading.Lock(), max_bytes=max_bytes, session_max_bytes=session_max_bytes)
+
+
+def test_session_budget_evicts_least_recently_used(conn):
+    store = _store(conn)
+    assert store.save("j1", "pdf", b"a" * 15, session_id="s1")
+    assert store.save("j2", "pdf", b"b" * 15, session_id="s1")
+    store.get("j1", "pdf") # j1 kini paling baru diakses
+    assert store.save("j3", "pdf", b"c" * 15, session_id="s1")
+    assert store.has("j1", "pdf") and store.has("j3", "pdf")
+    assert not store.has("j2", "pdf")
+    assert store.get("j2", "pdf") is None
+    assert store.usage()["largest_session_bytes"] == 30
+    assert conn.execute("SELECT COUNT(*) FROM job_artifacts").fetchone()[0] == 2
+
+
+def test_session_budget_does_not_touch_other_sessions(conn):
+    store = _store(conn)
+    store.save("j1", "pdf", b"a" * 30, session_id="s1")
+    store.save("j2", "pdf", b"b" * 30, session_id="s2")
+    store.save("j3", "pdf", b"c" * 30, session_id="s2")
+    assert store.has("j1", "pdf")
+    assert not store.has("j2", "pdf")
+    assert store.usage()["sessions"] == 2
+
+
+def test_global_budget_evicts_across_sessions(conn):
+    store = _store(conn, max_bytes=60, session_max_bytes=40)
+    store.save("j1", "pdf", b"a" * 30, session_id="s1")
+    store.save("j2", "pdf", b"b" * 30, session_id="s2")
+    store.save("j3", "pdf", b"c" * 30, session_id="s3")
+    assert not store.has("j1", "pdf")
+    assert store.current_bytes == 60
+    assert store.usage()["evictions"] == 1
+
+
+def test_oversized_artifact_is_rejected(conn):
+    store = _store(conn)
+    assert not store.save("j1", "audio", b"x" * 41, session_id="s1")
+    assert store.usage()["rejected"] == 1
+    assert store.current_bytes == 0
+
+
+def test_replacing_artifact_updates_size(conn):
+    store = _store(conn)
+    store.save("j1", "pdf", b"a" * 30, session_id="s1")
+    store.save("j1", "pdf", b"b" * 10, session_id="s1")
+    assert store.current_bytes == 10
+    assert store.get("j1", "pdf") == b"b" * 10
+
+
+def test_index_is_rebuilt_and_trimmed_after_restart(conn):
+    store = _store(conn, max_bytes=100, session_max_bytes=100)
+    for i in range(4):
+        store.save(f"j{i}", "pdf", b"a" * 25, session_id="s1")
+    reopened = _store(conn, max_bytes=60, session_max_bytes=100)
+    assert reopened.current_bytes == 50
+    assert not reopened.has("j0", "pdf") and reopened.has("j3", "pdf")
+
+
+def test_discard_jobs_removes_all_artifacts_of_job(conn):
+    store = _store(conn)
+    store.save("j1", "pdf", b"a" * 10, session_id="s1")
+    store.save("j1", "audio_nova", b"b" * 10, session_id="s1")
+    store.save("j2", "pdf", b"c" * 10, session_id="s1")
+    store.discard_jobs(["j1"])
+    assert store.current_bytes == 10
+    assert conn.execute("SELECT COUNT(*) FROM job_artifacts").fetchone()[0] == 1
+
+
+def test_remove_orphan_files_only_old_matching_files(conn, tmp_path):
+    store = _store(conn)
+    old = tmp_path / "rekomendasi_jurusan_1.pdf"
+    fresh = tmp_path / "temp_audio_2.mp3"
+    other = tmp_path / "catatan.pdf"
+    for path in (old, fresh, other):
+        path.write_bytes(b"x")
+    stale = time.time() - 7200
+    os.utime(old, (stale, stale))
+    os.utime(other, (stale, stale))
+    assert store.remove_orphan_files(str(tmp_path), max_age=3600) == 1
+    assert not old.exists() and fresh.exists() and other.exists()
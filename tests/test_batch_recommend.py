@@ -0,0 +1,72 @@
+import json
+
+import batch_recommend
+from batch_recommend import InvalidProfile, describe_invalid, load_profiles, run_batch
+from recommendation_schema import HasilRekomendasi
+
+ANSWER = "\n".join(
+    json.dumps({"kampus": f"Kampus {i}", "jurusan": "Informatika", "peluang_diterima": 50, "alasan": "cocok"})
+    for i in range(3)
+)
+
+
+def test_bad_cell_marks_only_that_row_invalid(tmp_path):
+    path = tmp_path / "siswa.csv"
+    path.write_text("id,nama,nilai_rapor,usia,mata_pelajaran\ns1,Ani,85.5,17,Fisika;Kimia\ns2,Budi,abc,17,\n", encoding="utf-8")
+    profiles = dict(load_profiles(str(path)))
+    assert profiles["s1"]["nilai_rapor"] == 85.5
+    assert profiles["s1"]["mata_pelajaran"] == ["Fisika", "Kimia"]
+    assert profiles["s2"] == InvalidProfile("nilai_rapor", "abc", 3)
+
+
+def test_malformed_jsonl_lines_become_invalid_profiles(tmp_path):
+    path = tmp_path / "siswa.jsonl"
+    path.write_text(
+        '{"id": "s1", "nama": "Ani", "nilai_rapor": 80}\n'
+        '{"id": "s2", "nama": \n'
+        "\n"
+        '["bukan", "objek"]\n'
+        '{"id": "s5", "usia": "tujuh"}\n',
+        encoding="utf-8",
+    )
+    profiles = load_profiles(str(path))
+    assert [sid for sid, _ in profiles] == ["s1", "siswa-0002", "siswa-0003", "s5"]
+    assert profiles[0][1]["nilai_rapor"] == 80.0
+    assert profiles[1][1] == InvalidProfile(None, '{"id": "s2", "nama":', 2)
+    assert profiles[2][1] == InvalidProfile(None, '["bukan", "objek"]', 4)
+    assert profiles[3][1] == InvalidProfile("usia", "tujuh", 5)
+    assert describe_invalid(profiles[2][1]) == "Baris 4 bukan objek JSON yang valid: '[\"bukan\", \"objek\"]'"
+
+
+def test_invalid_rows_are_recorded_as_errors(tmp_path):
+    output = tmp_path / "hasil.jsonl"
+    seen = []
+    summary = run_batch(
+        [("s2", InvalidProfile("usia", "x", 3))], str(output),
+        on_result=lambda record, done, total: seen.append((record["id"], done, total)),
+    )
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert records == [
+        {"id": "s2", "status": "error", "column": "usia", "line": 3, "error": "Isian kolom usia tidak valid: 'x'"}
+    ]
+    assert summary["error"] == 1 and summary["ok"] == 0
+    assert seen == [("s2", 1, 1)]
+
+
+def test_pdf_names_are_unique_per_row(tmp_path, monkeypatch):
+    def fake_recommend(profile, limiter, max_retries):
+        return f"profil {profile['nama']}", HasilRekomendasi.parse(ANSWER), "palsu"
+
+    monkeypatch.setattr(batch_recommend, "recommend_student", fake_recommend)
+    monkeypatch.setattr(batch_recommend, "render_pdf", lambda profil, hasil, nama: nama.encode("utf-8"))
+    profiles = [("A/1", {"nama": "Ani"}), ("A 1", {"nama": "Budi"}), ("A 1", {"nama": "Citra"})]
+    output = tmp_path / "hasil.jsonl"
+    summary = run_batch(profiles, str(output), pdf_dir=str(tmp_path / "pdf"), workers=3)
+    assert summary["ok"] == 3
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    pdfs = {record["nama"]: record["pdf"] for record in records}
+    assert sorted(pdfs) == ["Ani", "Budi", "Citra"]
+    assert {nama: open(path, "rb").read().decode("utf-8") for nama, path in pdfs.items()} == {
+        "Ani": "Ani", "Budi": "Budi", "Citra": "Citra"
+    }
+    assert sorted(p.name for p in (tmp_path / "pdf").iterdir()) == ["A_1.pdf", "A_1_2.pdf", "A_1_3.pdf"]
@@ -0,0 +1,95 @@
+import pytest
+
+from campus_catalog import CampusCatalog, Kandidat, city_tokens, get_catalog, offline_recommendation
+
+BASE_ROW = {
+    "jenis_kampus": "Negeri", "akreditasi": "Unggul", "nilai_minimal": "80", "biaya_semester_juta": "5",
+    "bidang_karier": "Teknologi", "jurusan_sma": "IPA", "mata_pelajaran": "Matematika", "lingkungan_kerja": "Kantor",
+    "gaji": "3", "stabilitas": "3", "luar_negeri": "3", "fleksibilitas": "3", "beasiswa": "3", "fasilitas": "3",
+}
+FORM = {
+    "jurusan_sma": "IPA", "nilai_rapor": 85.0, "karier": "Teknologi", "mata_pelajaran": ["Matematika"],
+    "lingkungan_kerja": "Kantor", "jenis_kampus": "Negeri", "pendapatan": "Rp3-5 juta", "faktor_kampus": [],
+}
+
+
+def _catalog(*rows):
+    return CampusCatalog([dict(BASE_ROW, **row) for row in rows])
+
+
+def _kandidat(kampus, jurusan, skor):
+    return Kandidat(kampus, jurusan, "Bandung", "Negeri", "Unggul", 5.0, "Teknologi", skor, 60)
+
+
+def test_rank_orders_by_fit():
+    catalog = _catalog(
+        {"kampus": "A", "jurusan": "Informatika", "kota": "Bandung"},
+        {"kampus": "B", "jurusan": "Akuntansi", "kota": "Bandung", "bidang_karier": "Bisnis", "jurusan_sma": "IPS"},
+        {"kampus": "C", "jurusan": "Elektro", "kota": "Bandung", "nilai_minimal": "99"},
+    )
+    ranked = catalog.rank(FORM, k=3)
+    assert [c.kampus for c in ranked] == ["A", "C", "B"]
+    assert ranked[0].skor > ranked[1].skor > ranked[2].skor
+    assert ranked[0].peluang_diterima > ranked[1].peluang_diterima
+
+
+def test_rank_respects_budget_and_k():
+    catalog = _catalog(
+        {"kampus": "Mahal", "jurusan": "Informatika", "kota": "Jakarta", "biaya_semester_juta": "40"},
+        {"kampus": "Murah", "jurusan": "Informatika", "kota": "Jakarta"},
+    )
+    assert [c.kampus for c in catalog.rank(FORM, k=1)] == ["Murah"]
+    assert len(catalog.rank(FORM, k=10)) == 2
+
+
+def test_city_tokens_normalize_names():
+    assert city_tokens("Kota Jakarta Selatan") == {"jakarta", "selatan"}
+    assert city_tokens("Kab. Bandung") == {"bandung"}
+    assert city_tokens("Solo") == {"surakarta"}
+    assert city_tokens("") == frozenset()
+
+
+@pytest.mark.parametrize("domisili, expected", [
+    ("Kota Bandung", "Bandung"),
+    ("Jakarta Selatan", "Jakarta"),
+    ("Solo", "Surakarta"),
+])
+def test_location_factor_matches_whole_city_names(domisili, expected):
+    catalog = _catalog(
+        {"kampus": "A", "jurusan": "Informatika", "kota": "Bandung"},
+        {"kampus": "B", "jurusan": "Informatika", "kota": "Jakarta"},
+        {"kampus": "C", "jurusan": "Informatika", "kota": "Surakarta"},
+    )
+    form = dict(FORM, faktor_kampus=["Lokasi"], domisili=domisili)
+    assert catalog.rank(form, k=1)[0].kota == expected
+
+
+@pytest.mark.parametrize("domisili", ["ang", "Bandungan", "Jakart"])
+def test_location_factor_ignores_partial_words(domisili):
+    catalog = _catalog(
+        {"kampus": "A", "jurusan": "Informatika", "kota": "Bandung"},
+        {"kampus": "B", "jurusan": "Informatika", "kota": "Jakarta"},
+    )
+    skor, _ = catalog.score(dict(FORM, faktor_kampus=["Lokasi"], domisili=domisili))
+    baseline, _ = catalog.score(FORM)
+    assert list(skor) == list(baseline)
+
+
+def test_offline_recommendation_prefers_distinct_campuses():
+    kandidat = [_kandidat("A", "Informatika", 9), _kandidat("A", "Elektro", 8), _kandidat("B", "Fisika", 7),
+                _kandidat("C", "Kimia", 6)]
+    hasil = offline_recommendation(kandidat)
+    assert [(r.kampus, r.jurusan) for r in hasil] == [("A", "Informatika"), ("B", "Fisika"), ("C", "Kimia")]
+
+
+def test_offline_recommendation_pads_to_three_from_same_campus():
+    kandidat = [_kandidat("A", "Informatika", 9), _kandidat("A", "Elektro", 8), _kandidat("B", "Fisika", 7),
+                _kandidat("A", "Mesin", 6)]
+    hasil = offline_recommendation(kandidat)
+    assert [(r.kampus, r.jurusan) for r in hasil] == [("A", "Informatika"), ("A", "Elektro"), ("B", "Fisika")]
+
+
+def test_offline_recommendation_from_real_catalog_has_three_items():
+    for karier in ("Teknologi", "Kesehatan", "Bisnis", "Seni"):
+        form = dict(FORM, karier=karier, faktor_kampus=["Lokasi"], domisili="Medan")
+        assert len(offline_recommendation(get_catalog().rank(form))) == 3
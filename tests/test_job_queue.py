@@ -0,0 +1,78 @@
+import sqlite3
+import time
+
+import job_queue
+from job_queue import STATUS_DONE, STATUS_ERROR, JobQueue
+
+
+def _wait_for_status(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id).status != status:
+        assert time.monotonic() < deadline, "pekerjaan tidak selesai tepat waktu"
+        time.sleep(0.01)
+
+
+def test_worker_survives_claim_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "CLAIM_RETRY_SECONDS", 0.01)
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+    queue.register("echo", lambda payload, job: payload["value"])
+    claim = queue._claim
+    failures = []
+
+    def flaky_claim():
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    monkeypatch.setattr(queue, "_claim", flaky_claim)
+    queue.start()
+    job_id = queue.submit("echo", {"value": 42})
+    _wait_for_status(queue, job_id, STATUS_DONE)
+    assert failures == [1]
+    assert queue.get(job_id).result == 42
+    assert all(thread.is_alive() for thread in queue._threads)
+
+
+def test_unserializable_result_is_stored_as_error(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+    queue.register("set", lambda payload, job: {"nilai": {1, 2}})
+    queue.register("echo", lambda payload, job: payload["value"])
+    queue.start()
+    job_id = queue.submit("set", {})
+    _wait_for_status(queue, job_id, STATUS_ERROR)
+    job = queue.get(job_id)
+    assert job.result is None
+    assert "Hasil tidak bisa disimpan" in job.error and "TypeError" in job.error
+    # Worker yang sama tetap melayani pekerjaan berikutnya
+    next_id = queue.submit("echo", {"value": 7})
+    _wait_for_status(queue, next_id, STATUS_DONE)
+    assert queue.get(next_id).result == 7
+
+
+def test_worker_retries_finish_after_database_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "CLAIM_RETRY_SECONDS", 0.01)
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+    queue.register("echo", lambda payload, job: payload["value"])
+    conn = queue._conn
+    failures = []
+
+    class FlakyConnection:
+        """Gagal sekali saat menyimpan status akhir, selebihnya diteruskan ke koneksi asli."""
+
+        def execute(self, sql, *args):
+            if sql.startswith("UPDATE jobs SET status = ?, result") and not failures:
+                failures.append(sql)
+                raise sqlite3.OperationalError("database is locked")
+            return conn.execute(sql, *args)
+
+        def __getattr__(self, name):
+            return getattr(conn, name)
+
+    queue._conn = FlakyConnection()
+    queue.start()
+    job_id = queue.submit("echo", {"value": 42})
+    _wait_for_status(queue, job_id, STATUS_DONE)
+    assert len(failures) == 1
+    assert queue.get(job_id).result == 42
+    assert all(thread.is_alive() for thread in queue._threads)
@@ -0,0 +1,119 @@
+import json
+
+import openai
+import pytest
+
+import batch_recommend
+import pilih_kampus_tts
+from batch_recommend import RateLimiter, recommend_student, run_batch
+from llm_backend import Backend, BackendUnavailable, RuleBackend, parse_backend_names
+from model_router import TierModels
+from openai_client import HealthStatus
+
+PROFILE = dict(batch_recommend.DEFAULT_PROFILE, nama="Ani", nilai_rapor=85.0, mata_pelajaran=["Matematika"])
+ANSWER = "\n".join(
+    json.dumps({"kampus": f"Kampus {i}", "jurusan": "Informatika", "peluang_diterima": 50, "alasan": "cocok"})
+    for i in range(3)
+)
+
+
+class FakeBackend(Backend):
+    tiers = TierModels("draft", None, None)
+
+    def __init__(self, name, healthy=True):
+        super().__init__()
+        self.name = self.label = name
+        self.healthy = healthy
+        self.unhealthy_messages = []
+
+    def check_health(self, block=True):
+        return HealthStatus(True, None) if self.healthy else HealthStatus(False, f"{self.name} mati")
+
+    def mark_unhealthy(self, message):
+        self.unhealthy_messages.append(message)
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Mengganti rantai backend dan panggilan LLM; `answers[nama]` berisi jawaban atau error per panggilan."""
+    answers, calls = {}, []
+
+    def fake_call(prompt, backend=None, **kwargs):
+        calls.append(backend.name)
+        answer = answers[backend.name].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def use(*backends):
+        monkeypatch.setattr(batch_recommend, "get_backends", lambda: list(backends))
+        return backends
+
+    monkeypatch.setattr(pilih_kampus_tts, "call_openai_api", fake_call)
+    return use, answers, calls
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=None)
+
+
+def test_backend_requires_health_check():
+    with pytest.raises(TypeError):
+        Backend()
+
+
+def test_parse_backend_names():
+    assert parse_backend_names("openai, local,openai", offline=False) == ["openai", "local"]
+    assert parse_backend_names("openai,local", offline=True) == ["rules"]
+    assert parse_backend_names("", offline=False) == ["rules"]
+    with pytest.raises(ValueError):
+        parse_backend_names("openai,gpu", offline=False)
+
+
+def test_unhealthy_backend_is_skipped(chain):
+    use, answers, calls = chain
+    use(FakeBackend("openai", healthy=False), FakeBackend("local"))
+    answers["local"] = [ANSWER]
+    profil, hasil, backend = recommend_student(PROFILE, RateLimiter(0), max_retries=0)
+    assert backend == "local" and calls == ["local"] and len(hasil) == 3
+
+
+def test_failing_backend_fails_over_after_retries(chain):
+    use, answers, calls = chain
+    openai_backend, _ = use(FakeBackend("openai"), FakeBackend("local"))
+    answers["openai"] = [_connection_error(), _connection_error()]
+    answers["local"] = [ANSWER]
+    _, _, backend = recommend_student(PROFILE, RateLimiter(0), max_retries=1, base_delay=0)
+    assert backend == "local"
+    assert calls == ["openai", "openai", "local"]
+    assert openai_backend.stats["failovers"] == 1
+    assert openai_backend.unhealthy_messages # gagal koneksi: dilewati sampai health check berikutnya
+
+
+def test_permanent_error_falls_back_to_rules_without_retry(chain):
+    use, answers, calls = chain
+    use(FakeBackend("openai"), RuleBackend())
+    answers["openai"] = [openai.OpenAIError("API key salah")]
+    _, hasil, backend = recommend_student(PROFILE, RateLimiter(0), max_retries=3, base_delay=0)
+    assert backend == "rules" and calls == ["openai"] and hasil
+
+
+def test_last_error_is_raised_without_fallback(chain):
+    use, answers, calls = chain
+    use(FakeBackend("openai"))
+    answers["openai"] = ["bukan json"]
+    with pytest.raises(batch_recommend.RecommendationParseError):
+        recommend_student(PROFILE, RateLimiter(0), max_retries=0)
+    use(FakeBackend("local", healthy=False))
+    with pytest.raises(BackendUnavailable, match="local mati"):
+        recommend_student(PROFILE, RateLimiter(0), max_retries=0)
+
+
+def test_run_batch_records_backend(chain, tmp_path):
+    use, answers, _ = chain
+    use(FakeBackend("openai", healthy=False), RuleBackend())
+    output = tmp_path / "hasil.jsonl"
+    summary = run_batch([("s1", PROFILE)], str(output), workers=1, requests_per_minute=0)
+    record = json.loads(output.read_text(encoding="utf-8"))
+    assert summary["ok"] == 1
+    assert record["status"] == "ok" and record["backend"] == "rules"
@@ -0,0 +1,67 @@
+import logging
+import os
+
+import pytest
+
+import major_index
+import pilih_kampus_tts
+
+DESCRIPTIONS = "jurusan,deskripsi\nInformatika,pemrograman komputer dan algoritma\nBiologi,makhluk hidup dan sel\n"
+
+
+@pytest.fixture
+def index_paths(tmp_path, monkeypatch):
+    descriptions = tmp_path / "deskripsi.csv"
+    descriptions.write_text(DESCRIPTIONS, encoding="utf-8")
+    index_path = tmp_path / "index.npy"
+    monkeypatch.setattr(major_index, "DESCRIPTIONS_PATH", str(descriptions))
+    monkeypatch.setattr(major_index, "INDEX_PATH", str(index_path))
+    monkeypatch.setattr(major_index, "_index", None)
+    return descriptions, index_path
+
+
+def test_build_index_leaves_no_temp_files(index_paths):
+    descriptions, index_path = index_paths
+    assert major_index.build_index(str(descriptions), str(index_path), dim=64) == 2
+    assert sorted(os.listdir(index_path.parent)) == ["deskripsi.csv", "index.json", "index.npy"]
+    results = major_index.MajorIndex(str(index_path)).search(["algoritma komputer"], k=1)
+    assert results[0][0][0] == "Informatika"
+
+
+def test_get_index_builds_missing_index_once(index_paths):
+    _, index_path = index_paths
+    index = major_index.get_index()
+    assert index is not None and index_path.exists()
+    assert major_index.get_index() is index
+
+
+def test_get_index_returns_none_for_corrupt_index(index_paths, caplog):
+    descriptions, index_path = index_paths
+    major_index.build_index(str(descriptions), str(index_path), dim=64)
+    index_path.write_bytes(b"bukan file npy")
+    with caplog.at_level(logging.WARNING, logger="major_index"):
+        assert major_index.get_index() is None
+    assert "ranking tanpa kemiripan" in caplog.text
+
+
+def test_get_index_rejects_matrix_that_does_not_match_metadata(index_paths, tmp_path):
+    descriptions, index_path = index_paths
+    major_index.build_index(str(descriptions), str(index_path), dim=64)
+    other = tmp_path / "lain.csv"
+    other.write_text(DESCRIPTIONS + "Fisika,gerak dan energi\n", encoding="utf-8")
+    major_index.build_index(str(other), str(tmp_path / "lain.npy"), dim=64)
+    os.replace(tmp_path / "lain.npy", index_path)
+    assert major_index.get_index() is None
+
+
+def test_shortlist_ranks_without_similarity_when_index_unavailable(monkeypatch):
+    seen = {}
+
+    def fake_rank(form, major_similarity=None):
+        seen["kemiripan"] = major_similarity
+        return ["kandidat"]
+
+    monkeypatch.setattr(pilih_kampus_tts, "get_index", lambda: None)
+    monkeypatch.setattr(pilih_kampus_tts, "rank_candidates", fake_rank)
+    assert pilih_kampus_tts.shortlist_candidates({"karier": "Teknologi"}, "suka coding") == ["kandidat"]
+    assert seen["kemiripan"] is None
@@ -0,0 +1,89 @@
+import json
+
+import openai
+import pytest
+
+from campus_catalog import Kandidat
+from model_router import TierModels, profile_ambiguity, route_recommendation
+from recommendation_schema import RecommendationParseError
+
+ANSWER = "\n".join(
+    json.dumps({"kampus": f"Kampus {i}", "jurusan": "Informatika", "peluang_diterima": 50, "alasan": "cocok"})
+    for i in range(3)
+)
+TIERS = TierModels("murah", "mahal", 10)
+
+
+def _kandidat(*skor):
+    return [Kandidat(f"Kampus {i}", "Informatika", "Bandung", "Negeri", "Unggul", 5.0, "Teknologi", s, 60)
+            for i, s in enumerate(skor)]
+
+
+class FakeCall:
+    """Pengganti `call_openai_api`: jawaban per model, dan mencatat model yang dipanggil."""
+
+    def __init__(self, **answers):
+        self.answers = answers
+        self.models = []
+
+    def __call__(self, prompt, placeholder, model=None, max_tokens=None, timeout=None, history=()):
+        self.models.append(model)
+        answer = self.answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_clear_shortlist_is_not_ambiguous():
+    # Hanya skor shortlist yang dinilai; formulir bawaan yang serba netral tidak menaikkan ke model mahal
+    assert profile_ambiguity(_kandidat(3.0, 2.0, 1.0)) == []
+    assert profile_ambiguity(_kandidat(3.0, 2.99)) == []
+
+
+def test_close_scores_are_ambiguous():
+    assert profile_ambiguity(_kandidat(3.0, 2.95, 2.9)) == ["skor_berdekatan"]
+
+
+def test_valid_draft_is_accepted_without_refine():
+    call = FakeCall(murah=ANSWER)
+    routed = route_recommendation(call, "prompt", reasons=profile_ambiguity(_kandidat(3.0, 2.0, 1.0)), tiers=TIERS)
+    assert call.models == ["murah"]
+    assert (routed.tier, routed.model, routed.reasons) == ("draft", "murah", ())
+    assert len(routed.hasil) == 3
+
+
+@pytest.mark.parametrize("kwargs, answers, reason", [
+    ({"reasons": ["skor_berdekatan"]}, {"murah": ANSWER}, "skor_berdekatan"),
+    ({"deep": True}, {"murah": ANSWER}, "deep"),
+    ({}, {"murah": "Maaf, saya tidak yakin."}, "draft_invalid"),
+    ({}, {"murah": openai.APIConnectionError(request=None)}, "draft_error"),
+])
+def test_refine_is_triggered(kwargs, answers, reason):
+    call = FakeCall(mahal=ANSWER.replace("cocok", "lebih cocok"), **answers)
+    routed = route_recommendation(call, "prompt", tiers=TIERS, **kwargs)
+    assert call.models == ["murah", "mahal"]
+    assert (routed.tier, routed.model) == ("refine", "mahal")
+    assert reason in routed.reasons
+    assert routed.hasil.items[0].alasan == "lebih cocok"
+
+
+def test_failed_refine_falls_back_to_valid_draft():
+    call = FakeCall(murah=ANSWER, mahal=openai.APIConnectionError(request=None))
+    routed = route_recommendation(call, "prompt", reasons=["skor_berdekatan"], tiers=TIERS)
+    assert call.models == ["murah", "mahal"]
+    assert (routed.tier, routed.reasons) == ("draft", ("skor_berdekatan",))
+
+
+def test_refine_is_skipped_without_refine_tier():
+    call = FakeCall(murah=ANSWER)
+    tiers = TierModels("murah", None, 10)
+    routed = route_recommendation(call, "prompt", reasons=["skor_berdekatan"], deep=True, tiers=tiers)
+    assert call.models == ["murah"]
+    assert (routed.tier, routed.reasons) == ("draft", ())
+
+
+def test_invalid_draft_without_refine_tier_raises():
+    call = FakeCall(murah="bukan rekomendasi")
+    with pytest.raises(RecommendationParseError):
+        route_recommendation(call, "prompt", tiers=TierModels("murah", None, 10))
+    assert call.models == ["murah"]
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import openai
+import pytest
+
+import openai_client
+from openai_client import HEALTH_RETRY_SECONDS, HealthCheck, HealthStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeModels:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.release = None
+
+    def list(self):
+        self.calls += 1
+        if self.release is not None:
+            assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return []
+
+
+class FakeClient:
+    """Klien OpenAI palsu: hanya `models.list()` yang dipakai health check."""
+
+    def __init__(self):
+        self.models = FakeModels()
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def health(client, clock):
+    return HealthCheck(lambda: client.models.list(), openai_client._describe_openai_error, name="test-health",
+                       clock=clock)
+
+
+def test_success_is_cached(health, client, clock):
+    assert health.check() == HealthStatus(True, None)
+    clock.advance(10 * HEALTH_RETRY_SECONDS)
+    assert health.check() == HealthStatus(True, None)
+    assert client.models.calls == 1
+
+
+def test_failure_is_retried_after_interval(health, client, clock):
+    client.models.error = openai.APIConnectionError(request=None)
+    status = health.check()
+    assert not status.ok and status.message.startswith("Gagal menginisialisasi klien OpenAI")
+    clock.advance(HEALTH_RETRY_SECONDS - 1)
+    assert health.check() is status
+    assert client.models.calls == 1
+    client.models.error = None
+    clock.advance(2)
+    assert health.check() == HealthStatus(True, None)
+    assert client.models.calls == 2
+
+
+def test_mark_unhealthy_expires(health, client, clock):
+    health.check()
+    health.mark_unhealthy("Koneksi terputus")
+    assert health.check() == HealthStatus(False, "Koneksi terputus")
+    clock.advance(HEALTH_RETRY_SECONDS - 1)
+    assert health.check(block=False) == HealthStatus(False, "Koneksi terputus")
+    assert client.models.calls == 1
+    clock.advance(2)
+    assert health.check() == HealthStatus(True, None)
+    assert client.models.calls == 2
+
+
+def test_non_blocking_check_runs_in_background(health, client):
+    client.models.release = threading.Event()
+    assert health.check(block=False) is None
+    # Pemeriksaan yang sedang berjalan tidak memulai thread kedua
+    assert health.check(block=False) is None
+    thread = health._thread
+    client.models.release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert client.models.calls == 1
+    assert health.check(block=False) == HealthStatus(True, None)
+    assert health._thread is thread
+
+
+def test_blocking_check_waits_for_background_check(health, client):
+    client.models.release = threading.Event()
+    health.check(block=False)
+    while client.models.calls == 0: # Tunggu sampai pemeriksaan background memegang lock
+        time.sleep(0.001)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(health.check()))
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive() and results == []
+    client.models.release.set()
+    waiter.join(5)
+    assert results == [HealthStatus(True, None)]
+    assert client.models.calls == 1
+
+
+def test_module_check_health_uses_shared_client(monkeypatch, client):
+    monkeypatch.setattr(openai_client, "_client", client)
+    monkeypatch.setattr(openai_client, "_health", HealthCheck(
+        lambda: openai_client.get_client().models.list(), openai_client._describe_openai_error,
+    ))
+    assert openai_client.check_health() == HealthStatus(True, None)
+    openai_client.mark_unhealthy("Server tidak merespons")
+    assert openai_client.check_health(block=False) == HealthStatus(False, "Server tidak merespons")
+    assert client.models.calls == 1
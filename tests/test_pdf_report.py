@@ -0,0 +1,29 @@
+import io
+import os
+import zipfile
+
+from pdf_report import PDF_FONT_DIR, FONT_FILES, StudentReport, get_report_engine, render_class_zip
+from recommendation_schema import HasilRekomendasi, Rekomendasi
+
+HASIL = HasilRekomendasi((Rekomendasi("Universitas Indonesia", "Ilmu Komputer", 65.0, "Sesuai “minat” siswa"),))
+
+
+def test_bundled_fonts_are_used_by_default():
+    assert all(os.path.exists(os.path.join(PDF_FONT_DIR, name)) for name in FONT_FILES.values())
+    assert get_report_engine().unicode
+
+
+def test_class_zip_keeps_students_with_same_id():
+    reports = [
+        StudentReport("A/1", "Ani", "profil", HASIL),
+        StudentReport("A 1", "Budi", "profil", HASIL),
+        StudentReport("A_1_2", "Citra", "profil", HASIL),
+        StudentReport("A/1", "Dewi", "profil", HASIL),
+    ]
+    buffer = io.BytesIO()
+    pages = render_class_zip(reports, buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        names = zf.namelist()
+        assert all(zf.read(name).startswith(b"%PDF") for name in names)
+    assert names == ["A_1.pdf", "A_1_2.pdf", "A_1_2_2.pdf", "A_1_3.pdf"]
+    assert pages >= len(reports)
@@ -0,0 +1,68 @@
+from profile_delta import (
+    MODE_DELTA, MODE_FULL, MODE_REUSE, describe_changes, diff_form, plan_rerecommendation,
+)
+
+FORM = {
+    "nama": "Ani", "nama_orangtua": "Budi", "domisili": "Bandung", "nilai_rapor": 85.0, "usia": 17,
+    "mata_pelajaran": ["Matematika", "Fisika"], "gaji_tinggi": 3, "stabilitas_pekerjaan": 3,
+    "kesempatan_luar_negeri": 3, "fleksibilitas_karier": 3, "hobi_minat": 3,
+}
+KANDIDAT = [
+    {"kampus": "ITB", "jurusan": "Teknik Informatika", "peluang_diterima": "Sedang"},
+    {"kampus": "UI", "jurusan": "Ilmu Komputer", "peluang_diterima": "Sedang"},
+]
+PREVIOUS = {"recommendation": [{"kampus": "ITB"}], "tier": {"tier": "draft", "model": "m"}, "kandidat": KANDIDAT}
+
+
+def _plan(form, kandidat=KANDIDAT, previous=PREVIOUS, **kwargs):
+    return plan_rerecommendation(FORM, previous, form, kandidat, **kwargs)
+
+
+def test_diff_form_ignores_multiselect_order():
+    changed = dict(FORM, mata_pelajaran=["Fisika", "Matematika"], domisili="Jakarta")
+    assert diff_form(FORM, changed) == {"domisili": ("Bandung", "Jakarta")}
+
+
+def test_cosmetic_change_reuses_previous_result():
+    plan = _plan(dict(FORM, nama="Ana", nama_orangtua="Bu"))
+    assert (plan.mode, plan.reason) == (MODE_REUSE, "perubahan_kosmetik")
+    assert set(plan.changes) == {"nama", "nama_orangtua"}
+
+
+def test_no_change_reuses_previous_result():
+    assert _plan(dict(FORM)).reason == "tanpa_perubahan"
+
+
+def test_ranking_change_with_same_shortlist_reuses():
+    plan = _plan(dict(FORM, gaji_tinggi=5))
+    assert (plan.mode, plan.reason) == (MODE_REUSE, "shortlist_sama")
+
+
+def test_ranking_change_with_new_shortlist_uses_delta():
+    kandidat = list(reversed(KANDIDAT))
+    plan = _plan(dict(FORM, gaji_tinggi=5, nama="Ana"), kandidat)
+    assert (plan.mode, plan.reason) == (MODE_DELTA, "perubahan_kecil")
+    assert plan.changes == {"gaji_tinggi": (3, 5)} # isian kosmetik tidak masuk prompt delta
+
+
+def test_non_ranking_change_uses_delta():
+    plan = _plan(dict(FORM, usia=18))
+    assert plan.mode == MODE_DELTA
+
+
+def test_many_changes_need_full_prompt():
+    form = dict(FORM, usia=18, gaji_tinggi=1, stabilitas_pekerjaan=1, kesempatan_luar_negeri=1)
+    plan = _plan(form, list(reversed(KANDIDAT)))
+    assert (plan.mode, plan.reason) == (MODE_FULL, "perubahan_banyak")
+
+
+def test_full_prompt_without_reusable_previous_result():
+    assert _plan(dict(FORM), deep=True).reason == "deep"
+    assert _plan(dict(FORM), previous=None).reason == "tanpa_hasil_sebelumnya"
+    offline = dict(PREVIOUS, tier={"tier": "offline", "model": "pra-peringkat lokal"})
+    assert _plan(dict(FORM), previous=offline).reason == "hasil_sebelumnya_offline"
+
+
+def test_describe_changes_formats_values():
+    text = describe_changes({"gaji_tinggi": (3, 5), "mata_pelajaran": ([], ["Biologi"])})
+    assert text == "- Potensi Gaji Tinggi: 3/5 -> 5/5\n- Mata Pelajaran Favorit: (kosong) -> Biologi"
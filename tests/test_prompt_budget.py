@@ -0,0 +1,36 @@
+import pytest
+
+from prompt_budget import PromptBudgetExceeded, count_message_tokens, encode_profile, fit_candidates
+
+
+def _messages(kandidat):
+    return [{"role": "user", "content": "\n".join(f"{i}. kandidat {name} " * 5 for i, name in enumerate(kandidat))}]
+
+
+KANDIDAT = [f"k{i}" for i in range(8)]
+
+
+def test_fit_candidates_keeps_all_when_within_budget():
+    messages, kandidat = fit_candidates(_messages, KANDIDAT, budget=10_000)
+    assert kandidat == KANDIDAT
+    assert messages == _messages(KANDIDAT)
+
+
+def test_fit_candidates_drops_lowest_ranked_first():
+    budget = count_message_tokens(_messages(KANDIDAT[:5]))
+    messages, kandidat = fit_candidates(_messages, KANDIDAT, budget=budget)
+    assert kandidat == KANDIDAT[:5]
+    assert count_message_tokens(messages) <= budget
+
+
+def test_fit_candidates_raises_below_minimum():
+    budget = count_message_tokens(_messages(KANDIDAT[:3])) - 1
+    with pytest.raises(PromptBudgetExceeded):
+        fit_candidates(_messages, KANDIDAT, min_candidates=3, budget=budget)
+
+
+def test_encode_profile_skips_name_and_empty_fields():
+    form = {"nama": "Ani", "domisili": "Bandung", "sekolah": "", "nilai_rapor": 85.0,
+            "mata_pelajaran": ["Fisika", "Biologi"], "jenis_kelamin": "Perempuan", "gaji_tinggi": 4}
+    assert encode_profile(form) == "jk=P\ndomisili=Bandung\nrapor=85\nmapel=Biologi,Fisika\nprioritas=gaji:4"
+    assert encode_profile(dict(form, nama="Budi")) == encode_profile(form)
@@ -0,0 +1,82 @@
+from recommendation_cache import LRUTTLCache, RecommendationCache, SQLiteCache, make_cache_key
+
+MESSAGES = [{"role": "system", "content": "Sistem"}, {"role": "user", "content": "Profil:\nnama=Budi"}]
+
+
+def test_cache_key_ignores_case_and_whitespace():
+    noisy = [{"role": "system", "content": "  SISTEM "}, {"role": "user", "content": "profil:  \n nama=budi"}]
+    assert make_cache_key("gpt-4", MESSAGES) == make_cache_key("gpt-4", noisy)
+
+
+def test_cache_key_depends_on_model_params_and_content():
+    key = make_cache_key("gpt-4", MESSAGES, temperature=0.7)
+    assert key != make_cache_key("gpt-3.5-turbo", MESSAGES, temperature=0.7)
+    assert key != make_cache_key("gpt-4", MESSAGES, temperature=0.2)
+    assert key != make_cache_key("gpt-4", MESSAGES[:1], temperature=0.7)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_expired_entries_are_dropped():
+    cache = LRUTTLCache(ttl_seconds=-1)
+    cache.set("a", "1")
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalid_values_are_not_cached(tmp_path):
+    cache = RecommendationCache(disk=SQLiteCache(str(tmp_path / "cache.sqlite3")), enabled=True)
+    assert cache.get_or_compute("k", lambda: "rusak", validate=lambda v: False) == "rusak"
+    assert cache.get("k") is None
+    assert cache.get_or_compute("k", lambda: "valid", validate=lambda v: True) == "valid"
+    assert cache.get_or_compute("k", lambda: "baru") == "valid"
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    disk.set("k", "nilai")
+    cache = RecommendationCache(disk=disk, enabled=True)
+    assert cache.get("k") == "nilai"
+    assert cache.get("k") == "nilai"
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 0}
+
+
+class _FakeCompletions:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def create(self, **params):
+        from types import SimpleNamespace
+
+        self.calls += 1
+        message = SimpleNamespace(content=self.answers.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_app_caches_only_valid_answers(monkeypatch):
+    from types import SimpleNamespace
+
+    import app
+
+    table = "| Kampus | Jurusan | Peluang Diterima (%) |\n|---|---|---|\n" + "\n".join(
+        f"| Kampus {i} | Informatika | 50 |" for i in range(3)
+    )
+    completions = _FakeCompletions(["Maaf, saya tidak bisa membantu.", table, "tidak dipanggil"])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    cache = RecommendationCache(memory=LRUTTLCache(), enabled=True)
+    monkeypatch.setattr(app, "get_client", lambda: client)
+    monkeypatch.setattr(app, "get_cache", lambda: cache)
+
+    assert app.call_openai_api("profil") == "Maaf, saya tidak bisa membantu."
+    assert app.call_openai_api("profil") == table # jawaban rusak tidak disajikan ulang dari cache
+    assert app.call_openai_api("profil") == table
+    assert completions.calls == 2
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from recommendation_schema import HasilRekomendasi, IncompleteRecommendation, RecommendationParseError, Rekomendasi
+
+ITEMS = [
+    {"kampus": "Universitas Indonesia", "jurusan": "Ilmu Komputer", "peluang_diterima": 70, "alasan": "Minat TI"},
+    {"kampus": "Institut Teknologi Bandung", "jurusan": "Teknik Elektro", "peluang_diterima": "65%"},
+    {"kampus": "Universitas Gadjah Mada", "jurusan": "Statistika", "peluang_diterima": 80.5},
+]
+JSONL = "\n".join(json.dumps(item) for item in ITEMS)
+
+
+def test_parse_json_lines():
+    hasil = HasilRekomendasi.parse(JSONL)
+    assert [r.kampus for r in hasil] == [item["kampus"] for item in ITEMS]
+    assert [r.peluang_diterima for r in hasil] == [70.0, 65.0, 80.5]
+    assert hasil.items[0].alasan == "Minat TI"
+
+
+def test_parse_skips_prose_line_like_parse_partial():
+    text = f"Berikut rekomendasinya:\n{JSONL}\nSemoga membantu!"
+    assert len(HasilRekomendasi.parse_partial(text)) == 3
+    assert HasilRekomendasi.parse(text) == HasilRekomendasi.parse(JSONL)
+
+
+def test_parse_code_fence_array_and_wrapped_object():
+    assert len(HasilRekomendasi.parse(f"```json\n{JSONL}\n```")) == 3
+    assert len(HasilRekomendasi.parse(json.dumps(ITEMS))) == 3
+    assert len(HasilRekomendasi.parse(json.dumps({"rekomendasi": ITEMS}))) == 3
+
+
+def test_parse_accepts_key_aliases():
+    text = "\n".join(
+        json.dumps({"Universitas": item["kampus"], "Program Studi": item["jurusan"], "Peluang": 50}) for item in ITEMS
+    )
+    assert [r.jurusan for r in HasilRekomendasi.parse(text)] == [item["jurusan"] for item in ITEMS]
+
+
+def test_parse_markdown_fallback():
+    text = (
+        "| Kampus | Jurusan | Peluang Diterima (%) |\n|---|---|---|\n"
+        "| UI | Ilmu Komputer | 70 |\n| ITB | Teknik Elektro | 65% |\n| UGM | Statistika | 80 |"
+    )
+    assert [r.kampus for r in HasilRekomendasi.parse(text)] == ["UI", "ITB", "UGM"]
+
+
+def test_parse_rejects_short_answer_but_keeps_items():
+    with pytest.raises(IncompleteRecommendation) as excinfo:
+        HasilRekomendasi.parse("\n".join(json.dumps(item) for item in ITEMS[:2]))
+    assert len(excinfo.value.hasil) == 2
+    assert len(HasilRekomendasi.parse(json.dumps(ITEMS[0]), min_items=1)) == 1
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Maaf, saya tidak bisa membantu.",
+    '{"kampus": "UI", "jurusan": "Hukum"}',
+    '{"kampus": "UI", "jurusan": "Hukum", "peluang_diterima": 140}',
+    '{"kampus": "UI", "jurusan": "Hukum", "peluang_diterima": "tinggi"}',
+    '{"kampus": "UI", "jurusan": ',
+])
+def test_parse_rejects_invalid_answers(text):
+    with pytest.raises(RecommendationParseError):
+        HasilRekomendasi.parse(text)
+
+
+def test_parse_partial_ignores_incomplete_last_line():
+    assert len(HasilRekomendasi.parse_partial(JSONL + '\n{"kampus": "Univ')) == 3
+
+
+def test_json_round_trip():
+    hasil = HasilRekomendasi.parse(JSONL)
+    assert HasilRekomendasi.from_json(hasil.to_json()) == hasil
+    assert HasilRekomendasi.from_json(json.dumps(hasil.to_dicts())) == hasil
+    assert isinstance(hasil.items[0], Rekomendasi)
@@ -0,0 +1,81 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from recommendation_stream import iter_completion_deltas, render_stream
+from request_coalescing import SingleFlight
+
+
+class FakePlaceholder:
+    def __init__(self):
+        self.updates = []
+
+    def markdown(self, body):
+        self.updates.append(body)
+
+
+def _chunk(content=None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def test_iter_completion_deltas_skips_empty_chunks_and_reports_usage():
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=4)
+    stream = [_chunk("a"), _chunk(""), _chunk("b\n"), _chunk(None, usage=usage)]
+    seen = []
+    assert list(iter_completion_deltas(stream, on_usage=seen.append)) == ["a", "b\n"]
+    assert seen == [usage]
+
+
+def test_render_stream_shows_only_complete_lines_then_full_text():
+    placeholder = FakePlaceholder()
+    deltas = ["| A | ", "B |\n| C", " | D |\n", "| E | F |"]
+    text = render_stream(iter(deltas), placeholder, render=lambda body: f"<{body}>")
+    assert text == "| A | B |\n| C | D |\n| E | F |"
+    assert placeholder.updates == [
+        "<| A | B |>",
+        "<| A | B |\n| C | D |>",
+        "<| A | B |\n| C | D |\n| E | F |>",
+    ]
+
+
+def test_render_stream_without_newline_updates_once():
+    placeholder = FakePlaceholder()
+    assert render_stream(iter(["halo", " dunia"]), placeholder) == "halo dunia"
+    assert placeholder.updates == ["halo dunia"]
+
+
+def test_coalesced_follower_renders_the_same_stream():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    chunks = [_chunk("baris 1\n"), _chunk("baris 2\n"), _chunk("baris 3")]
+
+    def slow_stream():
+        yield chunks[0]
+        started.set()
+        release.wait(5)
+        yield from chunks[1:]
+
+    leader_placeholder, follower_placeholder = FakePlaceholder(), FakePlaceholder()
+
+    def compute(flight):
+        return render_stream(flight.tee(iter_completion_deltas(slow_stream())), leader_placeholder)
+
+    def follow(flight):
+        render_stream(flight.iter_deltas(), follower_placeholder)
+        return flight.wait()
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(single_flight.do("k", compute, follow)))
+    follower.start()
+    while single_flight.stats["coalesced"] == 0:
+        time.sleep(0.005)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == ["baris 1\nbaris 2\nbaris 3"] * 2
+    assert follower_placeholder.updates[-1] == leader_placeholder.updates[-1] == "baris 1\nbaris 2\nbaris 3"
+    assert leader_placeholder.updates == ["baris 1", "baris 1\nbaris 2", "baris 1\nbaris 2\nbaris 3"]
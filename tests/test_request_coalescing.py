@@ -0,0 +1,190 @@
+import threading
+import time
+
+import pytest
+
+from request_coalescing import FairLimiter, QueueTimeout, SingleFlight
+
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "kondisi tidak terpenuhi tepat waktu"
+        time.sleep(0.005)
+
+
+def test_limiter_enters_immediately_without_on_wait():
+    limiter = FairLimiter(max_concurrent=2, timeout=1)
+    calls = []
+    with limiter.slot(on_wait=calls.append):
+        assert limiter.active == 1
+    assert calls == []
+    assert limiter.active == 0
+    assert limiter.stats["acquired"] == 1
+
+
+def test_limiter_on_wait_runs_without_holding_the_lock():
+    limiter = FairLimiter(max_concurrent=1, timeout=5)
+    limiter.acquire()
+    positions = []
+
+    def on_wait(position):
+        # Kunci limiter harus bebas agar sesi lain (mis. release) tidak ikut terblokir
+        free = []
+
+        def probe():
+            if limiter._cond.acquire(timeout=1):
+                free.append(True)
+                limiter._cond.release()
+
+        other = threading.Thread(target=probe)
+        other.start()
+        other.join(5)
+        positions.append((position, free == [True]))
+
+    waiter = threading.Thread(target=lambda: (limiter.acquire(on_wait), limiter.release()))
+    waiter.start()
+    _wait_until(lambda: positions)
+    limiter.release()
+    waiter.join(5)
+    assert positions == [(1, True)]
+    assert limiter.stats["queued"] == 1
+    assert limiter.active == 0
+
+
+def test_limiter_serves_waiters_in_fifo_order():
+    limiter = FairLimiter(max_concurrent=1, timeout=5)
+    limiter.acquire()
+    order = []
+
+    def worker(index):
+        limiter.acquire()
+        order.append(index)
+        limiter.release()
+
+    threads = []
+    for index in range(4):
+        thread = threading.Thread(target=worker, args=(index,))
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda: limiter.waiting == index + 1)
+    limiter.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2, 3]
+
+
+def test_limiter_timeout_removes_ticket():
+    limiter = FairLimiter(max_concurrent=1, timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(QueueTimeout):
+        limiter.acquire()
+    assert limiter.waiting == 0
+    assert limiter.stats["timeouts"] == 1
+    limiter.release()
+    limiter.acquire(on_wait=lambda position: pytest.fail("tidak seharusnya mengantre"))
+    limiter.release()
+
+
+def test_limiter_failing_on_wait_leaves_queue_clean():
+    limiter = FairLimiter(max_concurrent=1, timeout=1)
+    limiter.acquire()
+
+    def on_wait(position):
+        raise RuntimeError("rerun")
+
+    with pytest.raises(RuntimeError):
+        limiter.acquire(on_wait)
+    assert limiter.waiting == 0
+    limiter.release()
+    assert limiter.active == 0
+
+
+def test_single_flight_runs_compute_once_for_concurrent_callers():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute(flight):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "hasil"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("k", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(single_flight.do("k", compute))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    _wait_until(lambda: single_flight.stats["coalesced"] == 3)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ["hasil"] * 4
+    assert single_flight._flights == {}
+
+
+def test_single_flight_propagates_leader_error_to_followers():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute(flight):
+        started.set()
+        release.wait(5)
+        raise ValueError("gagal")
+
+    errors = []
+
+    def call():
+        try:
+            single_flight.do("k", compute)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    _wait_until(lambda: single_flight.stats["coalesced"] == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert errors == ["gagal", "gagal"]
+
+
+def test_single_flight_follower_replays_stream():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute(flight):
+        flight.publish("a")
+        started.set()
+        release.wait(5)
+        flight.publish("b")
+        return "ab"
+
+    leader = threading.Thread(target=lambda: single_flight.do("k", compute))
+    leader.start()
+    started.wait(5)
+    seen = []
+
+    def follow(flight):
+        seen.extend(flight.iter_deltas())
+        return flight.wait()
+
+    result = []
+    follower = threading.Thread(target=lambda: result.append(single_flight.do("k", compute, follow)))
+    follower.start()
+    _wait_until(lambda: single_flight.stats["coalesced"] == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert seen == ["a", "b"]
+    assert result == ["ab"]
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import speech_cache
+
+
+class FakeTtsBackend:
+    name = "fake"
+    tts_model = "tts-test"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+
+def test_concurrent_get_speech_synthesizes_once(monkeypatch):
+    backend = FakeTtsBackend()
+
+    def fake_synthesize(text, voice, backend):
+        backend.calls += 1
+        backend.release.wait(5)
+        return b"mp3:" + text.encode()
+
+    monkeypatch.setattr(speech_cache, "synthesize_speech", fake_synthesize)
+    monkeypatch.setattr(speech_cache, "_audio_cache", speech_cache.ByteBudgetLRU(1024))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(speech_cache.get_speech("halo", "nova", backend)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [b"mp3:halo"] * 3
+    assert backend.calls == 1
+    assert speech_cache.get_speech("halo", "nova", backend) == b"mp3:halo"
+    assert backend.calls == 1
+
+
+def test_byte_budget_lru_evicts_oldest():
+    cache = speech_cache.ByteBudgetLRU(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.current_bytes == 10
+    assert cache.stats["evictions"] == 1
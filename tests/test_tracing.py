@@ -0,0 +1,38 @@
+import socket
+import urllib.request
+
+import tracing
+from tracing import Tracer, _format_labels, start_metrics_server
+
+
+def test_label_values_are_escaped():
+    labels = _format_labels([("stage", 'a\\b"c\nd')])
+    assert labels == '{stage="a\\\\b\\"c\\nd"}'
+
+
+def test_prometheus_text_escapes_counter_labels():
+    tracer = Tracer(log_path=None)
+    tracer.incr("errors_total", stage='tahap "x"\nbaru')
+    text = tracer.prometheus_text()
+    assert 'pilih_kampus_errors_total{stage="tahap \\"x\\"\\nbaru"} 1' in text
+    assert all(line.count('"') % 2 == 0 for line in text.splitlines())
+
+
+def test_metrics_server_binds_loopback_by_default(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        free_port = sock.getsockname()[1]
+    monkeypatch.setattr(tracing, "_metrics_server", None)
+    server = start_metrics_server(port=free_port)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_metrics_server_without_port_is_disabled():
+    assert start_metrics_server(port=None) is None
@@ -0,0 +1,201 @@
+"""Instrumentasi latensi per tahap, penghitung token/cache/error, dan ekspor metrik.
+
+Metrik disimpan di memori proses (dibagikan ke semua sesi Streamlit) dan dapat:
+- dibaca di halaman admin (pages/2_Admin_Metrik.py),
+- diekspor dalam format teks Prometheus (endpoint /metrics opsional via
+  PILIH_KAMPUS_METRICS_PORT),
+- ditulis sebagai log JSONL per tahap jika PILIH_KAMPUS_TRACE_LOG diatur.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_LOG_PATH = os.getenv("PILIH_KAMPUS_TRACE_LOG")
+METRICS_PORT = os.getenv("PILIH_KAMPUS_METRICS_PORT")
+# Default hanya loopback; isi 0.0.0.0 jika Prometheus men-scrape dari host lain
+METRICS_HOST = os.getenv("PILIH_KAMPUS_METRICS_HOST", "127.0.0.1")
+# Jumlah sampel durasi terakhir per tahap yang dipakai untuk menghitung persentil
+MAX_SAMPLES = int(os.getenv("PILIH_KAMPUS_TRACE_MAX_SAMPLES", "2048"))
+METRIC_PREFIX = "pilih_kampus"
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _escape_label_value(value):
+    """Escape nilai label sesuai format teks Prometheus (backslash, kutip ganda, baris baru)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in sorted(labels))
+    return "{" + inner + "}"
+
+
+class Tracer:
+    """Pencatat durasi per tahap dan penghitung (counter) yang aman dipakai lintas thread."""
+
+    def __init__(self, max_samples=MAX_SAMPLES, log_path=TRACE_LOG_PATH):
+        self.log_path = log_path
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._duration_sum = defaultdict(float)
+        self._duration_count = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """Mengukur durasi satu tahap. Atribut tambahan (mis. cache_hit) bisa diisi lewat dict yang di-yield."""
+        span = dict(attrs)
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = type(e).__name__
+            self.incr("errors_total", stage=name)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self._samples[name].append(duration)
+                self._duration_sum[name] += duration
+                self._duration_count[name] += 1
+            self._log(name, duration, span)
+
+    def incr(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def record_usage(self, usage, stage):
+        """Mencatat jumlah token dari objek `usage` pada respons chat completions."""
+        if usage is None:
+            return
+        self.incr("tokens_total", usage.prompt_tokens or 0, stage=stage, kind="prompt")
+        self.incr("tokens_total", usage.completion_tokens or 0, stage=stage, kind="completion")
+
+    def record_cache(self, cache, hit):
+        self.incr("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def _log(self, name, duration, span):
+        if not self.log_path:
+            return
+        record = {"ts": time.time(), "stage": name, "duration_ms": round(duration * 1000, 3), **span}
+        with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def stage_summary(self):
+        """Ringkasan per tahap: jumlah, rata-rata, p50/p95/p99 (milidetik), dan jumlah error."""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            counts = dict(self._duration_count)
+            sums = dict(self._duration_sum)
+            errors = {
+                dict(labels).get("stage"): value
+                for (name, labels), value in self._counters.items() if name == "errors_total"
+            }
+        summary = []
+        for name, values in sorted(samples.items()):
+            summary.append({
+                "stage": name,
+                "count": counts[name],
+                "mean_ms": round(sums[name] / counts[name] * 1000, 2),
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+                "errors": int(errors.get(name, 0)),
+            })
+        return summary
+
+    def counters(self):
+        with self._lock:
+            return [
+                {"name": name, **dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+
+    def prometheus_text(self):
+        """Semua metrik dalam format eksposisi teks Prometheus."""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_duration_seconds Durasi per tahap pemrosesan.",
+            f"# TYPE {METRIC_PREFIX}_stage_duration_seconds summary",
+        ]
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            sums = dict(self._duration_sum)
+            counts = dict(self._duration_count)
+            counters = dict(self._counters)
+        metric = f"{METRIC_PREFIX}_stage_duration_seconds"
+        for name, values in sorted(samples.items()):
+            for q in (0.5, 0.95, 0.99):
+                labels = _format_labels([("stage", name), ("quantile", q)])
+                lines.append(f"{metric}{labels} {_percentile(values, q):.6f}")
+            lines.append(f"{metric}_sum{_format_labels([('stage', name)])} {sums[name]:.6f}")
+            lines.append(f"{metric}_count{_format_labels([('stage', name)])} {counts[name]}")
+        declared = set()
+        for (name, labels), value in sorted(counters.items()):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if full_name not in declared:
+                lines.append(f"# TYPE {full_name} counter")
+                declared.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._duration_sum.clear()
+            self._duration_count.clear()
+            self._counters.clear()
+
+
+# Satu tracer bersama untuk seluruh proses
+tracer = Tracer()
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = tracer.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Jangan membanjiri log Streamlit dengan setiap scrape
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Menjalankan endpoint /metrics di thread background, sekali per proses (jika port diatur)."""
+    global _metrics_server
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Endpoint metrik tidak dapat dijalankan di %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server